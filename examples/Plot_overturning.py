@@ -8,26 +8,27 @@ column model solution, using the interpolation tools
 import sys
 sys.path.append('../Modules')
 from pymoc.modules import Psi_Thermwind, Psi_SO
+from pymoc.diagnostics import Diagnostics
 from pymoc.plotting import Interpolate_channel, Interpolate_twocol
 import numpy as np
 from matplotlib import pyplot as plt
 
 plt.close('all')
 
-Diag=np.load('diags.npz')
+Diag=Diagnostics('diags')
 
 # Notice that some of these variables may need to be adjusted to match the
 # simulations to be plotted:
 L=2e7
 l=2e6;
 nb=500
-b_basin=1.0*Diag['arr_2'][:,-1];
-b_north=1.0*Diag['arr_3'][:,-1];
-bs_SO=1.0*Diag['arr_4'][:,-1];
-z=1.0*Diag['arr_5'];
-y=1.0*Diag['arr_7'];
-tau=1.0*Diag['arr_9'];
-kapGM=1.0*Diag['arr_10'];
+b_basin=1.0*Diag['basin.b'][-1];
+b_north=1.0*Diag['north.b'][-1];
+bs_SO=1.0*Diag['channel.bs'][-1];
+z=1.0*Diag['z'];
+y=1.0*Diag['y'];
+tau=1.0*Diag['tau'];
+kapGM=1.0*Diag['kapGM'];
 
 AMOC = Psi_Thermwind(z=z,b1=b_basin,b2=b_north,f=1.2e-4)
 AMOC.solve()
@@ -7,6 +7,7 @@ for the diffusive overturning circulation in a basin
 import sys
 from pymoc.modules import Psi_Thermwind
 from pymoc.modules import Column
+from pymoc.utils import fixed_point
 import numpy as np
 from matplotlib import pyplot as plt
 
@@ -56,21 +57,30 @@ ax2.set_xlabel('b', fontsize=14)
 # create adv-diff column model instance for basin
 basin = Column(z=z, kappa=kappa, Area=A_basin, b=b_basin, bs=bs, bbot=bbot)
 
-# loop to iteratively find equilibrium solution
-for ii in range(0, 30):
-  # update buoyancy profile
-  wA = AMOC.Psi * 1e6
-  basin.solve_equi(wA)
 
-  # update overturning streamfunction
-  #(notice that we are only adjusting b some of the way, which leads to better convergence):
-  AMOC.update(b1=0.8 * AMOC.b1(z) + 0.2 * basin.b)
+def update(b):
+  # update overturning streamfunction:
+  AMOC.update(b1=b)
   AMOC.solve()
+  # update buoyancy profile
+  wA = AMOC.Psi * 1e6
+  basin.solve_equi(wA, method='quadrature')
 
   # Plot updated results:
   ax1.plot(AMOC.Psi, AMOC.z, linewidth=0.5)
   ax2.plot(basin.b, basin.z, linewidth=0.5)
   plt.pause(0.01)
+  return basin.b
+
+
+# iteratively find equilibrium solution
+# (Anderson acceleration with some under-relaxation converges much faster
+# than only adjusting b some of the way in each iteration):
+b, res, niter = fixed_point(update, b_basin(z), tol=1e-10, beta=0.5)
+print(
+    'converged to a residual of ' + str(res) + ' after ' + str(niter) +
+    ' iterations'
+)
 
 # Plot final results:
 ax1.plot(AMOC.Psi, AMOC.z, linewidth=2)
@@ -8,6 +8,7 @@ and at the southern end of the basin (at the interface to the channel).
 The parameters chosen here follow more or less the "control" experiment of Nikurashin
 and Vallis (2012, JPO).
 '''
+from pymoc import Model
 from pymoc.modules import Psi_Thermwind, Psi_SO, Column
 from pymoc.plotting import Interpolate_channel
 import numpy as np
@@ -60,10 +61,6 @@ def b_north(z):
 
 # create N.A. overturning model instance
 AMOC = Psi_Thermwind(z=z, b1=b_basin, b2=b_north, f=1e-4)
-# and solve for initial overturning streamfunction:
-AMOC.solve()
-# evaluate overturning in isopycnal space:
-[Psi_iso_b, Psi_iso_n] = AMOC.Psibz()
 
 # create S.O. overturning model instance
 SO = Psi_SO(
@@ -78,7 +75,6 @@ SO = Psi_SO(
     c=0.1,
     bvp_with_Ek=True
 )
-SO.solve()
 
 # create adv-diff column model instance for basin
 basin = Column(z=z, kappa=kappa, Area=A_basin, b=b_basin, bs=bs, bbot=bmin)
@@ -95,31 +91,24 @@ ax2.set_xlim((-0.02, 0.03))
 ax1.set_xlabel('$\Psi$', fontsize=14)
 ax2.set_xlabel('b', fontsize=14)
 
-# Main time-stepping loop:
-for ii in range(0, total_iters):
-  # update buoyancy profile
-  # using z-coordinate overturning:
-  #wAb=(AMOC.Psi-SO.Psi)*1e6
-  #wAN=-AMOC.Psi*1e6
-  # using isopycnal overturning:
-  wAb = (Psi_iso_b - SO.Psi) * 1e6
-  wAN = -Psi_iso_n * 1e6
-  basin.timestep(wA=wAb, dt=dt)
-  north.timestep(wA=wAN, dt=dt, do_conv=True)
-  if ii % MOC_up_iters == 0:
-    # update overturning streamfunction (can be done less frequently)
-    AMOC.update(b1=basin.b, b2=north.b)
-    AMOC.solve()
-    [Psi_iso_b, Psi_iso_n] = AMOC.Psibz()
-    SO.update(b=basin.b)
-    SO.solve()
-  if ii % plot_iters == 0:
-    # Plot current state:
-    ax1.plot(AMOC.Psi, AMOC.z, linewidth=0.5, color='r')
-    ax1.plot(SO.Psi, SO.z, linewidth=0.5, color='m')
-    ax2.plot(basin.b, basin.z, linewidth=0.5, color='b')
-    ax2.plot(north.b, north.z, linewidth=0.5, color='c')
-    plt.pause(0.01)
+# connect the modules into a coupled model. The overturning is computed at the
+# northern and southern ends of the basin, and (by default) remapped onto the
+# isopycnals of each column:
+model = Model()
+model.add_module(basin, 'basin')
+model.add_module(north, 'north', do_conv=True)
+model.add_module(AMOC, 'AMOC', left='basin', right='north')
+model.add_module(SO, 'SO', right='basin')
+
+# Main time-stepping loop, with the overturning updated every MOC_up_iters timesteps:
+for ii in range(0, total_iters, plot_iters):
+  model.run(min(plot_iters, total_iters - ii), dt, coupler_iters=MOC_up_iters)
+  # Plot current state:
+  ax1.plot(AMOC.Psi, AMOC.z, linewidth=0.5, color='r')
+  ax1.plot(SO.Psi, SO.z, linewidth=0.5, color='m')
+  ax2.plot(basin.b, basin.z, linewidth=0.5, color='b')
+  ax2.plot(north.b, north.z, linewidth=0.5, color='c')
+  plt.pause(0.01)
 
 # Plot final results over time-iteration plot:
 ax1.plot(AMOC.Psi, AMOC.z, linewidth=2, color='r')
@@ -12,7 +12,9 @@ This script is designed to be executed from the command line and takes various
 optional inputs for parameters.
 '''
 
+from pymoc import Model
 from pymoc.modules import Psi_Thermwind, Psi_SO, SO_ML, Column
+from pymoc.diagnostics import DiagnosticsWriter
 import numpy as np
 import argparse
 
@@ -27,8 +29,11 @@ if __name__ == '__main__':
   parser.add_argument('--Nyears', type=float, default=10000.0)
   parser.add_argument('--dt', type=float, default=30.0)
   parser.add_argument('--pickup', default=None)
-  parser.add_argument('--diagfile', default='diags.npz')
+  parser.add_argument('--diagfile', default='diags')
   parser.add_argument('--pickup_save_file', default=None)
+  parser.add_argument('--checkpoint_file', default='checkpoint.npz')
+  parser.add_argument('--checkpoint_years', type=float, default=None)
+  parser.add_argument('--restart', action='store_true')
   args = parser.parse_args()
 
 
@@ -159,82 +164,58 @@ if __name__ == '__main__':
       bs=bs_SO
   )
 
-  # Create empty arrays to save time-dependent diagnostics
-  AMOC_save = np.zeros((len(z), int(total_iters / Diag_iters)))
-  AMOC_b_save = np.zeros((nb, int(total_iters / Diag_iters)))
-  bgrid_save = np.zeros((nb, int(total_iters / Diag_iters)))
-  b_basin_save = np.zeros((len(z), int(total_iters / Diag_iters)))
-  b_north_save = np.zeros((len(z), int(total_iters / Diag_iters)))
-  bs_SO_save = np.zeros((len(y), int(total_iters / Diag_iters)))
-  Psi_SO_save = np.zeros((len(z), int(total_iters / Diag_iters)))
+  # connect the modules into the coupled model, which updates the bottom boundary
+  # conditions and bbl kappa from the bottom water flowing into each column:
+  model = Model()
+  model.add_module(
+      basin, 'basin', do_conv=True, dynamic_bbc=True, kappa_noflux=kappa
+  )
+  model.add_module(
+      north, 'north', do_conv=True, dynamic_bbc=True, kappa_noflux=kappa
+  )
+  model.add_module(channel, 'channel')
+  model.add_module(AMOC, 'AMOC', left='basin', right='north', nb=nb)
+  model.add_module(PsiSO, 'SO', left='channel', right='basin')
 
-  # *****************************************************************************
-  for ii in range(0, total_iters):
-    # Main time-stepping loop:
-
-    if ii % MOC_up_iters == 0:
-      # update overturning streamfunction (can be done less frequently)
-      AMOC.update(
-          b1=basin.b, b2=north.b
-      )    # Notice that, even with fixed PsiN,
-      #buoyancy profiles need to be updated for isopycnal mapping
-      # update northern overturning
-      AMOC.solve()
-      [Psi_res_b, Psi_res_n] = AMOC.Psibz(nb=nb)    #isopycnal mapping
-      PsiSO.update(b=basin.b, bs=channel.bs)
-      # update SO overturning
-      PsiSO.solve()
-      if ii % Diag_iters == 0:
-        # save diagnostics:
-        AMOC_save[:, int(ii / Diag_iters)] = AMOC.Psi
-        AMOC_b_save[:, int(ii / Diag_iters)] = AMOC.Psib(nb=nb)
-        bgrid_save[:, int(ii / Diag_iters)] = AMOC.bgrid
-        b_basin_save[:, int(ii / Diag_iters)] = basin.b
-        b_north_save[:, int(ii / Diag_iters)] = north.b
-        bs_SO_save[:, int(ii / Diag_iters)] = channel.bs
-        Psi_SO_save[:, int(ii / Diag_iters)] = PsiSO.Psi
-
-    # update residual vertical velocity in columns:
-    wAb = (Psi_res_b - PsiSO.Psi) * 1e6
-    wAN = -Psi_res_n * 1e6
-
-    # adjust bottom boundary conditions and bbl kappa:
-    if PsiSO.Psi[1] < 0:
-      # bottom water coming in from the south
-      basin.bbot = channel.bs[0]
-      basin.kappa = kappaeff
-    if Psi_res_b[1] > 0 and north.b[0] < basin.b[1] and north.b[
-        0] < channel.bs[0]:
-      # bottom water coming in from the north
-      basin.bbot = north.b[0]
-      basin.kappa = kappaeff
-    elif PsiSO.Psi[
-        1] >= 0:    # notice that this implies neither of the two above
-      # no bottom water coming in - no flux BBC and flat isopycnals
-      basin.bbot = basin.b[1]
-      basin.kappa = kappa
-    if Psi_res_n[1] < 0 and basin.b[0] < north.b[1]:
-      # bottom water coming in from basin:
-      north.bbot = basin.b[0]
-      north.kappa = kappaeff
-    else:
-      # no bottom water coming in - no flux BBC and flat isopycnals
-      north.bbot = north.b[1]
-      north.kappa = kappa
-
-    # time-step adv-diff equations in columns:
-    basin.timestep(wA=wAb, dt=dt, do_conv=True)
-    north.timestep(wA=wAN, dt=dt, do_conv=True)
-    # time-step SO ML buoyancy
-    channel.timestep(b_basin=basin.b, Psi_b=PsiSO.Psi, dt=dt)
+  # Diagnostics are written to the diagfile directory as the run proceeds
+  # (see pymoc.Diagnostics for reading them back):
+  if diagfile is not None:
+    diags = DiagnosticsWriter(diagfile, append=args.restart)
+    diags.write_static('z', z)
+    diags.write_static('y', y)
+    diags.write_static('tau', tau)
+    diags.write_static('kapGM', kapGM)
+  else:
+    diags = None
+
+  if args.restart:
+    # continue from the last checkpoint, discarding any diagnostics written after it:
+    model.restart(args.checkpoint_file, diagnostics=diags)
 
+  # the full model state is checkpointed every checkpoint_years
+  # (rounded to a multiple of the MOC update interval):
+  if args.checkpoint_years is not None:
+    checkpoint_iters = MOC_up_iters * max(
+        int(round(args.checkpoint_years * 360. * 86400. / dt / MOC_up_iters)), 1
+    )
+  else:
+    checkpoint_iters = None
+
+  # *****************************************************************************
+  # Main time-stepping loop (the overturning is updated every MOC_up_iters time steps):
+  model.run(
+      total_iters - model.iteration,
+      dt,
+      coupler_iters=MOC_up_iters,
+      snapshot_iters=None if diags is None else Diag_iters,
+      diagnostics=diags,
+      checkpoint_iters=checkpoint_iters,
+      checkpoint_file=args.checkpoint_file
+  )
   # **************** end of main time-stepping loop *************************
 
   # write-out pickup and diagnostics:
   if pickup_save_file is not None:
     np.savez(pickup_save_file, basin.b, north.b, channel.bs)
   if diagfile is not None:
-    np.savez(
-        diagfile, AMOC_save, AMOC_b_save, b_basin_save, b_north_save,
-        bs_SO_save, z, bgrid_save, y, Psi_SO_save, tau, kapGM
-    )
+    diags.close()
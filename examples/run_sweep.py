@@ -0,0 +1,33 @@
+'''
+This script runs a parameter sweep with the run_JansenNadeau_2018.py driver,
+using the Sweep runner. The members of the sweep run in parallel, and their
+results are stored in a cache directory, so that finished members are skipped
+if the sweep is run again (or extended). Members that only differ in the
+surface buoyancy perturbation (db) are run in sequence, each starting from
+the equilibrium of the previous one.
+'''
+
+import os
+import argparse
+from pymoc import Sweep
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--processes', type=int, default=None)
+  parser.add_argument('--cache_dir', default='sweep_cache')
+  args = parser.parse_args()
+
+  script = os.path.join(
+      os.path.dirname(os.path.abspath(__file__)), 'run_JansenNadeau_2018.py'
+  )
+  sweep = Sweep(
+      script, {
+          'B': [4.9e3, 5.9e3, 6.9e3],
+          'db': [0.0, -0.001, -0.002, -0.003]
+      },
+      cache_dir=args.cache_dir,
+      chain='db'
+  )
+  paths = sweep.run(processes=args.processes)
+  for member, path in zip(sweep.members(), paths):
+    print(member, os.path.join(path, 'diags'))
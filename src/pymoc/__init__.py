@@ -2,3 +2,6 @@ __version__ = '0.0.1rc5'
 import pymoc.modules
 import pymoc.utils
 import pymoc.plotting
+from pymoc.model import Model
+from pymoc.sweep import Sweep
+from pymoc.diagnostics import DiagnosticsWriter, Diagnostics
@@ -0,0 +1,403 @@
+import json
+import os
+import numpy as np
+from pymoc.utils import replace_file
+
+
+def write_index(path, index):
+  # write the index to a temporary file first, and move it into place, so that the
+  # index on disk is always complete and only refers to chunks that have been written:
+  tmp = os.path.join(path, 'index.json.tmp')
+  with open(tmp, 'w') as f:
+    json.dump(index, f, sort_keys=True, indent=2)
+  replace_file(tmp, os.path.join(path, 'index.json'))
+
+
+def read_index(path):
+  with open(os.path.join(path, 'index.json')) as f:
+    return json.load(f)
+
+
+class DiagnosticsWriter(object):
+  r"""
+  Streaming Diagnostics Writer
+
+  Instances of this class write time series of named diagnostic fields to a directory,
+  as the model runs. Each call of :meth:`pymoc.DiagnosticsWriter.append` adds one
+  snapshot of every field. Snapshots are collected in a buffer of **chunk_size**
+  snapshots per field, which is written to a ``.npy`` file of its own (a chunk) whenever
+  it is full, or when the writer is flushed. The directory also contains an
+  ``index.json`` file listing the fields and their chunks, which is replaced atomically
+  after the chunks have been written, so that the diagnostics on disk are always
+  consistent, and everything up to the last flush survives a crash.
+
+  Fields that do not change in time (e.g. the grids and parameters) are written once,
+  with :meth:`pymoc.DiagnosticsWriter.write_static`. The diagnostics can be read back,
+  with each time series memory mapped, with :class:`pymoc.Diagnostics`.
+
+  The writer can be used as a context manager, which closes it on exit.
+  """
+
+  def __init__(
+      self,
+      path,    # output directory
+      chunk_size=100,    # number of snapshots per chunk
+      append=False    # whether to append to existing diagnostics
+  ):
+    r"""
+    Parameters
+    ----------
+
+    path : string
+           Output directory. Created if it does not exist.
+    chunk_size : int; optional
+                 Number of snapshots that are buffered in memory, and written to each chunk.
+    append : logical; optional
+             Whether to continue the diagnostics in an existing directory. Otherwise, any
+             diagnostics previously written to the directory are replaced.
+    """
+
+    self.path = path
+    self.chunk_size = chunk_size
+    if not os.path.exists(path):
+      os.makedirs(path)
+    if append and os.path.exists(os.path.join(path, 'index.json')):
+      self.index = read_index(path)
+    else:
+      self.index = {'count': 0, 'fields': {}, 'static': {}}
+      write_index(path, self.index)
+    self.buffers = {}
+    self.nbuffered = 0
+
+  @property
+  def count(self):
+    r"""
+    Number of snapshots appended so far (including those that are still buffered).
+    """
+    return self.index['count'] + self.nbuffered
+
+  def register(self, name, shape=(), dtype=float):
+    r"""
+    Register a time-dependent field. Fields passed to :meth:`pymoc.DiagnosticsWriter.append`
+    are registered automatically, with the shape and dtype of their first snapshot.
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the field.
+    shape : tuple; optional
+            Shape of each snapshot of the field.
+    dtype : dtype; optional
+            Data type of the field.
+
+    """
+
+    if name in self.index['fields'] or name in self.index['static']:
+      raise TypeError('diagnostic ' + name + ' is already registered')
+    if self.count > 0:
+      raise TypeError(
+          'diagnostic ' + name + ' needs to be registered before the first snapshot'
+      )
+    self.index['fields'][name] = {
+        'shape': list(shape),
+        'dtype': np.dtype(dtype).str,
+        'chunks': []
+    }
+
+  def append(self, **fields):
+    r"""
+    Add a snapshot of every registered field.
+
+    Parameters
+    ----------
+
+    fields : float or ndarray
+             Snapshot of each field, by name.
+
+    """
+
+    if self.count == 0:
+      for name, value in fields.items():
+        if name not in self.index['fields']:
+          value = np.asarray(value)
+          self.register(name, value.shape, value.dtype)
+    if set(fields) != set(self.index['fields']):
+      raise TypeError(
+          'snapshots need to include exactly the fields ' +
+          ', '.join(sorted(self.index['fields']))
+      )
+    for name, value in fields.items():
+      if name not in self.buffers:
+        field = self.index['fields'][name]
+        self.buffers[name] = np.zeros(
+            (self.chunk_size, ) + tuple(field['shape']), dtype=field['dtype']
+        )
+      self.buffers[name][self.nbuffered] = value
+    self.nbuffered += 1
+    if self.nbuffered == self.chunk_size:
+      self.flush()
+
+  def flush(self):
+    r"""
+    Write the buffered snapshots to a new chunk of each field, and update the index.
+    """
+
+    if self.nbuffered == 0:
+      return
+    for name, field in self.index['fields'].items():
+      filename = name + '.' + str(len(field['chunks'])).zfill(5) + '.npy'
+      np.save(
+          os.path.join(self.path, filename),
+          self.buffers[name][:self.nbuffered]
+      )
+      field['chunks'].append([filename, self.nbuffered])
+    self.index['count'] += self.nbuffered
+    self.nbuffered = 0
+    write_index(self.path, self.index)
+
+  def truncate(self, count):
+    r"""
+    Discard all snapshots after the first **count**, e.g. to continue the diagnostics of
+    a run that is restarted from a checkpoint. Chunks that lie beyond **count** are
+    removed, and the snapshots of a chunk that is only partly kept are moved back into
+    the buffer, and written to a new chunk.
+
+    Parameters
+    ----------
+
+    count : int
+            Number of snapshots to keep.
+
+    """
+
+    if count > self.count:
+      raise TypeError(
+          'cannot truncate ' + str(self.count) + ' snapshots to ' + str(count)
+      )
+    if count >= self.index['count']:
+      self.nbuffered = count - self.index['count']
+      return
+    self.nbuffered = 0
+    removed = []
+    for name, field in self.index['fields'].items():
+      start = 0
+      for ichunk, (filename, n) in enumerate(field['chunks']):
+        if start + n > count:
+          break
+        start += n
+      kept = count - start
+      if kept > 0:
+        chunk = np.load(os.path.join(self.path, filename))
+        self.buffers[name] = np.zeros(
+            (max(self.chunk_size, kept), ) + chunk.shape[1:], dtype=chunk.dtype
+        )
+        self.buffers[name][:kept] = chunk[:kept]
+      removed += [filename for filename, n in field['chunks'][ichunk:]]
+      field['chunks'] = field['chunks'][:ichunk]
+    self.index['count'] = start
+    # the index no longer refers to the removed chunks once it has been written:
+    write_index(self.path, self.index)
+    for filename in removed:
+      os.remove(os.path.join(self.path, filename))
+    self.nbuffered = kept
+    if self.nbuffered >= self.chunk_size:
+      self.flush()
+
+  def write_static(self, name, value):
+    r"""
+    Write a field that does not change in time.
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the field.
+    value : float or ndarray
+            Value of the field.
+
+    """
+
+    if name in self.index['fields']:
+      raise TypeError('diagnostic ' + name + ' is already registered')
+    filename = name + '.npy'
+    np.save(os.path.join(self.path, filename), np.asarray(value))
+    self.index['static'][name] = filename
+    write_index(self.path, self.index)
+
+  def close(self):
+    r"""
+    Flush the remaining snapshots, and release the buffers.
+    """
+
+    self.flush()
+    self.buffers = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
+class ChunkedSeries(object):
+  r"""
+  Chunked Time Series
+
+  A read-only view of the time series of a diagnostic field that is stored in several
+  chunks, as returned by :class:`pymoc.Diagnostics`. Indexing the series with a
+  snapshot index, a slice, or an array of indices (optionally followed by indices
+  into each snapshot) only reads the selected snapshots from the chunks they are in,
+  so that long time series can be processed without loading them into memory.
+  Converting the series into an array (e.g. with :func:`numpy.asarray`) loads all
+  snapshots.
+  """
+
+  def __init__(
+      self,
+      chunks    # chunks of the time series
+  ):
+    r"""
+    Parameters
+    ----------
+
+    chunks : list of ndarray
+             The (memory mapped) chunks, in order, each with the snapshot as the first
+             dimension.
+    """
+
+    self.chunks = chunks
+    self.ends = np.cumsum([len(chunk) for chunk in chunks])
+
+  @property
+  def shape(self):
+    return (int(self.ends[-1]), ) + self.chunks[0].shape[1:]
+
+  @property
+  def dtype(self):
+    return self.chunks[0].dtype
+
+  @property
+  def ndim(self):
+    return len(self.shape)
+
+  def __len__(self):
+    return self.shape[0]
+
+  def __array__(self, dtype=None, copy=None):
+    return np.asarray(np.concatenate(self.chunks), dtype=dtype)
+
+  def __getitem__(self, key):
+    if not isinstance(key, tuple):
+      key = (key, )
+    index, rest = key[0], key[1:]
+    if isinstance(index, (int, np.integer)):
+      if index < 0:
+        index += len(self)
+      if not 0 <= index < len(self):
+        raise IndexError('snapshot index out of range')
+      ichunk = np.searchsorted(self.ends, index, side='right')
+      start = self.ends[ichunk] - len(self.chunks[ichunk])
+      return self.chunks[ichunk][(index - start, ) + rest]
+    if isinstance(index, slice):
+      index = np.arange(*index.indices(len(self)))
+    elif index is Ellipsis:
+      return np.asarray(self)[key]
+    else:
+      index = np.asarray(index)
+      if index.dtype == bool:
+        index = np.flatnonzero(index)
+      index = np.where(index < 0, index + len(self), index)
+    if not len(index):
+      empty = np.zeros((0, ) + self.shape[1:], dtype=self.dtype)
+      return empty[(slice(None), ) + rest]
+    ichunks = np.searchsorted(self.ends, index, side='right')
+    # read each run of consecutive indices that lie in the same chunk at once:
+    runs = np.flatnonzero(np.diff(ichunks)) + 1
+    parts = []
+    for run, ichunk in zip(
+        np.split(index, runs), ichunks[np.concatenate(([0], runs))]
+    ):
+      start = self.ends[ichunk] - len(self.chunks[ichunk])
+      parts.append(self.chunks[ichunk][(run - start, ) + rest])
+    return np.concatenate(parts)
+
+
+class Diagnostics(object):
+  r"""
+  Diagnostics Reader
+
+  Read the diagnostics written by :class:`pymoc.DiagnosticsWriter`. Indexing an instance
+  with the name of a field returns its time series, with the snapshot as the first
+  dimension, or the value of a static field. The time series of a field that is stored
+  in a single chunk is returned as a (memory mapped) array, that of a field stored in
+  several chunks as a :class:`pymoc.diagnostics.ChunkedSeries`, which is indexed like an
+  array but only reads the snapshots that are selected.
+  """
+
+  def __init__(
+      self,
+      path,    # diagnostics directory
+      mmap_mode='r'    # memory mapping mode of the chunks
+  ):
+    r"""
+    Parameters
+    ----------
+
+    path : string
+           Diagnostics directory.
+    mmap_mode : string or None; optional
+                Mode in which the chunks are memory mapped (see :func:`numpy.load`), or None
+                to read them into memory.
+    """
+
+    self.path = path
+    self.mmap_mode = mmap_mode
+    self.index = read_index(path)
+
+  def keys(self):
+    r"""
+    Names of all fields, time-dependent and static.
+    """
+    return list(self.index['fields']) + list(self.index['static'])
+
+  def __contains__(self, name):
+    return name in self.index['fields'] or name in self.index['static']
+
+  def __len__(self):
+    # number of snapshots:
+    return self.index['count']
+
+  def chunks(self, name):
+    r"""
+    Load the chunks of a time-dependent field.
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the field.
+
+    Returns
+    -------
+
+    chunks : list of ndarray
+             The (memory mapped) chunks, in order.
+
+    """
+
+    return [
+        np.load(os.path.join(self.path, filename), mmap_mode=self.mmap_mode)
+        for filename, n in self.index['fields'][name]['chunks']
+    ]
+
+  def __getitem__(self, name):
+    if name in self.index['static']:
+      return np.load(os.path.join(self.path, self.index['static'][name]))
+    field = self.index['fields'][name]
+    chunks = self.chunks(name)
+    if len(chunks) == 1:
+      return chunks[0]
+    if not chunks:
+      return np.zeros((0, ) + tuple(field['shape']), dtype=field['dtype'])
+    return ChunkedSeries(chunks)
@@ -0,0 +1,799 @@
+import os
+import numpy as np
+from scipy.linalg import solve_triangular
+from pymoc.modules import Column, SO_ML, Psi_Thermwind, Psi_SO
+from pymoc.utils import replace_file, GridFunction
+
+
+def gridded(func, grid):
+  # the values and grid that define a function, for checkpoints: the source data of a
+  # GridFunction, or the values of any other function on the given grid
+  if isinstance(func, GridFunction):
+    return func.values, func.axis
+  return func(grid) + 0.*grid, grid
+
+
+def restore_gridded(func, grid, values, axis):
+  # the function to restore from a checkpoint written with gridded, or None if func
+  # already has the checkpointed values (e.g. if it is unchanged since the set up)
+  if np.array_equal(func(axis) + 0.*axis, values):
+    return None
+  if np.array_equal(axis, grid):
+    return values.copy()
+  return GridFunction(values.copy(), axis.copy())
+
+
+class Model(object):
+  r"""
+  Coupled Model Driver
+
+  Instances of this class connect a set of modules into a graph of basins and
+  overturning closures, and integrate the coupled model in time. Basins are
+  :class:`pymoc.modules.Column` (vertical advection-diffusion) and
+  :class:`pymoc.modules.SO_ML` (Southern Ocean mixed layer) instances. Closures are
+  :class:`pymoc.modules.Psi_Thermwind` instances, which connect two columns, and
+  :class:`pymoc.modules.Psi_SO` instances, which connect a column to the Southern Ocean,
+  optionally with its surface buoyancy given by a mixed layer.
+
+  Each closure has a "left" (southern or western) and a "right" (northern or eastern)
+  neighbor. The transport of the closure is taken to be from the left to the right
+  neighbor in the upper branch, so it is added to the area integrated vertical velocity
+  of a column on its left, and subtracted from that of a column on its right:
+
+  .. math::
+    wA = 10^6\left(\sum_{\text{left of}}\Psi - \sum_{\text{right of}}\Psi\right)
+
+  The closures are re-solved every **coupler_iters** timesteps, and the vertical
+  velocities in between are kept in preallocated arrays. Isopycnal remapping of the
+  thermal wind overturning, with :meth:`pymoc.modules.Psi_Thermwind.Psibz` (whose
+  results are cached until the closure is updated), and the direct solvers of the
+  closures are used by default.
+
+  Columns are stepped one at a time with :meth:`pymoc.modules.Column.timestep`. Jumping
+  over whole coupling intervals with :meth:`pymoc.modules.Column.advance` is opt-in
+  (the **advance** argument of :meth:`pymoc.Model.run`), since it changes the buoyancy
+  that the mixed layers see within an interval. The model does not batch its columns
+  with :class:`pymoc.modules.ColumnEnsemble`, which is meant for many independent
+  columns on a shared grid, such as parameter sweeps.
+  """
+
+  # options accepted by add_module for each type of module, and their default values:
+  default_options = {
+      Column: {
+          'do_conv': False,    # whether to do convective adjustment
+          'scheme': 'explicit',    # time discretization of vertical adv-diff
+          'dynamic_bbc': False,    # whether to update bottom BC from the inflowing bottom water
+          'kappa_noflux': None    # diffusivity used while no bottom water flows in
+      },
+      SO_ML: {
+          'advection': 'upwind'    # advection scheme in the mixed layer
+      },
+      Psi_Thermwind: {
+          'remap': True,    # whether to use the isopycnal remapping of the overturning
+          'nb': 500,    # number of buoyancy classes for the remapping
+          'fixed': False    # if true, the overturning is not re-solved
+      },
+      Psi_SO: {
+          'fixed': False    # if true, the overturning is not re-solved
+      },
+  }
+
+  def __init__(self):
+    # modules, their types, options and neighbors, by name:
+    self.modules = {}
+    self.types = {}
+    self.options = {}
+    self.neighbors = {}
+    # names of basins and closures, in the order in which they were added:
+    self.columns = []
+    self.mixed_layers = []
+    self.couplers = []
+    # work buffers for the area integrated vertical velocity in each column,
+    # and the overturning (in Sv) seen by each neighbor of each closure:
+    self.wA = {}
+    self.Psi_coupled = {}
+    # whether bottom water is flowing into each column with dynamic_bbc:
+    self.bottom_inflow = {}
+    self.iteration = 0
+    self.time = 0.
+    self.snapshots = {}
+
+  def __getitem__(self, name):
+    return self.modules[name]
+
+  def add_module(self, module, name, left=None, right=None, **options):
+    r"""
+    Add a module to the model.
+
+    Parameters
+    ----------
+
+    module : Column, SO_ML, Psi_Thermwind or Psi_SO
+             The module to be added.
+    name : string
+           Name of the module. Needs to be unique within the model.
+    left : string; optional
+           For closures, the name of the southern (or western) neighbor. For Psi_Thermwind,
+           the column providing **b1**. For Psi_SO, an optional SO_ML providing the surface buoyancy.
+    right : string; optional
+            For closures, the name of the northern (or eastern) neighbor. For Psi_Thermwind,
+            the column providing **b2**. For Psi_SO, the column providing **b**.
+    options : optional
+              Options for the module, as listed in :attr:`default_options`:
+
+              - Column: **do_conv**, **scheme** (see :meth:`pymoc.modules.Column.timestep`),
+                **dynamic_bbc** (whether the bottom boundary condition is set to the buoyancy of
+                the densest bottom water flowing into the column, and a no-flux condition otherwise),
+                and **kappa_noflux** (diffusivity to be used while no bottom water flows in, with
+                **dynamic_bbc**. Defaults to the column's diffusivity).
+              - SO_ML: **advection** (see :meth:`pymoc.modules.SO_ML.timestep`).
+              - Psi_Thermwind: **remap** (whether the overturning is remapped onto the
+                isopycnals of each column), **nb** (number of buoyancy classes used for the
+                remapping), and **fixed** (if true, the overturning is not re-solved).
+              - Psi_SO: **fixed** (if true, the overturning is not re-solved).
+
+    """
+
+    if name in self.modules:
+      raise TypeError('module name ' + name + ' is already in use')
+    mtype = None
+    for cls in self.default_options:
+      if isinstance(module, cls):
+        mtype = cls
+    if mtype is None:
+      raise TypeError(
+          'module needs to be an instance of Column, SO_ML, Psi_Thermwind or Psi_SO'
+      )
+    for key in options:
+      if key not in self.default_options[mtype]:
+        raise TypeError(
+            key + ' is not a valid option for ' + mtype.__name__ + ' modules'
+        )
+
+    if mtype is Psi_Thermwind:
+      self.check_neighbor(left, Column, 'left')
+      self.check_neighbor(right, Column, 'right')
+    elif mtype is Psi_SO:
+      if left is not None:
+        self.check_neighbor(left, SO_ML, 'left')
+      self.check_neighbor(right, Column, 'right')
+    elif left is not None or right is not None:
+      raise TypeError('only Psi_Thermwind and Psi_SO modules have neighbors')
+
+    self.modules[name] = module
+    self.types[name] = mtype
+    self.options[name] = dict(self.default_options[mtype])
+    self.options[name].update(options)
+    self.neighbors[name] = (left, right)
+    if mtype is Column:
+      self.columns.append(name)
+      self.wA[name] = np.zeros(len(module.z))
+      # diffusivity used while bottom water flows in, with dynamic_bbc:
+      self.options[name]['kappa_inflow'] = module.kappa
+    elif mtype is SO_ML:
+      self.mixed_layers.append(name)
+    else:
+      self.couplers.append(name)
+      self.Psi_coupled[name] = None
+
+  def check_neighbor(self, name, mtype, side):
+    r"""
+    Check that a neighbor of a closure exists and is of the expected type.
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the neighbor.
+    mtype : class
+            Expected type of the neighbor.
+    side : string
+           Side of the closure on which the neighbor sits ('left' or 'right').
+
+    """
+
+    if name not in self.modules or self.types[name] is not mtype:
+      raise TypeError(
+          side + ' neighbor needs to be the name of a ' + mtype.__name__ +
+          ' module in the model'
+      )
+
+  def update_couplers(self):
+    r"""
+    Update the closures with the current buoyancy in their neighbors, re-solve them
+    (unless they are fixed), and assemble the area integrated vertical velocity
+    in each column.
+    """
+
+    for name in self.couplers:
+      module = self.modules[name]
+      left, right = self.neighbors[name]
+      options = self.options[name]
+      if self.types[name] is Psi_Thermwind:
+        # buoyancy profiles need to be updated for the isopycnal mapping, even if Psi is fixed:
+        module.update(b1=self.modules[left].b, b2=self.modules[right].b)
+        if not options['fixed'] or not hasattr(module, 'Psi'):
+          module.solve()
+        if options['remap']:
+          self.Psi_coupled[name] = module.Psibz(nb=options['nb'])
+        else:
+          self.Psi_coupled[name] = [module.Psi, module.Psi]
+      else:
+        module.update(
+            b=self.modules[right].b,
+            bs=None if left is None else self.modules[left].bs
+        )
+        if not options['fixed'] or not hasattr(module, 'Psi'):
+          module.solve()
+        self.Psi_coupled[name] = [module.Psi, module.Psi]
+
+    for name in self.columns:
+      wA = self.wA[name]
+      wA[:] = 0.
+      for coupler in self.couplers:
+        left, right = self.neighbors[coupler]
+        if left == name:
+          wA += self.Psi_coupled[coupler][0]
+        if right == name:
+          wA -= self.Psi_coupled[coupler][1]
+      wA *= 1e6
+
+  def calc_bottom_inflow(self, name):
+    r"""
+    Find the buoyancy of the densest bottom water flowing into a column. Bottom water
+    flows in from a closure that contributes upwelling at the lowest interior level of
+    the column, and has the bottom buoyancy of the neighbor on the other side of the
+    closure: the bottom buoyancy of a neighboring column, or the southernmost surface
+    buoyancy of the Southern Ocean. Bottom water from a neighboring column needs to be
+    denser than the water above the bottom of the column, and than the southernmost
+    surface water of any Southern Ocean closure of the column (whether or not that
+    is flowing in).
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the column.
+
+    Returns
+    -------
+
+    bbot : float or None
+           Buoyancy of the densest inflowing bottom water, or None if no bottom water flows in.
+
+    """
+
+    column = self.modules[name]
+    bbot = None
+    b_max = column.b[1]    # bottom water from neighboring columns needs to be denser
+    from_columns = []
+    for coupler in self.couplers:
+      left, right = self.neighbors[coupler]
+      if name == left:
+        inflow = self.Psi_coupled[coupler][0][1] > 0
+        other = right
+      elif name == right:
+        inflow = self.Psi_coupled[coupler][1][1] < 0
+        other = left
+      else:
+        continue
+      if self.types[coupler] is Psi_SO:
+        module = self.modules[coupler]
+        b_in = module.bs(module.y[0]) if other is None else self.modules[other].bs[0]
+        b_max = min(b_max, b_in)
+        if inflow and (bbot is None or b_in < bbot):
+          bbot = b_in
+      elif inflow:
+        from_columns.append(self.modules[other].b[0])
+    for b_in in from_columns:
+      if b_in < b_max and (bbot is None or b_in < bbot):
+        bbot = b_in
+    return bbot
+
+  def update_bottom_bc(self, name):
+    r"""
+    Set the bottom boundary condition and diffusivity of a column with **dynamic_bbc**:
+    the buoyancy from :meth:`pymoc.Model.calc_bottom_inflow` and the column's diffusivity
+    if bottom water flows in, and otherwise a no-flux condition, with flat isopycnals at
+    the bottom, and **kappa_noflux**.
+
+    Parameters
+    ----------
+
+    name : string
+           Name of the column.
+
+    """
+
+    column = self.modules[name]
+    options = self.options[name]
+    bbot = self.calc_bottom_inflow(name)
+    self.bottom_inflow[name] = bbot is not None
+    if bbot is None:
+      # no bottom water coming in - no flux BBC and flat isopycnals
+      column.bbot = column.b[1]
+      kappa = options['kappa_noflux']
+    else:
+      column.bbot = bbot
+      kappa = options['kappa_inflow']
+    if kappa is not None and column.kappa is not kappa:
+      column.kappa = kappa
+
+  def step(self, dt, nsteps=1, advance=False):
+    r"""
+    Integrate the basins for nsteps timesteps, with the current vertical velocities.
+
+    Parameters
+    ----------
+
+    dt : float
+         Timestep. Units: s
+    nsteps : int; optional
+             Number of timesteps.
+    advance : logical; optional
+              Whether columns without **dynamic_bbc** are integrated over all nsteps at once,
+              with :meth:`pymoc.modules.Column.advance`. The mixed layers then see the buoyancy
+              of those columns at the end of the nsteps timesteps, so this is not the
+              default.
+
+    """
+
+    stepped = []
+    if advance:
+      for name in self.columns:
+        options = self.options[name]
+        if not options['dynamic_bbc']:
+          self.modules[name].advance(
+              wA=self.wA[name],
+              dt=dt,
+              nsteps=nsteps,
+              do_conv=options['do_conv'],
+              scheme=options['scheme']
+          )
+          stepped.append(name)
+    columns = [name for name in self.columns if name not in stepped]
+
+    for ii in range(nsteps):
+      for name in columns:
+        if self.options[name]['dynamic_bbc']:
+          self.update_bottom_bc(name)
+      for name in columns:
+        options = self.options[name]
+        self.modules[name].timestep(
+            wA=self.wA[name],
+            dt=dt,
+            do_conv=options['do_conv'],
+            scheme=options['scheme']
+        )
+      for name in self.mixed_layers:
+        for coupler in self.couplers:
+          left, right = self.neighbors[coupler]
+          if left == name:
+            self.modules[name].timestep(
+                b_basin=self.modules[right].b,
+                Psi_b=self.modules[coupler].Psi,
+                dt=dt,
+                advection=self.options[name]['advection']
+            )
+    self.iteration += nsteps
+    self.time += nsteps * dt
+
+  def snapshot_fields(self):
+    r"""
+    Collect the current values of the diagnostic fields of all modules.
+
+    Returns
+    -------
+
+    fields : dict
+             The buoyancy in each column ('<name>.b') and mixed layer ('<name>.bs'), the
+             overturning of each closure ('<name>.Psi'), and the isopycnal overturning and
+             buoyancy grid of remapped thermal wind closures ('<name>.Psib', '<name>.bgrid').
+
+    """
+
+    fields = {}
+    for name in self.columns:
+      fields[name + '.b'] = self.modules[name].b
+    for name in self.mixed_layers:
+      fields[name + '.bs'] = self.modules[name].bs
+    for name in self.couplers:
+      module = self.modules[name]
+      fields[name + '.Psi'] = module.Psi
+      if self.types[name] is Psi_Thermwind and self.options[name]['remap']:
+        fields[name + '.Psib'] = module.Psib(nb=self.options[name]['nb'])
+        fields[name + '.bgrid'] = module.bgrid
+    return fields
+
+  def run(
+      self,
+      steps,
+      dt,
+      coupler_iters=1,
+      snapshot_iters=None,
+      advance=False,
+      diagnostics=None,
+      checkpoint_iters=None,
+      checkpoint_file=None
+  ):
+    r"""
+    Integrate the coupled model. The closures are updated every coupler_iters timesteps,
+    starting with the first timestep, and the basins are stepped with the vertical
+    velocities from the latest update. The model time and iteration count are
+    carried over between calls.
+
+    Parameters
+    ----------
+
+    steps : int
+            Number of timesteps.
+    dt : float
+         Timestep. Units: s
+    coupler_iters : int; optional
+                    Number of timesteps between updates of the closures.
+    snapshot_iters : int; optional
+                     Number of timesteps between snapshots of the diagnostic fields from
+                     :meth:`pymoc.Model.snapshot_fields`, which are taken right after the
+                     closures are updated, and need to be a multiple of coupler_iters.
+                     The snapshots are stored in preallocated arrays in :attr:`snapshots`,
+                     along with the model 'time', with the snapshot as the first dimension.
+    advance : logical; optional
+              Whether to integrate columns over each coupling interval at once,
+              as described in :meth:`pymoc.Model.step`.
+    diagnostics : DiagnosticsWriter; optional
+                  If given, the snapshots are appended to this
+                  :class:`pymoc.DiagnosticsWriter` as they are taken, rather than stored
+                  in :attr:`snapshots`.
+    checkpoint_iters : int; optional
+                       Number of timesteps between checkpoints, which are written to
+                       checkpoint_file with :meth:`pymoc.Model.checkpoint` (along with the
+                       position of the diagnostics) right before the closures are updated,
+                       and need to be a multiple of coupler_iters. No checkpoint is written
+                       at the first timestep of the run.
+    checkpoint_file : string; optional
+                      Path of the checkpoint file, which is replaced by each checkpoint.
+
+    """
+
+    if snapshot_iters is not None and snapshot_iters % coupler_iters != 0:
+      raise TypeError('snapshot_iters needs to be a multiple of coupler_iters')
+    if checkpoint_iters is not None:
+      if checkpoint_iters % coupler_iters != 0:
+        raise TypeError('checkpoint_iters needs to be a multiple of coupler_iters')
+      if checkpoint_file is None:
+        raise TypeError('checkpoint_iters requires a checkpoint_file')
+
+    self.snapshots = {}
+    start = self.iteration
+    if snapshot_iters is not None and diagnostics is None:
+      nsnap = len(
+          [ii for ii in range(start, start + steps) if ii % snapshot_iters == 0]
+      )
+      isnap = 0
+
+    end = start + steps
+    while self.iteration < end:
+      if (
+          checkpoint_iters is not None and self.iteration != start
+          and self.iteration % checkpoint_iters == 0
+      ):
+        self.checkpoint(checkpoint_file, diagnostics=diagnostics)
+      if self.iteration % coupler_iters == 0 or any(
+          psi is None for psi in self.Psi_coupled.values()
+      ):
+        self.update_couplers()
+      if snapshot_iters is not None and self.iteration % snapshot_iters == 0:
+        fields = self.snapshot_fields()
+        if diagnostics is not None:
+          diagnostics.append(time=self.time, **fields)
+        else:
+          if isnap == 0:
+            for key in fields:
+              self.snapshots[key] = np.zeros((nsnap, ) + np.shape(fields[key]))
+            self.snapshots['time'] = np.zeros(nsnap)
+          for key in fields:
+            self.snapshots[key][isnap] = fields[key]
+          self.snapshots['time'][isnap] = self.time
+          isnap += 1
+      nsteps = min(
+          coupler_iters - self.iteration % coupler_iters, end - self.iteration
+      )
+      self.step(dt, nsteps=nsteps, advance=advance)
+
+  def checkpoint(self, path, diagnostics=None):
+    r"""
+    Write the full state of the model to a checkpoint file, from which the integration
+    can be resumed with :meth:`pymoc.Model.restart`. The checkpoint contains the model
+    time and iteration count, the buoyancy, boundary conditions and (with **dynamic_bbc**)
+    the choice of diffusivity of each column, the surface buoyancy and transport of each
+    mixed layer, the overturning (and for Psi_SO its Ekman and eddy components) and the
+    buoyancy inputs of each closure, and the vertical velocities and coupled overturning
+    of the latest update of the closures. The file is written to a temporary
+    file first, which is moved into place once it is complete, so that an interrupted
+    checkpoint leaves the previous one intact.
+
+    Parameters
+    ----------
+
+    path : string
+           Path of the checkpoint file (in numpy's ``.npz`` format).
+    diagnostics : DiagnosticsWriter; optional
+                  Diagnostics of the run, which are flushed, and whose number of snapshots
+                  is stored along with the state.
+
+    """
+
+    state = {'iteration': self.iteration, 'time': self.time}
+    if diagnostics is not None:
+      diagnostics.flush()
+      state['diagnostics.count'] = diagnostics.count
+    for name in self.columns:
+      column = self.modules[name]
+      state[name + '.b'] = column.b
+      state[name + '.bz'] = column.bz
+      state[name + '.bs'] = column.bs
+      state[name + '.bbot'] = column.bbot
+      if column.bzbot is not None:
+        state[name + '.bzbot'] = column.bzbot
+      state[name + '.wA'] = self.wA[name]
+      if name in self.bottom_inflow:
+        state[name + '.bottom_inflow'] = self.bottom_inflow[name]
+    for name in self.mixed_layers:
+      module = self.modules[name]
+      state[name + '.bs'] = module.bs
+      if module.Psi_s is not None:
+        state[name + '.Psi_s'] = module.Psi_s
+    for name in self.couplers:
+      module = self.modules[name]
+      if hasattr(module, 'Psi'):
+        state[name + '.Psi'] = module.Psi
+      if self.Psi_coupled[name] is not None:
+        state[name + '.Psi_coupled'] = np.array(self.Psi_coupled[name])
+      # the inputs of the closures, which are not all taken from their neighbors
+      # (e.g. the surface buoyancy of a Psi_SO without a mixed layer):
+      if self.types[name] is Psi_Thermwind:
+        inputs = {'b1': (module.b1, module.z), 'b2': (module.b2, module.z)}
+      else:
+        inputs = {'b': (module.b, module.z), 'bs': (module.bs, module.y)}
+        for field in ['Psi_Ek', 'Psi_GM']:
+          if hasattr(module, field):
+            state[name + '.' + field] = getattr(module, field)
+      for field, (func, grid) in inputs.items():
+        values, axis = gridded(func, grid)
+        state[name + '.' + field] = values
+        state[name + '.' + field + '.axis'] = axis
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+      np.savez(f, **state)
+      f.flush()
+      os.fsync(f.fileno())
+    replace_file(tmp, path)
+
+  def restart(self, path, diagnostics=None):
+    r"""
+    Restore the state of the model from a checkpoint written by
+    :meth:`pymoc.Model.checkpoint`, for a model that has been set up with the same modules
+    and options. Integrating the restored model reproduces the original integration
+    exactly.
+
+    Parameters
+    ----------
+
+    path : string
+           Path of the checkpoint file.
+    diagnostics : DiagnosticsWriter; optional
+                  Diagnostics of the run, which are truncated to the snapshots taken up to
+                  the checkpoint (see :meth:`pymoc.DiagnosticsWriter.truncate`).
+
+    """
+
+    with np.load(path) as state:
+      self.iteration = int(state['iteration'])
+      self.time = float(state['time'])
+      for name in self.columns:
+        column = self.modules[name]
+        column.b = state[name + '.b'].copy()
+        column.bz = state[name + '.bz'].copy()
+        column.bs = float(state[name + '.bs'])
+        column.bbot = float(state[name + '.bbot'])
+        if name + '.bzbot' in state:
+          column.bzbot = float(state[name + '.bzbot'])
+        else:
+          column.bzbot = None
+        self.wA[name][:] = state[name + '.wA']
+        if name + '.bottom_inflow' in state:
+          inflow = bool(state[name + '.bottom_inflow'])
+          self.bottom_inflow[name] = inflow
+          options = self.options[name]
+          kappa = options['kappa_inflow' if inflow else 'kappa_noflux']
+          if kappa is not None and column.kappa is not kappa:
+            column.kappa = kappa
+      for name in self.mixed_layers:
+        module = self.modules[name]
+        module.bs = state[name + '.bs'].copy()
+        if name + '.Psi_s' in state:
+          module.Psi_s = state[name + '.Psi_s'].copy()
+      for name in self.couplers:
+        module = self.modules[name]
+        if name + '.Psi' in state:
+          module.Psi = state[name + '.Psi'].copy()
+        if name + '.Psi_coupled' in state:
+          self.Psi_coupled[name] = list(state[name + '.Psi_coupled'])
+        else:
+          self.Psi_coupled[name] = None
+        # restore the inputs of the closures that have changed since they were set up:
+        if self.types[name] is Psi_Thermwind:
+          inputs = {'b1': (module.b1, module.z), 'b2': (module.b2, module.z)}
+        else:
+          inputs = {'b': (module.b, module.z), 'bs': (module.bs, module.y)}
+          for field in ['Psi_Ek', 'Psi_GM']:
+            if name + '.' + field in state:
+              setattr(module, field, state[name + '.' + field].copy())
+        for field, (func, grid) in inputs.items():
+          if name + '.' + field in state:
+            inputs[field] = restore_gridded(
+                func, grid, state[name + '.' + field],
+                state[name + '.' + field + '.axis']
+            )
+          else:
+            inputs[field] = None
+        module.update(**inputs)
+      if diagnostics is not None and 'diagnostics.count' in state:
+        diagnostics.truncate(int(state['diagnostics.count']))
+
+  def state_arrays(self):
+    r"""
+    List the arrays that make up the prognostic state of the model: the buoyancy
+    profiles of the columns, followed by the surface buoyancy of the mixed layers,
+    in the order in which they were added.
+
+    Returns
+    -------
+
+    state : list of ndarray
+            The state arrays (not copies). Since timestepping may replace the arrays of
+            the modules, they need to be looked up again after the model is integrated.
+
+    """
+
+    return [self.modules[name].b for name in self.columns] + [
+        self.modules[name].bs for name in self.mixed_layers
+    ]
+
+  def solve_equi(
+      self,
+      dt,
+      coupler_iters=1,
+      tol=1e-10,
+      sample_iters=5,
+      nsamples=10,
+      maxiter=100,
+      advance=False
+  ):
+    r"""
+    Solve for the equilibrium of the coupled model, i.e. the state :math:`x` (see
+    :meth:`pymoc.Model.state_arrays`) that is reproduced by integrating the model over
+    one coupling interval of coupler_iters timesteps, :math:`\Phi\left(x\right) = x`.
+
+    Rather than spinning up the model over its slowest adjustment time, the equilibrium
+    is found by reduced rank extrapolation (RRE) of short integrations: starting from
+    :math:`x_0`, the model is integrated for nsamples + 1 samples of sample_iters
+    coupling intervals each, and the next iterate is the combination
+
+    .. math::
+      x = \sum_{i=0}^{k}\gamma_ix_i, \qquad \sum_{i=0}^{k}\gamma_i = 1
+
+    of the sampled states :math:`x_0,\dots,x_k` that minimizes the norm of the combined
+    differences :math:`\sum_i\gamma_i\left(x_{i+1}-x_i\right)`. For a linear model, this is
+    equivalent to solving for the zero of the tendency :math:`\Phi\left(x\right) - x`
+    with GMRES, where the timestepper acts as the preconditioner and no Jacobian is
+    needed. Unlike Newton's method, the extrapolation only ever integrates the model
+    forward, and copes with the discontinuities of the model physics (e.g. convective
+    adjustment and switches of the bottom boundary conditions with **dynamic_bbc**).
+    If an extrapolated state cannot be integrated, or is much further from equilibrium
+    than the best iterate so far, the last sampled state is used instead.
+
+    The state of the model is set to the equilibrium (or the best state found, if the
+    iteration does not converge). The model time and iteration count are left unchanged.
+
+    Parameters
+    ----------
+
+    dt : float
+         Timestep. Units: s
+    coupler_iters : int; optional
+                    Number of timesteps between updates of the closures, i.e. the length
+                    of the coupling interval.
+    tol : float; optional
+          Tolerance for the maximum change of the state over one coupling interval.
+    sample_iters : int; optional
+                   Number of coupling intervals between samples.
+    nsamples : int; optional
+               Number of samples used for each extrapolation.
+    maxiter : int; optional
+              Maximum number of extrapolations.
+    advance : logical; optional
+              Whether to integrate columns over each coupling interval at once,
+              as described in :meth:`pymoc.Model.step`.
+
+    Returns
+    -------
+
+    res : float
+          Maximum change of the state over one coupling interval at the solution.
+
+    """
+
+    iteration, time, snapshots = self.iteration, self.time, self.snapshots
+    splits = np.cumsum([len(a) for a in self.state_arrays()])[:-1]
+
+    def get_state():
+      return np.concatenate(self.state_arrays())
+
+    def set_state(x):
+      for a, xa in zip(self.state_arrays(), np.split(x, splits)):
+        a[:] = xa
+
+    def integrate(x, intervals):
+      set_state(x)
+      self.iteration = 0
+      self.run(
+          intervals * coupler_iters,
+          dt,
+          coupler_iters=coupler_iters,
+          advance=advance
+      )
+      return get_state()
+
+    x = get_state()
+    x_best = x
+    res_best = np.inf
+    fallback = None
+    try:
+      for ii in range(maxiter):
+        try:
+          samples = [x, integrate(x, 1)]
+          res = np.max(np.abs(samples[1] - x))
+        except (ArithmeticError, ValueError, np.linalg.LinAlgError):
+          if fallback is None:
+            raise
+          res = np.nan
+        if not res < 100. * res_best and fallback is not None:
+          # the extrapolation failed - continue from the last sample instead
+          # (extrapolated states need not be closer to equilibrium than the last
+          # iterate, but they should not be far off):
+          x = fallback
+          samples = [x, integrate(x, 1)]
+          res = np.max(np.abs(samples[1] - x))
+        if res < res_best:
+          x_best, res_best = x, res
+        if res < tol:
+          break
+        samples[1] = integrate(samples[1], sample_iters - 1)
+        for jj in range(nsamples):
+          samples.append(integrate(samples[-1], sample_iters))
+        X = np.array(samples).T
+        # RRE: minimize |U gamma| subject to sum(gamma) = 1
+        U = X[:, 1:] - X[:, :-1]
+        R = np.linalg.qr(U, mode='r')
+        ones = np.ones(U.shape[1])
+        rcond = np.finfo(float).eps * U.shape[1]
+        diag = np.abs(np.diag(R))
+        if diag.min() > rcond * diag.max():
+          # solve R^T R y = 1 by two triangular solves, rather than forming R^T R,
+          # which would square the condition number:
+          y = solve_triangular(R, solve_triangular(R, ones, trans='T'))
+        else:
+          # R is rank deficient - use minimum norm solutions instead:
+          y = np.linalg.lstsq(R.T, ones, rcond=rcond)[0]
+          y = np.linalg.lstsq(R, y, rcond=rcond)[0]
+        fallback = X[:, -1]
+        x = np.dot(X[:, :-1], y / np.sum(y))
+        if not np.isfinite(x).all():
+          x = fallback
+    finally:
+      set_state(x_best)
+      self.iteration, self.time, self.snapshots = iteration, time, snapshots
+      self.update_couplers()
+    return res_best
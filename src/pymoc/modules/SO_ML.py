@@ -1,4 +1,6 @@
 import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import splu
 from pymoc.utils import make_array
 
 
@@ -70,6 +72,10 @@ class SO_ML(object):
     self.Psi_s = Psi_s
     self.bs = make_array(bs, self.y, 'bs')
 
+    # LU factorization of the implicit diffusion operator, and the (Ks, dt, dy)
+    # for which it was computed:
+    self._diffusion_lu = None
+
   # def solve_equi(self):
   #Solve for equilibrium solution given inputs
   # raise TypeError('This functionality is not yet implemented')
@@ -133,6 +139,70 @@ class SO_ML(object):
     ) / self.h / self.L / dy
     return dbdt_ad
 
+  def calc_implicit_advection(self, dy, dt):
+    r"""
+    Integrate the advective transport in the Southern Ocean mixed layer over one
+    timestep with an implicit (backward Euler) upwind scheme, which is stable for
+    any timestep. The boundary points are left unchanged, so that the boundary
+    conditions from :meth:`pymoc.modules.SO_ML.set_boundary_conditions` still apply.
+
+    Parameters
+    ----------
+
+    dy: float
+        The horizontal grid spacing for the mixed layer model.
+    dt: float
+        The timestep duration for the mixed layer model.
+
+    Returns
+    -------
+
+    bs: ndarray
+        The advected surface buoyancy profile.
+
+    """
+
+    # Notice that the current implementation assumes an evenly spaced grid!
+    ny = len(self.y)
+    c = self.Psi_s[1:-1] * 1e6 / self.h / self.L * dt / dy
+    lower = np.zeros(ny - 1)
+    diag = np.ones(ny)
+    upper = np.zeros(ny - 1)
+    diag[1:-1] = 1 + np.abs(c)
+    lower[:-1] = -np.maximum(c, 0.)
+    upper[1:] = np.minimum(c, 0.)
+    U = sparse.diags([lower, diag, upper], [-1, 0, 1], format='csc')
+    return splu(U).solve(self.bs)
+
+  def calc_semi_lagrangian_advection(self, dy, dt):
+    r"""
+    Integrate the advective transport in the Southern Ocean mixed layer over one
+    timestep with a semi-Lagrangian scheme, which traces each interior grid point
+    back to its departure point and linearly interpolates the surface buoyancy
+    there. Departure points outside the domain take the boundary values set by
+    :meth:`pymoc.modules.SO_ML.set_boundary_conditions`, which are left unchanged.
+
+    Parameters
+    ----------
+
+    dy: float
+        The horizontal grid spacing for the mixed layer model.
+    dt: float
+        The timestep duration for the mixed layer model.
+
+    Returns
+    -------
+
+    bs: ndarray
+        The advected surface buoyancy profile.
+
+    """
+
+    bs = self.bs.copy()
+    v = self.Psi_s[1:-1] * 1e6 / self.h / self.L
+    bs[1:-1] = np.interp(self.y[1:-1] - v*dt, self.y, self.bs)
+    return bs
+
   def calc_diffusion_matrix(self, s):
     r"""
     Compute the forward time centered space (FTCS) coeffient matrix for the implicit diffusion scheme, based on
@@ -171,7 +241,9 @@ class SO_ML(object):
     .. math::
         \left[\partial_tb_{SO}\right]_{di\hspace{-0.1em}f\hspace{-0.2em}f} = \partial_y\left(K_s\partial_yb_{SO}\right)
 
-    via an implicit scheme and apply it to the surface buoyancy.
+    via an implicit (Crank-Nicolson) scheme and apply it to the surface buoyancy.
+    The factorization of the tridiagonal system is computed once, and reused for as long
+    as Ks, dt and dy are unchanged, so that each step costs O(ny).
 
     Parameters
     ----------
@@ -189,16 +261,51 @@ class SO_ML(object):
     """
 
     s = self.Ks * dt / dy**2
-    U = self.calc_diffusion_matrix(s)
-    V = self.calc_diffusion_matrix(-s)
-    Uinv = np.linalg.inv(U)
+    key = (self.Ks, dt, dy, len(self.y))
+    if self._diffusion_lu is None or self._diffusion_lu[0] != key:
+      self._diffusion_lu = [key, self.calc_diffusion_lu(s)]
+    lu = self._diffusion_lu[1]
+
+    # apply the explicit half of the Crank-Nicolson scheme (the boundary points are fixed):
+    rhs = self.bs.copy()
+    rhs[1:-1] = (1-s) * self.bs[1:-1] + s / 2. * (self.bs[:-2] + self.bs[2:])
 
-    return np.dot(np.dot(Uinv, V), self.bs)
+    return lu.solve(rhs)
 
-  def advdiff(self, b_basin, Psi_b, dt):
+  def calc_diffusion_lu(self, s):
+    r"""
+    Compute the sparse LU factorization of the banded coefficient matrix from
+    :meth:`pymoc.modules.SO_ML.calc_diffusion_matrix`, for the implicit half of the
+    Crank-Nicolson diffusion scheme.
+
+    Parameters
+    ----------
+    s: float
+       Stability criterion for FTCS implicit solution.
+
+    Returns
+    -------
+    lu: scipy.sparse.linalg.SuperLU
+        The LU factorization, which provides a solve method.
+
+    """
+    ny = len(self.y)
+    lower = -s / 2. * np.ones(ny - 1)
+    diag = (1+s) * np.ones(ny)
+    upper = -s / 2. * np.ones(ny - 1)
+    diag[0] = 1
+    upper[0] = 0
+    lower[-1] = 0
+    diag[-1] = 1
+    U = sparse.diags([lower, diag, upper], [-1, 0, 1], format='csc')
+    return splu(U)
+
+  def advdiff(self, b_basin, Psi_b, dt, advection='upwind'):
     r"""
     Compute and apply advective-diffusive transport to the Souther Ocean Mixed Layer model,
-    based on conditions in the adjoining basin.
+    based on conditions in the adjoining basin. Diffusion is always implicit, and advection
+    can be either explicit upwind (the default), or one of the unconditionally stable implicit
+    upwind and semi-Lagrangian schemes, which are not limited by the advective CFL criterion.
 
     Parameters
     ----------
@@ -209,8 +316,16 @@ class SO_ML(object):
             The transport streamfunction in the Southern Ocean. Units: Sv
     dt: float
         The timestep duration for the mixed layer model.
+    advection: string; optional
+               The advection scheme, either 'upwind', 'implicit' or 'semi_lagrangian'.
+               Defaults to 'upwind'.
 
     """
+    if advection not in ['upwind', 'implicit', 'semi_lagrangian']:
+      raise TypeError(
+          "advection needs to be 'upwind', 'implicit' or 'semi_lagrangian'"
+      )
+
     # update surface buoyancy profile via advect. and diff
 
     # First we need to determine Psi at the surface in the ML:
@@ -251,12 +366,20 @@ class SO_ML(object):
         self.b_rest - self.bs
     )
 
-    # Compute advective tendency via upwind advection
     dy = self.y[1] - self.y[0]
-    dbdt_ad = self.calc_advective_tendency(dy)
-
-    # add tendencies from surface flux and advection
-    self.bs = self.bs + dt * (dbdt_flux+dbdt_ad)
+    if advection == 'upwind':
+      # Compute advective tendency via upwind advection
+      dbdt_ad = self.calc_advective_tendency(dy)
+
+      # add tendencies from surface flux and advection
+      self.bs = self.bs + dt * (dbdt_flux+dbdt_ad)
+    elif advection == 'implicit':
+      # add tendency from surface flux, then advect implicitly
+      self.bs = self.bs + dt*dbdt_flux
+      self.bs = self.calc_implicit_advection(dy, dt)
+    else:
+      # advect along trajectories, then add tendency from surface flux
+      self.bs = self.calc_semi_lagrangian_advection(dy, dt) + dt*dbdt_flux
 
     #re-set southern boundary condition
     #(the above does not modify the boundary gridpoints,
@@ -273,7 +396,7 @@ class SO_ML(object):
     # (preferable e.g. for computation of streamfunction)
     self.set_boundary_conditions(b_basin, Psi_b)
 
-  def timestep(self, b_basin=None, Psi_b=None, dt=1.):
+  def timestep(self, b_basin=None, Psi_b=None, dt=1., advection='upwind'):
     r"""
     Integrate the mixed layer buoyancy profile for one timestep.
 
@@ -286,6 +409,9 @@ class SO_ML(object):
             The transport streamfunction in the Southern Ocean. Units: Sv
     dt: float
         The timestep duration for the mixed layer model.
+    advection: string; optional
+               The advection scheme, either 'upwind', 'implicit' or 'semi_lagrangian'.
+               Defaults to 'upwind'.
 
     """
 
@@ -300,4 +426,4 @@ class SO_ML(object):
           'Psi_b needs to be numpy array providing overturning at buoyancy levels given by b_basin'
       )
 
-    self.advdiff(b_basin=b_basin, Psi_b=Psi_b, dt=dt)
+    self.advdiff(b_basin=b_basin, Psi_b=Psi_b, dt=dt, advection=advection)
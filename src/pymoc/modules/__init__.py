@@ -1,5 +1,6 @@
 __version__ = '0.0.1rc5'
 from .column import Column
+from .column_ensemble import ColumnEnsemble
 from .equi_column import Equi_Column
 from .psi_SO import Psi_SO
 from .psi_thermwind import Psi_Thermwind
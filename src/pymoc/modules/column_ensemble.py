@@ -0,0 +1,372 @@
+import numpy as np
+from pymoc.utils import make_array, check_numpy_version
+
+
+class ColumnEnsemble(object):
+  r"""
+  Ensemble of Vertical Advection-Diffusion Column Models
+
+  Instances of this class represent a set of independent 1D water columns, governed by
+  the same vertical advection-diffusion physics as :class:`pymoc.modules.Column`, which
+  share a vertical grid but can have different diffusivity, area, boundary conditions and
+  buoyancy profiles. All members are time-stepped together in vectorized operations on
+  arrays of shape :func:`(n_members, len(z))`, which avoids the per-column overhead of
+  looping over many small Column instances (e.g. in parameter sweeps). The results
+  are identical to stepping each member as a Column with the explicit scheme.
+  """
+  def __init__(
+      self,
+      z=None,    # grid (input)
+      n_members=None,    # number of ensemble members (input)
+      kappa=None,    # diffusivity profiles (input)
+      bs=0.025,    # surface buoyancy bound. cond (input)
+      bbot=0.0,    # bottom buoyancy boundary condition (input)
+      bzbot=None,    # bottom strat. as alternative boundary condition (input)
+      b=0.0,    # Buoyancy profiles (input, output)
+      Area=None,    # Horizontal area (can be function of depth)
+      N2min=1e-7    # Minimum strat. for conv adjustment
+  ):
+    r"""
+    Parameters
+    ----------
+
+    z : ndarray
+        Vertical depth levels of the column grid, shared by all members. Units: m
+    n_members : int; optional
+                Number of ensemble members. If not given, it is inferred from the first
+                dimension of any 2D array in **kappa**, **Area** or **b**, or the length
+                of any array in **bs**, **bbot**, **bzbot** or **N2min**.
+    kappa : float, function, or ndarray
+            Vertical diffusivity profiles. A float, function or 1D array on the grid is
+            used for all members, a 2D array provides one profile per member. Units: m\ :sup:`2`/s
+    bs : float or ndarray
+         Surface level buoyancy boundary condition, for all or for each member. Units: m/s\ :sup:`2`
+    bbot : float or ndarray; optional
+           Bottom level buoyancy boundary condition, for all or for each member. Units: m/s\ :sup:`2`
+    bzbot : float or ndarray; optional
+            Bottom level buoyancy stratification, for all or for each member. Can be used as an
+            alternative to **bbot**. Members with a NaN entry use **bbot** instead. Units: s\ :sup:`-2`
+    b : float, function, or ndarray
+        Initial vertical buoyancy profiles, for all or for each member. Units: m/s\ :sup:`2`
+    Area : float, function, or ndarray
+           Horizontal area of basin, for all or for each member. Units: m\ :sup:`2`
+    N2min : float or ndarray; optional
+            Minimum stratification for convective adjustment, for all or for each member. Units: s\ :sup:`-1`
+    """
+
+    # initialize grid:
+    if isinstance(z, np.ndarray) and len(z) > 0:
+      self.z = z
+    else:
+      raise TypeError('z needs to be numpy array providing grid levels')
+
+    if n_members is None:
+      n_members = self.infer_n_members(
+          [kappa, Area, b], [bs, bbot, bzbot, N2min]
+      )
+    self.n_members = n_members
+
+    self.kappa = kappa
+    self.Area = Area
+
+    self.bs = self.make_member_values(bs, 'bs')
+    self.bbot = self.make_member_values(bbot, 'bbot')
+    self.bzbot = self.make_member_values(
+        np.nan if bzbot is None else bzbot, 'bzbot'
+    )
+    self.N2min = self.make_member_values(N2min, 'N2min')
+
+    self.b = self.make_member_array(b, 'b').copy()
+
+  def infer_n_members(self, profiles, values):
+    r"""
+    Infer the number of ensemble members from the shapes of the inputs.
+
+    Parameters
+    ----------
+
+    profiles : list
+               Inputs that may be given as 2D arrays of shape :func:`(n_members, len(z))`.
+    values : list
+             Inputs that may be given as 1D arrays of length n_members.
+
+    Returns
+    -------
+
+    n_members : int
+                The number of ensemble members. Defaults to 1 if no input has a member dimension.
+
+    """
+
+    for p in profiles:
+      if isinstance(p, np.ndarray) and p.ndim == 2:
+        return p.shape[0]
+    for v in values:
+      if isinstance(v, np.ndarray) and v.ndim == 1:
+        return len(v)
+    return 1
+
+  def make_member_array(self, myst, name):
+    r"""
+    Make an argument of unknown type into an array of profiles of shape
+    :func:`(n_members, len(z))`.
+
+    Parameters
+    ----------
+
+    myst : float, function, or ndarray
+           The argument to be transformed. A float, function or 1D array is evaluated on the grid
+           and used for all members, a 2D array is used as is.
+    name : string
+           Name of the variable being transformed into an array.
+
+    Returns
+    -------
+
+    made_array : ndarray
+                 An array of shape :func:`(n_members, len(z))`.
+
+    """
+
+    if isinstance(myst, np.ndarray) and myst.ndim == 2:
+      if myst.shape != (self.n_members, len(self.z)):
+        raise TypeError(name, 'needs to be of shape (n_members, len(z))')
+      return myst
+    profile = make_array(myst, self.z, name)
+    return np.tile(profile * np.ones(len(self.z)), (self.n_members, 1))
+
+  def make_member_values(self, myst, name):
+    r"""
+    Make a scalar argument into an array with one value per ensemble member.
+
+    Parameters
+    ----------
+
+    myst : float or ndarray
+           The argument to be transformed.
+    name : string
+           Name of the variable being transformed into an array.
+
+    Returns
+    -------
+
+    made_array : ndarray
+                 An array of length n_members.
+
+    """
+
+    values = np.asarray(myst, dtype=float)
+    if values.ndim == 0:
+      return np.full(self.n_members, float(values))
+    if values.shape != (self.n_members, ):
+      raise TypeError(name, 'needs to be a float or an array of length n_members')
+    return values.copy()
+
+  @property
+  def kappa(self):
+    r"""
+    Vertical diffusivity profiles of all members, of shape :func:`(n_members, len(z))`.
+    The derived coefficients are updated when kappa is assigned, so profiles need to be
+    reassigned (rather than modified in place) to take effect. Units: m\ :sup:`2`/s
+    """
+    return self._kappa
+
+  @kappa.setter
+  def kappa(self, kappa):
+    self._kappa = self.make_member_array(kappa, 'kappa')
+    self.update_coeffs()
+
+  @property
+  def Area(self):
+    r"""
+    Horizontal area profiles of all members, of shape :func:`(n_members, len(z))`.
+    The derived coefficients are updated when Area is assigned. Units: m\ :sup:`2`
+    """
+    return self._Area
+
+  @Area.setter
+  def Area(self, Area):
+    self._Area = self.make_member_array(Area, 'Area')
+    self.update_coeffs()
+
+  def update_coeffs(self):
+    r"""
+    Recompute the area integrated diffusivity gradient :math:`\partial_z\left(A\kappa\right)`
+    of all members, and the grid spacings used in the time-stepping scheme.
+    """
+
+    if not hasattr(self, '_kappa') or not hasattr(self, '_Area'):
+      return
+    if not check_numpy_version():
+      raise ImportError(
+          'You need NumPy version 1.13.0 or later. Please upgrade your NumPy libary.'
+      )
+    self.dz = self.z[1:] - self.z[:-1]
+    self.dz_c = 0.5 * (self.dz[1:] + self.dz[:-1])
+    self.dAkappa_dz = np.gradient(self._Area * self._kappa, self.z, axis=1)
+
+  @classmethod
+  def from_columns(cls, columns):
+    r"""
+    Create an ensemble from a list of :class:`pymoc.modules.Column` instances on the
+    same grid, using their current diffusivity, area, boundary conditions and buoyancy profiles.
+
+    Parameters
+    ----------
+
+    columns : list
+              Column instances to be combined into an ensemble.
+
+    Returns
+    -------
+
+    ensemble : ColumnEnsemble
+               An ensemble with one member per column.
+
+    """
+
+    z = columns[0].z
+    coeffs = [column.grid_coeffs() for column in columns]
+    return cls(
+        z=z,
+        n_members=len(columns),
+        kappa=np.array([c['kappa'] for c in coeffs]),
+        Area=np.array([c['Area'] for c in coeffs]),
+        bs=np.array([column.bs for column in columns]),
+        bbot=np.array([column.bbot for column in columns]),
+        bzbot=np.array([
+            np.nan if column.bzbot is None else column.bzbot
+            for column in columns
+        ]),
+        b=np.array([column.b for column in columns]),
+        N2min=np.array([column.N2min for column in columns])
+    )
+
+  def vertadvdiff(self, wA, dt, do_conv=False):
+    r"""
+    Calculate and apply the forcing from advection and diffusion on the vertical buoyancy
+    profiles of all members, for the timestepping solution, using the upwind advection
+    scheme of :meth:`pymoc.modules.Column.vertadvdiff`.
+
+    Parameters
+    ----------
+
+    wA : float or ndarray
+         Area integrated velocity profiles, for all or for each member. Units: m\ :sup:`3`/s
+    dt : int
+         Numerical timestep over which solution are iterated. Units: s
+    do_conv : logical
+              Whether convective adjustment (which sets the upper boundary condition) has been
+              carried out before this step.
+
+    """
+
+    wA = self.make_member_array(wA, 'wA')
+    dz = self.dz
+
+    # apply boundary conditions:
+    if not do_conv:    # if we use convection, upper BC is already applied there
+      self.b[:, -1] = self.bs
+    self.b[:, 0] = np.where(
+        np.isnan(self.bzbot), self.bbot,
+        self.b[:, 1] - self.bzbot * dz[0]
+    )
+
+    bz = (self.b[:, 1:] - self.b[:, :-1]) / dz
+    bz_up = bz[:, 1:]
+    bz_down = bz[:, :-1]
+    bzz = (bz_up-bz_down) / self.dz_c
+
+    #upwind advection:
+    weff = wA - self.dAkappa_dz
+    bz = np.where(weff[:, 1:-1] < 0, bz_up, bz_down)
+
+    db_dt = (
+        -weff[:, 1:-1] * bz / self._Area[:, 1:-1] +
+        self._kappa[:, 1:-1] * bzz
+    )
+    self.b[:, 1:-1] = self.b[:, 1:-1] + dt*db_dt
+
+  def convect(self):
+    r"""
+    Carry out downward convective adustment of the vertical buoyancy profiles of all members
+    to their minimum stratification, as in :meth:`pymoc.modules.Column.convect`.
+
+    """
+
+    ind = self.b > self.bs[:, np.newaxis]
+    conv = ind.any(axis=1)
+    # z_conv is top-most non-convetive layer (set to bottom of the ocean if all convecting):
+    zconv = np.where(
+        np.invert(ind).any(axis=1),
+        np.max(np.where(ind, -np.inf, self.z), axis=1), self.z[0]
+    )
+    b_conv = self.bs[:, np.newaxis] + self.N2min[:, np.newaxis] * (
+        self.z - zconv[:, np.newaxis]
+    )
+    self.b = np.where(ind, b_conv, self.b)
+    # if no convection simply set bs as upper BC
+    self.b[~conv, -1] = self.bs[~conv]
+
+  def horadv(self, vdx_in, b_in, dt):
+    r"""
+    Carry out horizontal buoyancy advection into the columns of all members, as in
+    :meth:`pymoc.modules.Column.horadv`.
+
+    Parameters
+    ----------
+
+    vdx_in : float or ndarray
+             Total advective transport per unit height into the columns, for all or for each member.
+             Positive values indicate transport into the column. Units: m\ :sup:`2`/s
+    b_in : float or ndarray
+           Buoyancy vales from the adjoining module, for all or for each member. Units: m/s\ :sup:`2`
+    dt : int
+         Numerical timestep over which solution are iterated. Units: s
+
+    """
+
+    vdx_in = self.make_member_array(vdx_in, 'vdx_in')
+    b_in = self.make_member_array(b_in, 'b_in')
+
+    adv_idx = vdx_in > 0.0
+    db = b_in - self.b
+
+    self.b = np.where(
+        adv_idx, self.b + dt * vdx_in * db / self._Area, self.b
+    )
+
+  def timestep(self, wA=0., dt=1., do_conv=False, vdx_in=None, b_in=None):
+    r"""
+    Carry out one timestep integration for the buoyancy profiles of all members, accounting
+    for advective, diffusive, and convective effects.
+
+    Parameters
+    ----------
+
+    wA : float or ndarray
+         Area integrated velocity profiles, for all or for each member. Units: m\ :sup:`3`/s
+    dt : int
+         Numerical timestep over which solution are iterated. Units: s
+    do_conv : logical
+              Whether to carry out convective adjustment during model integration.
+    vdx_in : float or ndarray
+             Total advective transport per unit height into the columns, for all or for each member.
+             Positive values indicate transport into the column. Units: m\ :sup:`2`/s
+    b_in : float or ndarray
+           Buoyancy vales from the adjoining module, for all or for each member. Units: m/s\ :sup:`2`
+
+    """
+    if do_conv:
+      # do convection: (optional)
+      self.convect()
+
+    # do vertical advection and diffusion
+    self.vertadvdiff(wA=wA, dt=dt, do_conv=do_conv)
+
+    if vdx_in is not None:
+      # do horizontal advection: (optional)
+      if b_in is not None:
+        self.horadv(vdx_in=vdx_in, b_in=b_in, dt=dt)
+      else:
+        raise TypeError('b_in is needed if vdx_in is provided')
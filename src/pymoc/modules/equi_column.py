@@ -148,13 +148,47 @@ class Equi_Column(object):
     if callable(kappa) and callable(dkappa_dz):
       return lambda z, H: dkappa_dz(z * H) / (H * self.f)
     elif callable(kappa):
-      return lambda z, H: np.gradient(kappa(z * H), z * H) / (H * self.f)
+      # differentiate kappa numerically on a fine table in dimensional depth, which is
+      # built once (and only extended if a deeper cell is encountered):
+      self._dkappa_dz_table = None
+      return lambda z, H: np.interp(
+          z * H, *self.calc_dkappa_dz_table(kappa, np.min(z * H))
+      ) / (H * self.f)
     elif isinstance(kappa, np.ndarray):
       dkappa_dz = np.gradient(kappa, self.z)
       return lambda z, H: np.interp(z * H, self.z, dkappa_dz) / (H * self.f)
     else:
       return lambda z, H: 0
 
+  def calc_dkappa_dz_table(self, kappa, zmin, dz=1.):
+    r"""
+    Tabulate the vertical diffusivity gradient profile, for a diffusivity profile provided as
+    a function without an analytic derivative. The table is reused for as long as it covers
+    the requested depth range, and is otherwise rebuilt down to twice that depth.
+
+    Parameters
+    ----------
+
+    kappa : function
+            Vertical diffusivity profile. Units: m\ :sup:`2`/s
+    zmin : float
+           The deepest level at which the gradient is needed. Units: m
+    dz : float; optional
+         The vertical resolution of the table. Units: m
+
+    Returns
+    -------
+    z, dkappa_dz : ndarray
+                   The depth levels and the vertical diffusivity gradient at those levels.
+                   Units: m and m/s
+    """
+
+    if self._dkappa_dz_table is None or self._dkappa_dz_table[0][0] > zmin:
+      zbot = 2 * min(zmin, -1.)
+      z = np.linspace(zbot, 0, int(np.ceil(-zbot / dz)) + 1)
+      self._dkappa_dz_table = [z, np.gradient(kappa(z), z, edge_order=2)]
+    return self._dkappa_dz_table
+
   # Initialize Southern Ocean Streamfunction
   def init_psi_so(self, psi_so=None):
     r"""
@@ -359,6 +393,60 @@ class Equi_Column(object):
           'Must provide a p array if column does not have an H value'
       )
 
+  def bc_jac(self, ya, yb, p=None):
+    r"""
+    Calculate the Jacobians of the boundary conditions defined by
+    :meth:`pymoc.modules.Equi_Column.bc` with respect to the solution at the boundaries
+    and, if the depth of the cell is solved for, with respect to :math:`H`.
+
+    Parameters
+    ----------
+
+    ya : ndarray
+         Bottom boundary condition. Units:
+    yb : ndarray
+         Surface boundary condition. Units:
+    p : ndarray
+        Initial guess for the unknown parameter, H, if not specified at model initialization. Units: m
+
+    Returns
+    -------
+
+    bc_jac : tuple
+             The derivatives of the boundary conditions with respect to ya and yb, and, if
+             :math:`H` is solved for, with respect to :math:`H`.
+
+    """
+    if self.H is None and (p is None or len(p) == 0):
+      raise TypeError(
+          'Must provide a p array if column does not have an H value'
+      )
+    bbot_set = getattr(self, 'b_bot', None) is not None
+    d = p[0] if self.H is None else self.H
+    nbc = 4 if self.H is not None else 5
+    dbc_dya = np.zeros((nbc, 4))
+    dbc_dyb = np.zeros((nbc, 4))
+    dbc_dp = np.zeros((nbc, 1))
+    dbc_dya[0, 0] = 1
+    dbc_dyb[1, 0] = 1
+    if self.H is None:
+      dbc_dya[2, 1] = 1
+    if bbot_set:
+      dbc_dya[-2, 2] = 1
+      dbc_dp[-2, 0] = self.b_bot / d**2
+    else:
+      dbc_dya[-2, 3] = 1
+      # the dimensional bz is B_int/(f^2*A*kappa(-H)):
+      dbc_dp[-2, 0] = self.bz(d) * self.dkappa_dz(-1, d) / (
+          d * self.kappa(-1, d)
+      )
+    dbc_dyb[-1, 2] = 1
+    dbc_dp[-1, 0] = self.bs / d**2
+
+    if self.H is None:
+      return dbc_dya, dbc_dyb, dbc_dp
+    return dbc_dya, dbc_dyb
+
   def ode(self, z, y, p=None):
     r"""
     Generate the ordinary differential equation for the equilibrium column overturning streamfunction,
@@ -400,11 +488,147 @@ class Equi_Column(object):
       raise TypeError(
           'Must provide a p array if column does not have an H value'
       )
+    alpha, psi_so, dkappa_dz = self.calc_coeffs(z, H)
     return np.vstack((
-        y[1], y[2], y[3], self.alpha(z, H) * y[3] *
-        (y[0] - self.psi_so(z, H) - self.A * self.dkappa_dz(z, H) / (H**2))
+        y[1], y[2], y[3],
+        alpha * y[3] * (y[0] - psi_so - self.A * dkappa_dz / (H**2))
     ))
 
+  def calc_coeffs(self, z, H):
+    r"""
+    Evaluate the nondimensional coefficients of :meth:`pymoc.modules.Equi_Column.ode` on the
+    solver's mesh. solve_bvp evaluates the ode repeatedly on the same mesh and with the same
+    :math:`H` (e.g. while estimating Jacobians), so the coefficients for the last mesh are
+    kept and reused until the mesh, :math:`H` or any of the parameters change. With a
+    fixed :math:`H`, the diffusivity profile is thus only evaluated once for each mesh of
+    the solver. The diffusivity itself is not tabulated, so that functions are evaluated
+    exactly, and arrays are interpolated from the column grid.
+
+    Parameters
+    ----------
+
+    z : ndarray
+        Nondimensional vertical levels.
+    H : float
+        Depth of the upper cell. Units: m
+
+    Returns
+    -------
+    coeffs : list
+             The values of :math:`\alpha`, the nondimensionalized :math:`\Psi_{SO}` and the
+             nondimensionalized :math:`\partial_z\kappa` at **z**.
+
+    """
+
+    key = (
+        H, np.asarray(z).tobytes(), self.A, self.f, self.kappa, self.dkappa_dz,
+        self.psi_so
+    )
+    cached = getattr(self, '_coeffs', None)
+    if cached is None or cached[0] != key:
+      # kappa is evaluated only once per mesh and H (alpha is computed from it directly):
+      kappa = self.kappa(z, H)
+      cached = [
+          key, [H**2 / (self.A * kappa),
+                self.psi_so(z, H),
+                self.dkappa_dz(z, H)]
+      ]
+      self._coeffs = cached
+    return cached[1]
+
+  def ode_jac(self, z, y, p=None):
+    r"""
+    Calculate the Jacobian of the system of equations defined by
+    :meth:`pymoc.modules.Equi_Column.ode` with respect to the solution and, if the depth
+    of the cell is solved for, with respect to :math:`H`. The dependence of :math:`\alpha`
+    on :math:`H` is differentiated analytically, while that of the profiles of
+    :math:`\Psi_{SO}` and :math:`\partial_z\kappa` (whose vertical derivatives are not
+    generally available) is estimated with a single forward difference in :math:`H`.
+
+    Parameters
+    ----------
+
+    z : ndarray
+        Vertical depth levels of column grid on which to solve the ode. Units: m
+    y : ndarray
+        Initial values for the streamfunction and its vertical gradient.
+    p : ndarray
+        Initial guess for the unknown parameter, H, if not specified at model initialization. Units: m
+
+    Returns
+    -------
+    ode_jac : ndarray or tuple
+              The derivative of the ode with respect to y, of shape (4, 4, len(z)), and, if
+              :math:`H` is solved for, also the derivative with respect to :math:`H`, of
+              shape (4, 1, len(z)).
+
+    """
+
+    if self.H is None and p is not None and len(p) > 0:
+      H = p[0]
+    elif self.H is not None:
+      H = self.H
+    else:
+      raise TypeError(
+          'Must provide a p array if column does not have an H value'
+      )
+    alpha, psi_so, dkappa_dz = self.calc_coeffs(z, H)
+    q = y[0] - psi_so - self.A * dkappa_dz / (H**2)
+    df_dy = np.zeros((4, 4, np.size(z)))
+    df_dy[0, 1] = 1
+    df_dy[1, 2] = 1
+    df_dy[2, 3] = 1
+    df_dy[3, 0] = alpha * y[3]
+    df_dy[3, 3] = alpha * q
+    if self.H is not None:
+      return df_dy
+
+    # alpha = H^4*f/(A*kappa(z*H)), where kappa(z, H) = H^2/(A*alpha):
+    dalpha_dH = alpha * (4 - z * dkappa_dz * self.A * alpha / H**2) / H
+    dH = 1e-6 * H
+    dq_dH = -(
+        self.psi_so(z, H + dH) + self.A * self.dkappa_dz(z, H + dH) /
+        (H + dH)**2 - psi_so - self.A * dkappa_dz / (H**2)
+    ) / dH
+    df_dp = np.zeros((4, 1, np.size(z)))
+    df_dp[3, 0] = dalpha_dH * y[3] * q + alpha * y[3] * dq_dH
+    return df_dy, df_dp
+
+  def calc_bvp(self):
+    r"""
+    Solve the boundary value problem defined by :meth:`pymoc.modules.Equi_Column.ode`
+    and :meth:`pymoc.modules.Equi_Column.bc`, with the Jacobians from
+    :meth:`pymoc.modules.Equi_Column.ode_jac` and :meth:`pymoc.modules.Equi_Column.bc_jac`, starting from the mesh **zi** and initial
+    guess **sol_init** (and **H_guess**, if the depth of the cell is solved for).
+
+    Returns
+    -------
+
+    res : Bunch
+          The result returned by scipy.integrate.solve_bvp.
+
+    """
+
+    if self.H is None:
+      return integrate.solve_bvp(
+          self.ode,
+          self.bc,
+          self.zi,
+          self.sol_init,
+          p=[self.H_guess],
+          fun_jac=self.ode_jac,
+          bc_jac=self.bc_jac
+      )
+    return integrate.solve_bvp(
+        self.ode,
+        self.bc,
+        self.zi,
+        self.sol_init,
+        p=None,
+        fun_jac=self.ode_jac,
+        bc_jac=self.bc_jac
+    )
+
   def solve(self):
     r"""
     Solve for the thermal wind overturning streamfunction as a boundary value problem
@@ -412,15 +636,23 @@ class Equi_Column(object):
 
     """
 
+    self.set_solution(self.calc_bvp())
+
+  def set_solution(self, res):
+    r"""
+    Set the depth of the cell, and the streamfunction and buoyancy profiles on
+    the output grid, from a solution of the boundary value problem.
+
+    Parameters
+    ----------
+
+    res : Bunch
+          The result returned by scipy.integrate.solve_bvp.
+
+    """
+
     if self.H is None:
-      res = integrate.solve_bvp(
-          self.ode, self.bc, self.zi, self.sol_init, p=[self.H_guess]
-      )
       self.H = res.p[0]
-    else:
-      res = integrate.solve_bvp(
-          self.ode, self.bc, self.zi, self.sol_init, p=None
-      )
 
     # if self.z does not yet exist use mesh from solver:
     if self.z is None:
@@ -433,3 +665,124 @@ class Equi_Column(object):
       self.psi[self.z < -self.H] = np.NaN
       self.b = -res.sol(self.z / self.H)[2, :] * self.f**2 * self.H
       self.b[self.z < -self.H] = np.NaN
+
+  def set_param(self, param, value):
+    r"""
+    Set one of the physical parameters of the column.
+
+    Parameters
+    ----------
+
+    param : string
+            The name of the parameter, which is one of 'b_s', 'b_bot', 'B_int', 'A',
+            'kappa' or 'psi_so'.
+    value : float, function, or ndarray
+            The new value of the parameter, in the same form as accepted by the
+            constructor. Setting 'B_int' replaces a bottom buoyancy boundary
+            condition with the buoyancy flux condition.
+
+    """
+
+    if param == 'b_s':
+      self.bs = -value / self.f**2
+    elif param == 'b_bot':
+      self.b_bot = -value / self.f**2
+    elif param == 'B_int':
+      # the bottom buoyancy takes precedence over the buoyancy flux, so drop it:
+      self.b_bot = None
+      self.B_int = value
+    elif param == 'A':
+      self.A = value
+    elif param == 'kappa':
+      self.kappa = self.init_kappa(value)
+      self.dkappa_dz = self.init_dkappa_dz(value)
+    elif param == 'psi_so':
+      self.init_psi_so(value)
+    else:
+      raise TypeError(
+          "param needs to be one of 'b_s', 'b_bot', 'B_int', 'A', 'kappa' or 'psi_so'"
+      )
+
+  def sweep(self, param, values, min_step=1. / 64):
+    r"""
+    Solve for the equilibrium column along a path of parameter values, using numerical
+    continuation. Each solve is initialized with the mesh, solution and cell depth from
+    the previously converged solve, rather than the generic guess from
+    :meth:`pymoc.modules.Equi_Column.calc_sol_init`. If a solve fails, the parameter step
+    is halved, down to **min_step**, by blending linearly between neighboring values,
+    and a RuntimeError is raised if the solve still fails. The column is left in the
+    state of the last solve.
+
+    Parameters
+    ----------
+
+    param : string
+            The name of the parameter to be varied, which is one of 'b_s', 'b_bot',
+            'B_int', 'A', 'kappa' or 'psi_so'.
+    values : list
+             The path of parameter values, in the same form as accepted by the constructor.
+    min_step : float; optional
+               The smallest fraction of the step between two values to be attempted.
+               Defaults to 1/64.
+
+    Returns
+    -------
+
+    psi : ndarray
+          The overturning streamfunction for each value, of shape (len(values), len(z)). Units: Sv
+    b : ndarray
+        The buoyancy profile for each value, of shape (len(values), len(z)). Units: m/s\ :sup:`2`
+    H : ndarray
+        The depth of the upper cell for each value. Units: m
+
+    """
+
+    if self.z is None:
+      raise TypeError('z needs to be provided to stack solutions from a sweep')
+
+    def blend(v0, v1, t):
+      # linear combination of two parameter values (floats, arrays or functions):
+      if callable(v0) or callable(v1):
+        f0 = v0 if callable(v0) else lambda z: v0
+        f1 = v1 if callable(v1) else lambda z: v1
+        return lambda z: (1-t) * f0(z) + t * f1(z)
+      return (1-t) * v0 + t * v1
+
+    solve_H = self.H is None
+    psi = np.zeros((len(values), len(self.z)))
+    b = np.zeros((len(values), len(self.z)))
+    H = np.zeros(len(values))
+    for ii in range(len(values)):
+      t, step = (1., 1.) if ii == 0 else (0., 1.)
+      while True:
+        t_try = min(t + step, 1.)
+        self.set_param(
+            param, values[ii] if ii == 0 else
+            blend(values[ii - 1], values[ii], t_try)
+        )
+        if solve_H:
+          self.H = None
+        res = self.calc_bvp()
+        if res.success:
+          t = t_try
+          # warm start the next solve from this solution:
+          self.zi = res.x
+          self.sol_init = res.y
+          if solve_H:
+            self.H_guess = res.p[0]
+          if t >= 1.:
+            break
+          step = min(2 * step, 1.)
+        elif ii > 0 and step / 2. >= min_step:
+          step = step / 2.
+        else:
+          raise RuntimeError(
+              'Equi_Column.sweep failed to converge for ' + param +
+              ' at value ' + str(values[ii])
+          )
+      self.set_solution(res)
+      psi[ii] = self.psi
+      b[ii] = self.b
+      H[ii] = self.H
+
+    return psi, b, H
@@ -1,7 +1,7 @@
 # coding: utf-8
 
 import numpy as np
-from scipy import integrate, optimize
+from scipy import integrate, linalg
 from pymoc.utils import make_func
 
 
@@ -89,8 +89,8 @@ class Psi_SO(object):
       )
 
     self.b = make_func(b, self.z, 'b')
-    self.bs = make_func(bs, self.y, 'bs')
-    self.tau = make_func(tau, self.y, 'tau')
+    self.bs = bs
+    self.tau = tau
     self.f = f
     self.rho = rho
     self.L = L
@@ -103,6 +103,163 @@ class Psi_SO(object):
     self.Htaperbot = Htaperbot
     self.smax = smax
 
+  @property
+  def bs(self):
+    r"""
+    Surface buoyancy, as a function of y. Can be assigned a float, function, or ndarray
+    on the meridional grid. Assigning bs rebuilds the lookup table used by
+    :meth:`pymoc.modules.Psi_SO.ys`. Arrays are copied on assignment, so that later
+    changes to the array need to be passed on via :meth:`pymoc.modules.Psi_SO.update`,
+    and the same holds for functions whose values change. Units: m/s\ :sup:`2`
+    """
+    return self._bs
+
+  @bs.setter
+  def bs(self, bs):
+    if isinstance(bs, np.ndarray):
+      bs = bs.copy()
+    self._bs = make_func(bs, self.y, 'bs')
+    self._ys_table = self.calc_ys_table(refine=20 if callable(bs) else 1)
+
+  @property
+  def tau(self):
+    r"""
+    Surface wind stress, as a function of y. Can be assigned a float, function, or ndarray
+    on the meridional grid. Assigning tau rebuilds the table of its cumulative integral
+    used by :meth:`pymoc.modules.Psi_SO.calc_tau_ave`. Units: N/m\ :sup:`2`
+    """
+    return self._tau
+
+  @tau.setter
+  def tau(self, tau):
+    self._tau = make_func(tau, self.y, 'tau')
+    self._tau_table = self.calc_tau_table(refine=20 if callable(tau) else 1)
+
+  def calc_refined_y(self, refine=1):
+    r"""
+    Subdivide each interval of the meridional grid into refine equal parts.
+
+    Parameters
+    ----------
+
+    refine : int; optional
+             Refinement factor of the meridional grid.
+
+    Returns
+    -------
+
+    y : ndarray
+        The refined meridional grid. Units: m
+
+    """
+
+    if refine > 1:
+      return np.interp(
+          np.arange((len(self.y) - 1) * refine + 1) / float(refine),
+          np.arange(len(self.y)), self.y
+      )
+    return self.y
+
+  def calc_tau_table(self, refine=1):
+    r"""
+    Tabulate the surface wind stress and its cumulative integral from the southern end
+    of the meridional grid, for :meth:`pymoc.modules.Psi_SO.calc_tau_ave`. The trapezoidal
+    rule is exact for wind stress given as an array (i.e. piecewise linear), wind stress
+    given as a function is tabulated on a refined grid.
+
+    Parameters
+    ----------
+
+    refine : int; optional
+             Refinement factor of the meridional grid used for the table.
+
+    Returns
+    -------
+
+    tau_table : list
+                A list containing the meridional grid of the table, and the wind stress and its
+                cumulative integral on that grid. Units: m, N/m\ :sup:`2`, N/m
+
+    """
+
+    y = self.calc_refined_y(refine)
+    tau = self.tau(y) + 0. * y
+    tau_int = np.concatenate(
+        ([0.], np.cumsum(0.5 * (tau[1:] + tau[:-1]) * (y[1:] - y[:-1])))
+    )
+    return [y, tau, tau_int]
+
+  def calc_tau_ave(self, y0):
+    r"""
+    Compute the mean wind stress between the latitude(s) y0 and the northern end of the
+    meridional grid, from the tabulated cumulative integral of the wind stress. South of
+    the grid, the wind stress is taken to be constant.
+
+    Parameters
+    ----------
+
+    y0 : float or ndarray
+         The southern end(s) of the averaging interval. Units: m
+
+    Returns
+    -------
+
+    tau_ave : float or ndarray
+              The mean wind stress north of y0. For y0 at the northern end of the grid, this is
+              the wind stress there. Units: N/m\ :sup:`2`
+
+    """
+
+    [y, tau, tau_int] = self._tau_table
+    y0 = np.asarray(y0, dtype=float)
+    y0c = np.clip(y0, y[0], y[-1])
+    k = np.clip(np.searchsorted(y, y0c, side='right') - 1, 0, len(y) - 2)
+    tau0 = np.interp(y0c, y, tau)
+    # integral from y0 to the northern end (exact for piecewise linear tau):
+    integral = tau_int[-1] - tau_int[k] - 0.5 * (y0c - y[k]) * (tau[k] + tau0)
+    integral = integral + tau[0] * (y0c-y0)
+    length = y[-1] - y0
+    tau_ave = np.where(
+        length > 0., integral / np.where(length > 0., length, 1.), tau[-1]
+    )
+    return tau_ave if tau_ave.ndim else float(tau_ave)
+
+  def calc_ys_table(self, refine=1):
+    r"""
+    Tabulate the monotone branch of :math:`bs\left(y\right)` north of the surface buoyancy
+    minimum, for the inversion in :meth:`pymoc.modules.Psi_SO.ys`. Surface buoyancy given as
+    an array is piecewise linear on the meridional grid, so that linear interpolation in the
+    table inverts it exactly. Surface buoyancy given as a function is tabulated on a
+    refined grid.
+
+    Parameters
+    ----------
+
+    refine : int; optional
+             Refinement factor of the meridional grid used for the table.
+
+    Returns
+    -------
+
+    ys_table : list
+               A list containing the tabulated surface buoyancy (made monotonically
+               non-decreasing), the corresponding meridional locations, and the surface
+               buoyancy at the northern end. Units: m/s\ :sup:`2`, m, m/s\ :sup:`2`
+
+    """
+
+    y = self.calc_refined_y(refine)
+    bs = self.bs(y) + 0. * y
+    minind = np.argmin(bs)
+    # Notice that this inversion is well defined only if bs is monotonically
+    # increasing (past minind). Should probably add a check to make sure
+    # this is the case... Here we enforce monotonicity and use the southernmost
+    # point of any segment with constant bs.
+    [bs_table, ind] = np.unique(
+        np.maximum.accumulate(bs[minind:]), return_index=True
+    )
+    return [bs_table, y[minind:][ind], bs[-1]]
+
   def ys(self, b):
     r"""
     Inversion function of :math:`bs\left(y\right)`. This is equivalent to the outcopping
@@ -111,33 +268,28 @@ class Psi_SO(object):
     Parameters
     ----------
 
-    b: float
-       The surface buoyancy value for whose meridional location is being calculated.
+    b: float or ndarray
+       The surface buoyancy value(s) for whose meridional location is being calculated.
 
     Returns
     -------
 
-    ys : float
-        The meridional location at which the surface buoyancy bs is equal to the supplied
-        buoyancy value b.
+    ys : float or ndarray
+        The meridional location(s) at which the surface buoyancy bs is equal to the supplied
+        buoyancy value(s) b. For b smaller than the minimum of bs (isopycnals that don't
+        outcrop), this is :math:`y_0 - 1\textrm{km}`, and for b larger than bs at the northern
+        end, this is the northernmost point.
 
     """
-    def func(y):
-      return self.bs(y) - b
-
-    if b < np.min(self.bs(self.y)):
-      # if b is smaller minimum bs, isopycnals don't outcrop and get handled separately
-      return self.y[0] - 1e3
-    if b > self.bs(self.y[-1]):
-      # if b is larger than bs at northern end, return northernmost point:
-      return self.y[-1]
-    else:
-      # if b in range of bs return ys(b):
-      # Notice that this inversion is well defined only if bs is monotonically
-      # increasing (past minind). Should probably add a check to make sure
-      # this is the case...
-      minind = np.argmin(self.bs(self.y))
-      return optimize.brentq(func, self.y[minind], self.y[-1])
+
+    [bs_table, y_table, bs_north] = self._ys_table
+    b = np.asarray(b, dtype=float)
+    ys = np.interp(b, bs_table, y_table)
+    # if b is smaller minimum bs, isopycnals don't outcrop and get handled separately:
+    ys = np.where(b < bs_table[0], self.y[0] - 1e3, ys)
+    # if b is larger than bs at northern end, return northernmost point:
+    ys = np.where(b > bs_north, self.y[-1], ys)
+    return ys if ys.ndim else float(ys)
 
   def calc_N2(self):
     r"""
@@ -233,10 +385,8 @@ class Psi_SO(object):
 
     """
 
-    tau_ave = 0 * self.z
-    for ii in range(0, np.size(self.z)):
-      y0 = self.ys(self.b(self.z[ii]))    # outcrop latitude
-      tau_ave[ii] = np.mean(self.tau(np.linspace(y0, self.y[-1], 100)))
+    y0 = self.ys(self.b(self.z))    # outcrop latitudes
+    tau_ave = self.calc_tau_ave(y0)
 
     silltaper = self.calc_bottom_taper(self.Hsill, self.z)
     Ektaper = self.calc_top_taper(self.HEk, self.z, scalar=False)
@@ -274,7 +424,71 @@ class Psi_SO(object):
     else:
       return np.array([ya[0], yb[0]])
 
-  def calc_GM(self):
+  def bc_GM_jac(self, ya, yb):
+    r"""
+    Calculate the Jacobians of the boundary conditions defined by
+    :meth:`pymoc.modules.Psi_SO.bc_GM` with respect to the solution at the boundaries.
+
+    Parameters
+    ----------
+
+    ya : ndarray
+         Bottom boundary condition. Units: Sv
+    yb : ndarray
+         Surface boundary condition. Units: Sv
+
+    Returns
+    -------
+
+    bc_jac : tuple
+             The derivatives of the boundary conditions with respect to ya and yb.
+
+    """
+
+    return np.array([[1., 0.], [0., 0.]]), np.array([[0., 0.], [1., 0.]])
+
+  def solve_GM_bvp(self, Psi_0):
+    r"""
+    Solve the boundary value problem for the smoothed eddy transport,
+
+    .. math::
+      \partial_{zz}\Psi_{GM} = \frac{N^2}{c^2}\left(\Psi_{GM} - \Psi_0\right)
+
+    with the boundary conditions from :meth:`pymoc.modules.Psi_SO.bc_GM`, using second order
+    finite differences on the vertical grid. The resulting tridiagonal system is solved
+    directly with a banded solver.
+
+    Parameters
+    ----------
+
+    Psi_0 : ndarray
+            The unsmoothed eddy transport at each vertical level. Units: m\ :sup:`3`/s
+
+    Returns
+    -------
+
+    Psi_GM : ndarray
+             The smoothed eddy transport at each vertical level. Units: m\ :sup:`3`/s
+
+    """
+
+    nz = np.size(self.z)
+    dz = self.z[1:] - self.z[:-1]
+    dz_c = 0.5 * (dz[1:] + dz[:-1])
+    k = self.calc_N2()(self.z)[1:-1] / self.c**2.
+    ab = np.zeros((3, nz))
+    ab[0, 2:] = 1. / (dz_c * dz[1:])
+    ab[2, :-2] = 1. / (dz_c * dz[:-1])
+    ab[1, 1:-1] = -ab[0, 2:] - ab[2, :-2] - k
+    ab[1, 0] = 1.
+    ab[1, -1] = 1.
+    rhs = np.zeros(nz)
+    rhs[1:-1] = -k * Psi_0[1:-1]
+    # boundary values are the values for which the residuals of bc_GM vanish:
+    rhs[[0, -1]] = -self.bc_GM(np.zeros(2), np.zeros(2))
+    return linalg.solve_banded((1, 1), ab, rhs)
+
+  def calc_GM(self, method='direct'):
     r"""
     Compute the eddy (Gent & Mcwilliams) transport based on the meridionally
     averaged isopycnal slope.
@@ -290,6 +504,17 @@ class Psi_SO(object):
     of isopycnals of density class :math:`b` in the Southern Ocean, available via
     :meth:`pymoc.modules.Psi_SO.ys`.
 
+    If a phase speed c is set, the eddy transport is smoothed by solving the boundary value
+    problem in :meth:`pymoc.modules.Psi_SO.solve_GM_bvp`.
+
+    Parameters
+    ----------
+
+    method : string; optional
+             Solver for the smoothing boundary value problem. Either 'direct' (default), which
+             uses :meth:`pymoc.modules.Psi_SO.solve_GM_bvp`, or 'bvp', which uses
+             :func:`scipy.integrate.solve_bvp`.
+
     Returns
     -------
 
@@ -299,13 +524,18 @@ class Psi_SO(object):
 
     """
 
-    dy_atz = 0 * self.z
+    if method not in ['direct', 'bvp']:
+      raise TypeError("method needs to be either 'direct' or 'bvp'")
+
     eps = 0.1    # minimum dy (in meters) (to avoid div. by 0)
-    for ii in range(0, np.size(self.z)):
-      dy_atz[ii] = max(self.y[-1] - self.ys(self.b(self.z[ii])), eps)
+    dy_atz = np.maximum(self.y[-1] - self.ys(self.b(self.z)), eps)
     bottaper = self.calc_bottom_taper(self.Htaperbot, self.z)
     toptaper = self.calc_top_taper(self.Htapertop, self.z)
-    if self.c is not None:
+    if self.c is not None and method == 'direct':
+      temp = self.solve_GM_bvp(
+          self.KGM * self.z / dy_atz * self.L * toptaper * bottaper
+      )
+    elif self.c is not None:
       temp = make_func(
           self.KGM * self.z / dy_atz * self.L * toptaper * bottaper, self.z,
           'psiGM'
@@ -315,9 +545,20 @@ class Psi_SO(object):
       def ode(z, y):
         return np.vstack((y[1], N2(z) / self.c**2. * (y[0] - temp(z))))
 
+      def ode_jac(z, y):
+        df_dy = np.zeros((2, 2, np.size(z)))
+        df_dy[0, 1] = 1
+        df_dy[1, 0] = N2(z) / self.c**2.
+        return df_dy
+
       #Solve the boundary value problem
       res = integrate.solve_bvp(
-          ode, self.bc_GM, self.z, np.zeros((2, np.size(self.z)))
+          ode,
+          self.bc_GM,
+          self.z,
+          np.zeros((2, np.size(self.z))),
+          fun_jac=ode_jac,
+          bc_jac=self.bc_GM_jac
       )
       # return solution interpolated onto original grid
       temp = res.sol(self.z)[0, :]
@@ -330,13 +571,20 @@ class Psi_SO(object):
     temp[idx] = np.maximum(temp[idx], -self.Psi_Ek[idx] * 1e6)
     return temp
 
-  def solve(self):
+  def solve(self, method='direct'):
     r"""
     Compute the residual overturning transport in the Southern Ocean.
 
     .. math::
       \Psi_{SO} = \Psi_{Ek} + \Psi_{GM}
 
+    Parameters
+    ----------
+
+    method : string; optional
+             Solver for the eddy transport smoothing problem, passed on to
+             :meth:`pymoc.modules.Psi_SO.calc_GM`.
+
     Returns
     -------
 
@@ -347,7 +595,7 @@ class Psi_SO(object):
     """
 
     self.Psi_Ek = self.calc_Ekman() / 1e6
-    self.Psi_GM = self.calc_GM() / 1e6
+    self.Psi_GM = self.calc_GM(method=method) / 1e6
     self.Psi = self.Psi_Ek + self.Psi_GM
     # Notice that the Psi at the bottom boundary is somewhat poorly defined,
     # and only used foir plotting purposes, for which it makes sense to simply set it to zero:
@@ -372,4 +620,4 @@ class Psi_SO(object):
     if b is not None:
       self.b = make_func(b, self.z, 'b')
     if bs is not None:
-      self.bs = make_func(bs, self.y, 'bs')
+      self.bs = bs
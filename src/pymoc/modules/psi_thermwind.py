@@ -69,6 +69,51 @@ class Psi_Thermwind(object):
     else:
       self.sol_init = sol_init
 
+    # Discrete Green's function for the direct solver (depends only on the grid):
+    self.green = self.calc_green_matrix()
+
+    # State version, incremented by update() and solve(), and cached isopycnal
+    # remappings for the current state:
+    self.version = 0
+    self._remap_cache = {}
+
+  def calc_green_matrix(self):
+    r"""
+    Compute the discrete Green's function of the thermal wind boundary value problem
+    on the model grid, i.e. the matrix :math:`\mathbf{G}` for which
+
+    .. math::
+      \Psi\left(z_i\right) = \sum_j G_{ij}\,r\left(z_j\right)
+
+    solves :math:`d_{zz}\Psi = r` with :math:`\Psi(0) = \Psi(-H) = 0`. The solution is
+    exact for a right hand side :math:`r` that varies linearly between grid levels: the
+    first integral is computed with the trapezoidal rule, the second integral with the
+    endpoint-corrected trapezoidal rule (which is exact for the resulting piecewise
+    quadratic), and the linear function that enforces the upper boundary condition is
+    subtracted.
+
+    Returns
+    -------
+
+    green : ndarray
+            An array of shape :func:`(len(z), len(z))` representing the Green's function.
+
+    """
+
+    nz = np.size(self.z)
+    dz = (self.z[1:] - self.z[:-1])[:, np.newaxis]
+    r = np.eye(nz)
+    # first integral (from the bottom) for each unit right hand side:
+    F = np.zeros((nz, nz))
+    F[1:] = np.cumsum(0.5 * dz * (r[1:] + r[:-1]), axis=0)
+    # second integral:
+    P = np.zeros((nz, nz))
+    P[1:] = np.cumsum(
+        0.5 * dz * (F[1:] + F[:-1]) - dz**2 / 12. * (r[1:] - r[:-1]), axis=0
+    )
+    zeta = ((self.z - self.z[0]) / (self.z[-1] - self.z[0]))[:, np.newaxis]
+    return P - zeta * P[-1]
+
   def bc(self, ya, yb):
     r"""
     Calculate the residuals of boundary conditions for the thermal wind closure
@@ -92,6 +137,28 @@ class Psi_Thermwind(object):
 
     return np.array([ya[0], yb[0]])
 
+  def bc_jac(self, ya, yb):
+    r"""
+    Calculate the Jacobians of the boundary conditions defined by
+    :meth:`pymoc.modules.Psi_Thermwind.bc` with respect to the solution at the boundaries.
+
+    Parameters
+    ----------
+
+    ya : ndarray
+         Bottom boundary condition. Units:
+    yb : ndarray
+         Surface boundary condition. Units:
+
+    Returns
+    -------
+
+    bc_jac : tuple
+             The derivatives of the boundary conditions with respect to ya and yb.
+    """
+
+    return np.array([[1., 0.], [0., 0.]]), np.array([[0., 0.], [1., 0.]])
+
   def ode(self, z, y):
     r"""
     Generate the ordinary differential equation for the thermal wind overturning streamfunction,
@@ -122,17 +189,62 @@ class Psi_Thermwind(object):
 
     return np.vstack((y[1], 1. / self.f * (self.b2(z) - self.b1(z))))
 
-  def solve(self):
+  def ode_jac(self, z, y):
+    r"""
+    Calculate the Jacobian of the system of equations defined by
+    :meth:`pymoc.modules.Psi_Thermwind.ode` with respect to the solution.
+
+    Parameters
+    ----------
+
+    z : ndarray
+        Vertical depth levels of column grid on which to solve the ode. Units: m
+    y : ndarray
+        Initial values for the streamfunction and its vertical gradient.
+
+    Returns
+    -------
+    ode_jac : ndarray
+              The derivative of the ode with respect to y, of shape (2, 2, len(z)).
+
+    """
+
+    df_dy = np.zeros((2, 2, np.size(z)))
+    df_dy[0, 1] = 1
+    return df_dy
+
+  def solve(self, method='direct'):
     r"""
     Solve for the thermal wind overturning streamfunction as a boundary value problem
     based on the system of equations defined in :meth:`pymoc.modules.Psi_Thermwind.ode`.
+
+    Parameters
+    ----------
+    method : string; optional
+             Either 'direct' (default), which applies the discrete Green's function from
+             :meth:`pymoc.modules.Psi_Thermwind.calc_green_matrix` to the buoyancy difference,
+             or 'bvp', which solves the boundary value problem with :func:`scipy.integrate.solve_bvp`.
     """
 
-    # Note: The solution to this BVP is a relatively straightforward integral
-    # it would probably be faster to just code it up that way.
-    res = integrate.solve_bvp(self.ode, self.bc, self.z, self.sol_init)
-    # interpolate solution for overturning circulation onto original grid (and change units to SV)
-    self.Psi = res.sol(self.z)[0, :] / 1e6
+    if method == 'direct':
+      # single matrix-vector product with the precomputed Green's function (and change units to SV)
+      self.Psi = np.dot(
+          self.green, (self.b2(self.z) - self.b1(self.z)) / self.f
+      ) / 1e6
+    elif method == 'bvp':
+      res = integrate.solve_bvp(
+          self.ode,
+          self.bc,
+          self.z,
+          self.sol_init,
+          fun_jac=self.ode_jac,
+          bc_jac=self.bc_jac
+      )
+      # interpolate solution for overturning circulation onto original grid (and change units to SV)
+      self.Psi = res.sol(self.z)[0, :] / 1e6
+    else:
+      raise TypeError("method needs to be either 'direct' or 'bvp'")
+    self.version += 1
 
   def Psib(self, nb=500):
     r"""
@@ -156,6 +268,34 @@ class Psi_Thermwind(object):
     where :math:`b_N\left(z\right)` is the density profiles in the northern region, :math:`b_B\left(z\right)` is
     the density profile in the southern basin, and :math:`\mathcal{H}` is the Heaviside step function.
 
+    The result (and the corresponding **bgrid**) is cached for each nb, and reused until
+    the state changes through :meth:`pymoc.modules.Psi_Thermwind.update` or
+    :meth:`pymoc.modules.Psi_Thermwind.solve`. Notice that buoyancy profiles given as arrays
+    are not copied, so changes to those arrays need to be passed on via update().
+
+    Parameters
+    ----------
+    nb : int; optional
+         Number of upstream density classes into which the streamfunction is to be remapped.
+
+    Returns
+    -------
+    psib : ndarray
+           An array representing the values of the overturning streamfunction in each upwind density class.
+    """
+    cached = self.get_cached_remap('Psib', nb)
+    if cached is None:
+      psib = self.calc_Psib(nb)
+      self.set_cached_remap('Psib', nb, [psib, self.bgrid])
+    else:
+      [psib, self.bgrid] = cached
+    return psib.copy()
+
+  def calc_Psib(self, nb=500):
+    r"""
+    Compute the remapping of the overturning streamfunction into isopycnal space,
+    as described in :meth:`pymoc.modules.Psi_Thermwind.Psib`, without caching.
+
     Parameters
     ----------
     nb : int; optional
@@ -173,21 +313,56 @@ class Psi_Thermwind(object):
     bmax = max(np.max(b1), np.max(b2))
     self.bgrid = np.linspace(bmin, bmax, nb)
     udydz = -(self.Psi[1:] - self.Psi[:-1])
-    psib = 0. * self.bgrid
     bup_bot = b1[:-1].copy()
     bup_top = b1[1:].copy()
     idx = udydz < 0
     bup_bot[idx] = b2[:-1][idx]
     bup_top[idx] = b2[1:][idx]
-    for i in range(0, len(self.bgrid)):
-      mask = np.clip((bup_top - self.bgrid[i]) / (bup_top-bup_bot), 0., 1.)
-      psib[i] = np.sum(mask * udydz)
+
+    # Each layer contributes its transport times the fraction of the layer
+    # that is lighter than b, which is piecewise linear in b with kinks at the
+    # layer bounds. The sum over layers is evaluated for all b at once, as
+    # sums over ramps max(b - bk, 0), using cumulative sums over the sorted
+    # layer bounds. Layers without buoyancy difference are treated as steps.
+    def sum_ramps(bk, slope):
+      # sum_k slope_k * max(b - bk_k, 0) on bgrid
+      order = np.argsort(bk)
+      bk = bk[order]
+      slope = slope[order]
+      S = np.concatenate(([0.], np.cumsum(slope)))
+      SB = np.concatenate(([0.], np.cumsum(slope * bk)))
+      n = np.searchsorted(bk, self.bgrid)
+      return self.bgrid * S[n] - SB[n]
+
+    def sum_steps(bk, weight):
+      # sum_k weight_k * H(b - bk_k) on bgrid, with H(0) = 1/2
+      order = np.argsort(bk)
+      bk = bk[order]
+      W = np.concatenate(([0.], np.cumsum(weight[order])))
+      return 0.5 * (
+          W[np.searchsorted(bk, self.bgrid, side='left')] +
+          W[np.searchsorted(bk, self.bgrid, side='right')]
+      )
+
+    blo = np.minimum(bup_bot, bup_top)
+    bhi = np.maximum(bup_bot, bup_top)
+    # layers that get lighter upward are fully counted below blo, and
+    # removed linearly between blo and bhi; layers that get denser upward are
+    # added linearly between blo and bhi:
+    dec = bup_top >= bup_bot
+    amp = np.where(dec, -udydz, udydz)
+    thin = bhi == blo
+    slope = amp[~thin] / (bhi - blo)[~thin]
+    psib = np.sum(udydz[dec]) + sum_ramps(blo[~thin], slope) - sum_ramps(
+        bhi[~thin], slope
+    ) + sum_steps(blo[thin], amp[thin])
     return psib
 
   def Psibz(self, nb=500):
     r"""
     Remap the overturning streamfunction onto the native isopycnal-depth space
-    of the columns in the northern region and southern basin.
+    of the columns in the northern region and southern basin. Like
+    :meth:`pymoc.modules.Psi_Thermwind.Psib`, the result is cached until the state changes.
 
     Parameters
     ----------
@@ -199,19 +374,66 @@ class Psi_Thermwind(object):
     psibz : ndarray
             An array where the first element is an array representing the streamfunction at each depth level in the southern basin, and the second represents the same in the northern region.
     """
+    cached = self.get_cached_remap('Psibz', nb)
+    if cached is not None:
+      return [cached[0].copy(), cached[1].copy()]
     # map isopycnal overturning back into isopycnal-depth space of each column
     psib = self.Psib(nb)
     # This does a linear interploation in b:
-    return [
+    psibz = [
         np.interp(self.b1(self.z), self.bgrid, psib),
         np.interp(self.b2(self.z), self.bgrid, psib)
     ]
+    self.set_cached_remap('Psibz', nb, psibz)
+    return [psibz[0].copy(), psibz[1].copy()]
     # Ths instead first estimates the depth levels for the bgrid and then does linear interpolation in z
     # either has pros and cons depending on the situation...
     #z1_of_bgrid=np.interp(self.bgrid,self.b1(self.z),self.z)
     #z2_of_bgrid=np.interp(self.bgrid,self.b2(self.z),self.z)
     #return [np.interp(self.z,z1_of_bgrid,psib),np.interp(self.z,z2_of_bgrid,psib)]
 
+  def get_cached_remap(self, name, nb):
+    r"""
+    Retrieve a cached isopycnal remapping, if it was computed for the current state.
+
+    Parameters
+    ----------
+    name : string
+           Name of the remapping ('Psib' or 'Psibz').
+    nb : int
+         Number of upstream density classes used in the remapping.
+
+    Returns
+    -------
+    cached : list or None
+             The cached values, or None if there are no valid cached values.
+    """
+    cached = self._remap_cache.get((name, nb))
+    if cached is None or cached[0] != self.version or cached[1] is not getattr(
+        self, 'Psi', None
+    ):
+      return None
+    return cached[2]
+
+  def set_cached_remap(self, name, nb, values):
+    r"""
+    Cache an isopycnal remapping for the current state.
+
+    Parameters
+    ----------
+    name : string
+           Name of the remapping ('Psib' or 'Psibz').
+    nb : int
+         Number of upstream density classes used in the remapping.
+    values : list
+             The values to be cached.
+    """
+    # drop remappings of previous states:
+    for key in list(self._remap_cache.keys()):
+      if self._remap_cache[key][0] != self.version:
+        del self._remap_cache[key]
+    self._remap_cache[(name, nb)] = [self.version, self.Psi, values]
+
   def update(self, b1=None, b2=None):
     r"""
     Update the vertical buoyancy profiles from the southern basin and northern region.
@@ -230,3 +452,4 @@ class Psi_Thermwind(object):
       self.b1 = make_func(b1, self.z, 'b1')
     if b2 is not None:
       self.b2 = make_func(b2, self.z, 'b2')
+    self.version += 1
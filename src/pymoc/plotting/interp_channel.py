@@ -6,10 +6,13 @@ with constant slope - only to mke fancy looking plots
 import sys
 import numpy as np
 from scipy.optimize import brenth
-from pymoc.utils import gridit, make_func
+from pymoc.utils import gridit, make_func, solve_brackets
 
 
 class Interpolate_channel(object):
+  # __call__ accepts arrays of coordinates, so gridit can evaluate the whole grid at once
+  vectorized = True
+
   def __init__(
       self,
       y=None,    # y-grid
@@ -31,32 +34,35 @@ class Interpolate_channel(object):
     self.bs = self.make_func(bs, 'bs', self.y)
     self.bn = self.make_func(bn, 'bn', self.z)
 
+    def f2(x):
+      # function to help determine slope at bottom of vent. region
+      return self.bn(x) - self.bs(0)
+
+    # slope at bottom of vent. region (which is independent of y and z):
+    self.sbot = -brenth(f2, self.z[0], 0.) / self.y[-1]
+
   def make_func(self, myst, name, xin): # Seems unecessary to define a method that already exists identically as a function, no?
     return make_func(myst, xin, name)
 
   def __call__(self, y, z):
-      l=self.y[-1]
-      if y==l:
-          # slope can be ill defined at y=l, and solution is trivial, so it makes sense to treat this separately
-          return self.bn(z)
-      else:
-         def f2(x):
-             # function to help determine slope at bottom of vent. region
-             return self.bn(x)-self.bs(0)
-         
-         def f(x):
-             # function to help determine slope in vent. region
-             return self.bn(z - x * (l-y)) - self.bs(y + z/x)
-         
-         # first determine slope at bottom of vent. region here
-         sbot=-brenth(f2, self.z[0],0.)/l
-         # than set slope for stuff above and below...
-         if -z>sbot*y:
-           s=sbot
-         else:
-           s=brenth(f, 1.e-12,1.0)
-         return self.bn(z - s * (l-y))
+    y, z = np.broadcast_arrays(
+        np.asarray(y, dtype=float), np.asarray(z, dtype=float)
+    )
+    l = self.y[-1]
+    # below the vent. region the slope is sbot, and at y=l the slope can be ill defined,
+    # but the solution is trivial, so we only solve for the slope in the vent. region:
+    s = np.full(y.shape, self.sbot)
+    vent = (y != l) & ~(-z > self.sbot * y)
+    if vent.any():
+      yv = y[vent]
+      zv = z[vent]
+
+      def f(x, i):
+        # function to help determine slope in vent. region (at the points i)
+        return self.bn(zv[i] - x * (l - yv[i])) - self.bs(yv[i] + zv[i] / x)
 
+      s[vent] = solve_brackets(f, 1.e-12, 1.0, indexed=True)
+    return np.asarray(self.bn(z - s * (l-y)))[()]
 
   def gridit(self):
     return gridit(self.y, self.z, self)
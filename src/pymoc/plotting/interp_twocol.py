@@ -5,17 +5,19 @@ with constant slope - only to make fancy plots
 
 import sys
 import numpy as np
-from scipy.optimize import brenth
-from pymoc.utils import gridit, make_func
+from pymoc.utils import gridit, make_func, solve_brackets
 
 
 class Interpolate_twocol(object):
+  # __call__ accepts arrays of coordinates, so gridit can evaluate the whole grid at once
+  vectorized = True
+
   def __init__(
       self,
       y=None,    # y-grid
       z=None,    # z-grid
-      bs=None,    # buoyancy profile in the south
-      bn=None,    # buoyancy profile in the north
+      bs=None,    # buoyancy profile in the south (or array of profiles of shape (nt, len(z)))
+      bn=None,    # buoyancy profile in the north (or array of profiles of shape (nt, len(z)))
   ):
 
     # initialize grid:
@@ -28,45 +30,117 @@ class Interpolate_twocol(object):
     else:
       raise TypeError('z needs to be numpy array providing grid levels')
 
-    self.bs = self.make_func(bs, 'bs', self.z)
-    self.bn = self.make_func(bn, 'bn', self.z)
+    # If either profile is given as a 2D array, each row is treated as a separate
+    # pair of profiles (e.g. a saved time slice), and all of them are interpolated at once:
+    if np.ndim(bs) == 2 or np.ndim(bn) == 2:
+      self.nt = np.shape(bs if np.ndim(bs) == 2 else bn)[0]
+      self.bs_t = self.make_batch_func(bs, 'bs', self.z)
+      self.bn_t = self.make_batch_func(bn, 'bn', self.z)
+      t = np.arange(self.nt)
+      self.bs = lambda x: self.bs_t(*self.broadcast_slices(x, t))
+      self.bn = lambda x: self.bn_t(*self.broadcast_slices(x, t))
+    else:
+      self.nt = None
+      self.bs = self.make_func(bs, 'bs', self.z)
+      self.bn = self.make_func(bn, 'bn', self.z)
+      self.bs_t = lambda x, t: self.bs(x)
+      self.bn_t = lambda x, t: self.bn(x)
+      t = np.zeros(1, dtype=int)
+
+    l = self.y[-1]
+    # the surface buoyancy varies linearly between the two columns:
+    bsurf = (
+        self.y / l * self.bn_t(0. * t, t)[:, np.newaxis] +
+        (1 - self.y / l) * self.bs_t(0. * t, t)[:, np.newaxis]
+    )
+    self.bsurf_t = self.make_batch_func(bsurf, 'bsurf', self.y)
+
+    def fint(x, i):
+      # function to help determine slope at bottom of vent. region
+      return self.bn_t(0. * x, t[i]) - self.bs_t(-x * l, t[i])
+
+    # the slope at bottom of vent. region only depends on the two profiles:
+    self.sbot = solve_brackets(fint, 0., 1., indexed=True)
+    if self.nt is None:
+      self.sbot = float(self.sbot)
 
   def make_func(self, myst, name, xin):
     return make_func(myst, xin, name)
 
+  def make_batch_func(self, myst, name, xin):
+    # make a function f(x, t) that interpolates row t of a 2D array (or a 1D array
+    # shared by all rows) along xin. All rows are laid out along a single axis, with
+    # gaps in between, so that a single call to np.interp serves all of them:
+    if callable(myst) or isinstance(myst, float):
+      func = make_func(myst, xin, name)
+      return lambda x, t: func(x)
+    myst = np.atleast_2d(myst)
+    nt = myst.shape[0]
+    d = 2 * (xin[-1] - xin[0])
+    xp = (xin[np.newaxis, :] + d * np.arange(nt)[:, np.newaxis]).ravel()
+    fp = myst.ravel()
+    if nt == 1:
+      return lambda x, t: np.interp(x, xin, fp)
+    return lambda x, t: np.interp(np.clip(x, xin[0], xin[-1]) + d*t, xp, fp)
+
+  def broadcast_slices(self, x, t):
+    # broadcast x and the slice index t to the shape (nt,) + x.shape
+    x = np.asarray(x, dtype=float)
+    t = t.reshape((-1, ) + (1, ) * x.ndim)
+    return np.broadcast_arrays(x[np.newaxis], t)
+
   def __call__(self, y, z):
-    l = self.y[-1]
-    bsurf = self.make_func(
-        self.y / l * self.bn(0) + (1 - self.y / l) * self.bs(0), 'bsurf',
-        self.y
+    y, z = np.broadcast_arrays(
+        np.asarray(y, dtype=float), np.asarray(z, dtype=float)
     )
-    if z == 0 and y == 0:
-      # slope ill defined at (0,0); evaluate infinitesimally below the surface:
-      z = -0.01
-    if z == self.z[0]:
-      # slope also potentially ill defined at z= -H; evaluatejust above the bottom:
-      z = 0.9999 * self.z[0]
-
-    def fint(x):
-      # function to help determine slope at bottom of vent. region
-      return self.bn(0) - self.bs(-x * l)
+    l = self.y[-1]
+    shape = y.shape
+    if self.nt is None:
+      t = np.zeros(y.size, dtype=int)
+    else:
+      # evaluate every slice at each point:
+      shape = (self.nt, ) + shape
+      y, t = self.broadcast_slices(y, np.arange(self.nt))
+      z = np.broadcast_to(z, shape)
+    y = y.ravel()
+    z = z.ravel()
+    t = t.ravel()
+    # slope ill defined at (0,0); evaluate infinitesimally below the surface:
+    z = np.where((z == 0) & (y == 0), -0.01, z)
+    # slope also potentially ill defined at z= -H; evaluatejust above the bottom:
+    z = np.where(z == self.z[0], 0.9999 * self.z[0], z)
 
-    def fup(x):
-      # function to help determine slope in vent. region
-      return self.bs(z - x*y) - bsurf(y - z/x)
+    # set slope for stuff above and below the bottom of the vent. region...
+    s = np.zeros(y.shape)
+    up = z > -np.atleast_1d(self.sbot)[t] * (l-y)
+    if up.any():
+      yu = y[up]
+      zu = z[up]
+      tu = t[up]
 
-    def fdeep(x):
-      # function to help determine slope below vent. region
-      return self.bs(z - x*y) - self.bn(z + x * (l-y))
+      def fup(x, i):
+        # function to help determine slope in vent. region (at the points i)
+        return self.bs_t(zu[i] - x * yu[i], tu[i]) - self.bsurf_t(
+            yu[i] - zu[i] / x, tu[i]
+        )
 
-    # first determine slope at bottom of vent. region here
-    sbot = brenth(fint, 0., 1.)
-    # than set slope for stuff above and below...
-    if z > -sbot * (l-y):
-      s = brenth(fup, 1e-10, 1.0)
-    else:
-      s = brenth(fdeep, -1.0, 1.0)
-    return self.bs(z - s*y)
+      s[up] = solve_brackets(fup, 1e-10, 1.0, indexed=True)
+    if not up.all():
+      yd = y[~up]
+      zd = z[~up]
+      td = t[~up]
+
+      def fdeep(x, i):
+        # function to help determine slope below vent. region (at the points i)
+        return self.bs_t(zd[i] - x * yd[i], td[i]) - self.bn_t(
+            zd[i] + x * (l - yd[i]), td[i]
+        )
+
+      s[~up] = solve_brackets(fdeep, -1.0, 1.0, indexed=True)
+    return np.asarray(self.bs_t(z - s*y, t)).reshape(shape)[()]
 
   def gridit(self):
+    if self.nt is not None:
+      # returns an array of shape (nt, len(y), len(z))
+      return self(self.y[:, np.newaxis], self.z[np.newaxis, :])
     return gridit(self.y, self.z, self)
@@ -0,0 +1,369 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+from multiprocessing.pool import ThreadPool
+
+
+class Sweep(object):
+  r"""
+  Parameter Sweep Runner
+
+  Instances of this class run a driver script, such as ``run_JansenNadeau_2018.py`` or
+  ``run_single_global_basin.py``, for every member of a grid of parameters, with up to
+  **processes** runs at a time. Each member is run as
+
+  .. code-block:: none
+
+    python script --name value ... --diagfile diags --pickup_save_file pickup.npz [--pickup file]
+
+  where parameters with a value of True are passed as flags (and those with a value of
+  False are left out). A fixed **pickup** parameter sets the pickup from which every
+  member (or the first member of each chain) is started.
+
+  The results of each member are stored in a directory of the cache, named after a hash
+  of the script name, the full set of parameters and the state the member starts from
+  (see below), which also contains the parameters (``params.json``) and the output of
+  the script (``log.txt``). Members that are already
+  in the cache are not run again, so that an interrupted sweep, or a sweep that extends
+  an earlier one, only runs the missing members. Each member runs in a temporary
+  directory, which is only moved into place when the run was successful.
+
+  If **chain** names one of the parameters, the members that only differ in that parameter
+  form a chain, ordered as its values. The members of a chain are run one after another,
+  each starting from the pickup of the previous member (chains themselves run in parallel),
+  so that neighboring members start from a nearby equilibrium. The hash of a chained
+  member includes the hash of the previous member, so that cached results are only
+  reused for the same history of the chain. If a member fails, the remaining members of
+  its chain are not run. Notice that a fixed **pickup** is identified by its path, so
+  results are not rerun if the contents of that file change.
+  """
+
+  def __init__(
+      self,
+      script,    # driver script
+      params,    # dict of lists of parameter values
+      cache_dir='sweep_cache',    # directory for the results
+      fixed=None,    # dict of parameters that are the same for all members
+      chain=None,    # name of the parameter along which pickups are chained
+      python=sys.executable    # python interpreter used to run the script
+  ):
+    r"""
+    Parameters
+    ----------
+
+    script : string
+             Path to the driver script.
+    params : dict
+             The values of each parameter to be swept over, as lists, by parameter name
+             (the name of the command line option, without the leading dashes).
+    cache_dir : string; optional
+                Directory in which results are stored.
+    fixed : dict; optional
+            Parameters that are the same for all members.
+    chain : string; optional
+            Name of the parameter along which pickups are chained.
+    python : string; optional
+             Python interpreter used to run the script. Defaults to the current interpreter.
+    """
+
+    if chain is not None and chain not in params:
+      raise TypeError('chain needs to be one of the swept parameters')
+    self.script = script
+    self.params = params
+    self.cache_dir = cache_dir
+    self.fixed = fixed or {}
+    self.chain = chain
+    self.python = python
+
+  def members(self):
+    r"""
+    Expand the parameter grid.
+
+    Returns
+    -------
+
+    members : list
+              The full parameter set of each member, as dicts (including the fixed
+              parameters), with the last parameter varying fastest.
+
+    """
+
+    names = list(self.params)
+    members = []
+    for values in itertools.product(*[self.params[name] for name in names]):
+      member = dict(self.fixed)
+      member.update(zip(names, values))
+      members.append(member)
+    return members
+
+  def previous(self, member):
+    r"""
+    Find the member of the same chain from whose pickup a member starts.
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+
+    Returns
+    -------
+
+    previous : dict or None
+               Full parameter set of the previous member, or None if the member is the
+               first of its chain (or there are no chains).
+
+    """
+
+    if self.chain is None:
+      return None
+    order = list(self.params[self.chain])
+    index = order.index(member[self.chain])
+    if index == 0:
+      return None
+    previous = dict(member)
+    previous[self.chain] = order[index - 1]
+    return previous
+
+  def key(self, member):
+    r"""
+    Compute the hash under which the results of a member are stored.
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+
+    Returns
+    -------
+
+    key : string
+          Hexadecimal SHA1 hash of the script name and parameters, and of the key of the
+          previous member of the chain.
+
+    """
+
+    previous = self.previous(member)
+    info = {
+        'script': os.path.basename(self.script),
+        'params': member,
+        'previous': None if previous is None else self.key(previous)
+    }
+    text = json.dumps(info, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+  def path(self, member):
+    r"""
+    Directory of the results of a member (which only exists once the member is done).
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+
+    Returns
+    -------
+
+    path : string
+           Path of the directory.
+
+    """
+
+    return os.path.join(self.cache_dir, self.key(member))
+
+  def is_done(self, member):
+    r"""
+    Check whether a member is in the cache.
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+
+    Returns
+    -------
+
+    done : logical
+           Whether the member has been run successfully.
+
+    """
+
+    return os.path.exists(os.path.join(self.path(member), 'params.json'))
+
+  def command(self, member, pickup=None):
+    r"""
+    Assemble the command line that runs a member, from within its run directory.
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+    pickup : string; optional
+             Path to the pickup file from which the member is started.
+
+    Returns
+    -------
+
+    cmd : list
+          The command line.
+
+    """
+
+    cmd = [self.python, os.path.abspath(self.script)]
+    for name in sorted(member):
+      value = member[name]
+      if name == 'pickup':
+        # passed on by run_chain
+        continue
+      if value is True:
+        cmd.append('--' + name)
+      elif value is not False and value is not None:
+        cmd += ['--' + name, str(value)]
+    cmd += ['--diagfile', 'diags', '--pickup_save_file', 'pickup.npz']
+    if pickup is not None:
+      cmd += ['--pickup', os.path.abspath(pickup)]
+    return cmd
+
+  def run_member(self, member, pickup=None):
+    r"""
+    Run a single member, and move its results into the cache.
+
+    Parameters
+    ----------
+
+    member : dict
+             Full parameter set of the member.
+    pickup : string; optional
+             Path to the pickup file from which the member is started.
+
+    Returns
+    -------
+
+    done : logical
+           Whether the run was successful.
+
+    """
+
+    path = self.path(member)
+    tmp = path + '.partial'
+    if os.path.exists(tmp):
+      shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    with open(os.path.join(tmp, 'log.txt'), 'w') as log:
+      status = subprocess.call(
+          self.command(member, pickup),
+          cwd=tmp,
+          stdout=log,
+          stderr=subprocess.STDOUT
+      )
+    if status != 0:
+      return False
+    info = {
+        'script': os.path.basename(self.script),
+        'params': member,
+        'pickup': pickup
+    }
+    with open(os.path.join(tmp, 'params.json'), 'w') as f:
+      json.dump(info, f, sort_keys=True, indent=2)
+    os.rename(tmp, path)
+    return True
+
+  def run_chain(self, chain):
+    r"""
+    Run the members of a chain that are not in the cache yet, one after another, each
+    starting from the pickup of the previous member. Once a member fails, the remaining
+    members are not run.
+
+    Parameters
+    ----------
+
+    chain : list
+            Full parameter sets of the members of the chain.
+
+    Returns
+    -------
+
+    failed : list
+             Members that failed, or could not be run after a failure.
+
+    """
+
+    pickup = self.fixed.get('pickup')
+    for i, member in enumerate(chain):
+      if not self.is_done(member) and not self.run_member(member, pickup):
+        return chain[i:]
+      pickup = os.path.join(self.path(member), 'pickup.npz')
+    return []
+
+  def chains(self):
+    r"""
+    Group the members into chains, as described above. Without **chain**, each member
+    forms a chain of its own.
+
+    Returns
+    -------
+
+    chains : list
+             List of chains, each a list of full parameter sets.
+
+    """
+
+    if self.chain is None:
+      return [[member] for member in self.members()]
+    chains = {}
+    for member in self.members():
+      others = dict(member)
+      del others[self.chain]
+      others = json.dumps(others, sort_keys=True)
+      chains.setdefault(others, []).append(member)
+    order = list(self.params[self.chain])
+    return [
+        sorted(chain, key=lambda member: order.index(member[self.chain]))
+        for chain in chains.values()
+    ]
+
+  def run(self, processes=None):
+    r"""
+    Run all members that are not in the cache yet. Each chain is run by one of up to
+    **processes** workers, which each run one member at a time in a separate process.
+
+    Parameters
+    ----------
+
+    processes : int; optional
+                Maximum number of members that run at the same time. Defaults to the
+                number of CPUs.
+
+    Returns
+    -------
+
+    paths : list
+            The result directories of all members, in the order of
+            :meth:`pymoc.Sweep.members`.
+
+    """
+
+    if not os.path.exists(self.cache_dir):
+      os.makedirs(self.cache_dir)
+    chains = self.chains()
+    pool = ThreadPool(processes or multiprocessing.cpu_count())
+    try:
+      failed = sum(pool.map(self.run_chain, chains), [])
+    finally:
+      pool.close()
+      pool.join()
+    if failed:
+      raise RuntimeError(
+          str(len(failed)) + ' members of the sweep failed, e.g. ' +
+          json.dumps(failed[0], sort_keys=True)
+      )
+    return [self.path(member) for member in self.members()]
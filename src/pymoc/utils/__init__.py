@@ -1,5 +1,9 @@
 __version__ = '0.0.1rc5'
 from .check_numpy_version import check_numpy_version
+from .fixed_point import fixed_point
 from .gridit import gridit
+from .grid_function import GridFunction
 from .make_array import make_array
 from .make_func import make_func
+from .replace_file import replace_file
+from .solve_brackets import solve_brackets
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def fixed_point(g, x0, tol=1e-10, maxiter=100, m=5, beta=1.):
+  r"""
+  Find a fixed point :math:`x = g\left(x\right)` of a vector valued function with
+  Anderson acceleration. Each iterate combines the last (up to) m+1 evaluations of g,
+  with weights chosen to minimize the linearized residual
+  :math:`f\left(x\right) = g\left(x\right) - x`: with the differences
+  :math:`\Delta F` and :math:`\Delta G` between consecutive residuals and
+  evaluations of g,
+
+  .. math::
+    x_{k+1} = x_k + \beta f_k - \left(\Delta G - \left(1 - \beta\right)\Delta F\right)\gamma_k,
+    \qquad \gamma_k = \arg\min_\gamma\left|f_k - \Delta F\gamma\right|
+
+  With m = 0, this reduces to the relaxed iteration
+  :math:`x_{k+1} = \left(1 - \beta\right)x_k + \beta g\left(x_k\right)`.
+
+  Parameters
+  ----------
+
+  g : function
+      A function that maps an ndarray onto an ndarray of the same shape.
+  x0 : ndarray
+       Initial guess.
+  tol : float; optional
+        Tolerance for the maximum norm of the residual :math:`g\left(x\right) - x`.
+  maxiter : int; optional
+            Maximum number of evaluations of g.
+  m : int; optional
+      Number of previous iterates used for the acceleration.
+  beta : float; optional
+         Relaxation parameter.
+
+  Returns
+  -------
+
+  x : ndarray
+      The last evaluation of g, i.e. :math:`g` at the last iterate.
+  res : float
+        The maximum norm of the residual at the last iterate.
+  niter : int
+          The number of evaluations of g.
+
+  """
+
+  x = np.array(x0, dtype=float)
+  dF = []
+  dG = []
+  f_old = g_old = None
+  for niter in range(1, maxiter + 1):
+    gx = np.asarray(g(x), dtype=float)
+    f = gx - x
+    res = np.max(np.abs(f))
+    if res < tol:
+      break
+    if f_old is not None:
+      dF.append((f - f_old).ravel())
+      dG.append((gx - g_old).ravel())
+      if len(dF) > m:
+        dF.pop(0)
+        dG.pop(0)
+    f_old, g_old = f, gx
+    if dF:
+      DF = np.array(dF).T
+      # (rcond=-1 rather than None, which older NumPy versions reject):
+      gamma = np.linalg.lstsq(DF, f.ravel(), rcond=-1)[0]
+      x = x + beta*f - (
+          np.dot(np.array(dG).T - (1. - beta) * DF, gamma)
+      ).reshape(x.shape)
+    else:
+      x = x + beta*f
+  return gx, res, niter
@@ -0,0 +1,118 @@
+import numpy as np
+
+
+class GridFunction(object):
+  r"""
+  Gridded Function
+
+  Instances of this class are callables that linearly interpolate an array of values,
+  given on a fixed grid, in the same way as :func:`np.interp`. Unlike a plain interpolating
+  closure, a GridFunction keeps a reference to the original array, so that:
+
+  - evaluating the function on its own grid simply returns (a read-only view of) the
+    source array, without any interpolation,
+  - for long grids, the interpolation indices and weights for any other grid the
+    function is evaluated on are computed only once and reused for subsequent calls on
+    the same grid,
+  - the source data remains available as :attr:`values`, alongside :attr:`axis`.
+
+  Like the closure it replaces, a GridFunction interpolates the current contents of
+  :attr:`values`, so changes to the source array are reflected in subsequent calls.
+  """
+
+  # maximum number of grids for which interpolation weights are kept around:
+  max_cached_grids = 8
+  # np.interp is about as fast as reusing the weights on short grids, so they are
+  # only cached for grids with at least this many points:
+  min_cached_size = 2000
+
+  def __init__(
+      self,
+      values,    # values of the function on the grid
+      axis,    # grid points (monotonically increasing)
+  ):
+    r"""
+    Parameters
+    ----------
+
+    values : ndarray
+             Values of the function at the grid points in axis.
+    axis : ndarray
+           Monotonically increasing grid points, of the same length as values.
+    """
+
+    self.values = values
+    self.axis = axis
+    self._weights = []
+
+  def __call__(self, x):
+    r"""
+    Evaluate the function by linear interpolation, with values outside the grid
+    clamped to the end points (as in :func:`np.interp`).
+
+    Parameters
+    ----------
+
+    x : float or ndarray
+        Point(s) at which to evaluate the function.
+
+    Returns
+    -------
+
+    f : float or ndarray
+        Value(s) of the function at x. When x is the grid itself, a read-only view of
+        :attr:`values` is returned.
+    """
+
+    if not isinstance(x, np.ndarray) or x.ndim == 0:
+      return np.interp(x, self.axis, self.values)
+    if x is self.axis or (
+        x.shape == self.axis.shape and not (x != self.axis).any()
+    ):
+      view = np.asarray(self.values, dtype=float).view()
+      view.flags.writeable = False
+      return view
+    if len(self.axis) < self.min_cached_size:
+      return np.interp(x, self.axis, self.values)
+    j0, j1, w = self.calc_weights(x)
+    fp = np.asarray(self.values, dtype=float)
+    f0 = fp.take(j0)
+    return f0 + w * (fp.take(j1) - f0)
+
+  def calc_weights(self, x):
+    r"""
+    Compute (or retrieve) the interpolation indices and weights for points on a grid.
+
+    Parameters
+    ----------
+
+    x : ndarray
+        Points at which the function is to be evaluated.
+
+    Returns
+    -------
+
+    j0 : ndarray
+         Index of the grid point at the lower end of the interval containing each point.
+    j1 : ndarray
+         Index of the grid point at the upper end of the interval containing each point.
+    w : ndarray
+        Interpolation weight of the upper grid point. Points outside the grid are
+        assigned to the nearest end point, with zero weight.
+    """
+
+    for xc, weights in self._weights:
+      if xc.shape == x.shape and not (xc != x).any():
+        return weights
+    axis = self.axis
+    j0 = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+    j1 = j0 + 1
+    w = (x - axis[j0]) / (axis[j1] - axis[j0])
+    # clamp to the end points outside the grid:
+    j0[x <= axis[0]] = j1[x <= axis[0]] = 0
+    j0[x >= axis[-1]] = j1[x >= axis[-1]] = len(axis) - 1
+    w[(x <= axis[0]) | (x >= axis[-1])] = 0.
+    if len(self._weights) >= self.max_cached_grids:
+      self._weights.pop(0)
+    self._weights.append((x.copy(), (j0, j1, w)))
+    return j0, j1, w
@@ -1,9 +1,10 @@
 import numpy as np
 
 
-def gridit(x1, x2, f):
+def gridit(x1, x2, f, vectorized=None):
   r"""
-  Generate a gridded dataset, based on a function in x1 and x2.
+  Generate a gridded dataset, based on a function in x1 and x2. If the function
+  can be evaluated on arrays of coordinates, the whole grid is computed in a single call.
 
   Parameters
   ----------
@@ -14,6 +15,9 @@ def gridit(x1, x2, f):
        Grid points in the second dimension along which values are to be calculated.
   f : function
       A function in dimensions x1 and x2, that returns a single value for each pair of coordinate values.
+  vectorized : bool; optional
+               Whether f accepts broadcastable arrays of coordinates. Defaults to the value of the
+               attribute f.vectorized if present, and False otherwise.
 
   Returns
   -------
@@ -21,6 +25,14 @@ def gridit(x1, x2, f):
            A 2D array of shape :func:`(len(x1), len(x2))`, where each point :func:`gridded[i, j] = f(x1[i], x2[j])`.
 
   """
+  if vectorized is None:
+    vectorized = getattr(f, 'vectorized', False)
+  if vectorized:
+    return np.broadcast_to(
+        f(np.asarray(x1)[:, np.newaxis],
+          np.asarray(x2)[np.newaxis, :]), (len(x1), len(x2))
+    ).astype(float)
+
   n1 = len(x1)
   n2 = len(x2)
   array = np.zeros((n1, n2))
@@ -23,14 +23,19 @@ def make_array(myst, axis, name):
                
                - If myst is an ndarray, simply returns myst.
                - If myst is a float, returns an array of length :func:`len(axis)` where each row contains the value of myst.
-               - If myst is a function, returns an array of length :func:`len(axis)` where each row contains the value :func:`made_array[i]=myst(axis[i])`.
+               - If myst is a function, returns an array of length :func:`len(axis)` where each row contains the value :func:`made_array[i]=myst(axis[i])`
+                 (copied if the function returns a read-only array, so that the result can be modified).
 
   """
 
   if isinstance(myst, np.ndarray):
     return myst
   elif callable(myst):
-    return myst(axis)
+    made_array = myst(axis)
+    if isinstance(made_array, np.ndarray) and not made_array.flags.writeable:
+      # e.g. a read-only view of the values of a GridFunction on its native grid
+      made_array = made_array.copy()
+    return made_array
   elif isinstance(myst, float):
     return myst + 0*axis
   else:
@@ -1,4 +1,5 @@
 import numpy as np
+from pymoc.utils.grid_function import GridFunction
 
 
 def make_func(myst, axis, name):
@@ -23,18 +24,14 @@ def make_func(myst, axis, name):
                
                - If myst is a funcion, simply returns myst.
                - If myst is a float, returns a function that returns the value of myst.
-               - If myst is an array, returns an function that operates along the same dimension as axis, which returns the value :func:`made_func(axis[i])=myst[i]`, and interpolates values between points in axis.
+               - If myst is an array, returns a :class:`GridFunction` that operates along the same dimension as axis, which returns the value :func:`made_func(axis[i])=myst[i]`, and interpolates values between points in axis.
 
   """
 
   if callable(myst):
     return myst
   elif isinstance(myst, np.ndarray):
-
-    def funfun(x):
-      return np.interp(x, axis, myst)
-
-    return funfun
+    return GridFunction(myst, axis)
   elif isinstance(myst, float):
 
     def funfun(x):
@@ -0,0 +1,25 @@
+import os
+
+
+def replace_file(src, dst):
+  r"""
+  Move a file into place, replacing any existing file at the destination. On POSIX
+  systems, the replacement is atomic, so readers of the destination see either the old
+  or the new file, but never a partially written one.
+
+  Parameters
+  ----------
+
+  src : string
+        Path of the file to be moved (typically a temporary file that has been written
+        completely).
+  dst : string
+        Path of the destination.
+
+  """
+
+  if hasattr(os, 'replace'):
+    os.replace(src, dst)
+  else:
+    # Python 2 has no os.replace, but os.rename replaces the destination atomically on POSIX
+    os.rename(src, dst)
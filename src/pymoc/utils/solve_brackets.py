@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def solve_brackets(f, a, b, xtol=2e-12, maxiter=100, indexed=False):
+  r"""
+  Find the roots of many scalar functions at once, each bracketed by an interval
+  on which it changes sign, using the Illinois variant of the regula falsi method
+  (with bisection steps where that makes little progress). This is a vectorized
+  alternative to calling :func:`scipy.optimize.brenth` in a loop.
+
+  Parameters
+  ----------
+
+  f : function
+      A function that maps an ndarray of trial values to an ndarray of function values
+      of the same shape, where each element is an independent function of the
+      corresponding trial value.
+  a : float or ndarray
+      Lower ends of the brackets.
+  b : float or ndarray
+      Upper ends of the brackets.
+  xtol : float; optional
+         The absolute tolerance of the roots.
+  maxiter : int; optional
+            The maximum number of iterations. A RuntimeError is raised if any root has
+            not converged by then.
+  indexed : bool; optional
+            If True, f is called as f(x, idx), where idx indexes the (flattened) elements
+            that x belongs to, or is Ellipsis for all elements. Only elements that have not
+            yet converged are then evaluated. Defaults to False.
+
+  Returns
+  -------
+
+  x : ndarray
+      The roots, of the shape given by broadcasting f(a) and f(b).
+
+  """
+
+  if not indexed:
+    func = f
+    f = lambda x, idx: func(x)
+  fa = np.asarray(f(a, Ellipsis), dtype=float)
+  fb = np.asarray(f(b, Ellipsis), dtype=float)
+  shape = np.broadcast(fa, fb).shape
+  a = np.broadcast_to(np.asarray(a, dtype=float), shape).flatten()
+  b = np.broadcast_to(np.asarray(b, dtype=float), shape).flatten()
+  fa = np.broadcast_to(fa, shape).flatten()
+  fb = np.broadcast_to(fb, shape).flatten()
+  if np.any(fa * fb > 0):
+    raise ValueError('f(a) and f(b) must have different signs')
+
+  # move exact roots at the lower end of the bracket to the upper end:
+  b = np.where(fa == 0, a, b)
+  fb = np.where(fa == 0, 0., fb)
+  # indices of the unconverged elements, and the number of consecutive
+  # iterations in which each has retained the same end point:
+  idx = np.flatnonzero((fb != 0) & (np.abs(b - a) > xtol))
+  kept = np.zeros(idx.shape, dtype=int)
+  for i in range(maxiter):
+    if not idx.size:
+      break
+    ai, bi, fai, fbi = a[idx], b[idx], fa[idx], fb[idx]
+    c = bi - fbi * (bi-ai) / (fbi-fai)
+    # bisect where regula falsi makes little progress (e.g. where f is flat):
+    bisect = kept >= 3
+    c = np.where(bisect, 0.5 * (ai+bi), c)
+    if indexed:
+      fc = np.asarray(f(c, idx), dtype=float)
+    else:
+      x = b.copy()
+      x[idx] = c
+      fc = np.broadcast_to(f(x.reshape(shape), Ellipsis), shape).ravel()[idx]
+    # keep the root bracketed by [a, c], and halve the weight of an end point
+    # that is retained twice in a row to guarantee superlinear convergence:
+    swap = fc * fbi < 0
+    ai = np.where(swap, bi, ai)
+    a[idx] = ai
+    fa[idx] = np.where(swap, fbi, fai / 2.)
+    b[idx] = c
+    fb[idx] = fc
+    kept = np.where(swap, 0, kept + 1)
+    # a secant step below the tolerance means that b had already converged:
+    active = (fc != 0) & (np.abs(c - ai) > xtol) & (
+        bisect | (np.abs(c - bi) > 0.5 * xtol)
+    )
+    idx = idx[active]
+    kept = kept[active]
+  if idx.size:
+    raise RuntimeError(
+        'solve_brackets failed to converge after ' + str(maxiter) +
+        ' iterations'
+    )
+  return b.reshape(shape)
@@ -168,3 +168,55 @@ class TestSO_ML(object):
     assert (
         all([np.abs(b[i] - so_ml.bs[i]) / b[i] < 0.05 for i in range(len(b))])
     )
+
+  def test_calc_implicit_diffusion(self):
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    dy = y[1] - y[0]
+    dt = 60 * 86400
+    so_ml = SO_ML(y=y, Ks=400, bs=0.02 * np.sin(np.pi * y / 2.0e6)**2)
+
+    s = so_ml.Ks * dt / dy**2
+    U = so_ml.calc_diffusion_matrix(s)
+    V = so_ml.calc_diffusion_matrix(-s)
+    b = np.dot(np.dot(np.linalg.inv(U), V), so_ml.bs)
+    assert np.allclose(so_ml.calc_implicit_diffusion(dy, dt), b, atol=1e-15)
+
+    # the factorization is reused until the time step changes
+    lu = so_ml._diffusion_lu[1]
+    so_ml.calc_implicit_diffusion(dy, dt)
+    assert so_ml._diffusion_lu[1] is lu
+    so_ml.calc_implicit_diffusion(dy, 2 * dt)
+    assert so_ml._diffusion_lu[1] is not lu
+
+  def test_advdiff_advection(self):
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    b_basin = np.asarray(np.linspace(-0.002, 0.02, 80))
+    bs = 0.02 * y / 2.0e6 + 0.001 * np.sin(8 * np.pi * y / 2.0e6)
+    Psi_b = 10. * np.sin(np.pi * np.linspace(0, 1, 80)) + 0.1
+    conf = {'y': y, 'Ks': 100, 'h': 50, 'L': 4e6, 'surflux': 0.}
+
+    # all schemes agree for small timesteps
+    so_ml = {}
+    for advection in ['upwind', 'implicit', 'semi_lagrangian']:
+      so_ml[advection] = SO_ML(bs=bs.copy(), **conf)
+      so_ml[advection].advdiff(b_basin, Psi_b, 3600., advection=advection)
+    assert np.allclose(so_ml['implicit'].bs, so_ml['upwind'].bs, atol=1e-7)
+    assert np.allclose(
+        so_ml['semi_lagrangian'].bs, so_ml['upwind'].bs, atol=1e-7
+    )
+
+    # and the implicit and semi-Lagrangian schemes remain bounded far beyond
+    # the advective CFL limit
+    for advection in ['implicit', 'semi_lagrangian']:
+      so_ml = SO_ML(bs=bs.copy(), **conf)
+      so_ml.timestep(b_basin, Psi_b, 365 * 86400., advection=advection)
+      assert so_ml.bs.min() >= b_basin[0] - 1e-12
+      assert so_ml.bs.max() <= bs.max() + 1e-12
+      assert so_ml.bs[0] == b_basin[np.argwhere(Psi_b > 0)[0][0]]
+
+    with pytest.raises(TypeError) as advinfo:
+      so_ml.advdiff(b_basin, Psi_b, 3600., advection='lax-wendroff')
+    assert (
+        str(advinfo.value) ==
+        "advection needs to be 'upwind', 'implicit' or 'semi_lagrangian'"
+    )
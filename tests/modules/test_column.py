@@ -2,6 +2,7 @@ import sys
 import os
 import funcsigs
 import numpy as np
+from numpy import testing
 from scipy import integrate
 import pytest
 from pymoc.utils import make_func, make_array
@@ -171,6 +172,44 @@ class TestColumn(object):
     for z in column.z:
       assert col.Akappa(z) == Area(z) * kappa(z)
 
+  def test_grid_coeffs(self):
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    kappa1 = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+    kappa2 = lambda z: 2e-5 + 0. * z
+    column = Column(z=z, Area=6e13, kappa=kappa1)
+    coeffs = column.grid_coeffs()
+    testing.assert_array_equal(coeffs['kappa'], kappa1(z))
+    testing.assert_array_equal(coeffs['Area'], 6e13 + 0.*z)
+    testing.assert_array_equal(coeffs['Akappa'], column.Akappa(z))
+    testing.assert_array_equal(coeffs['dAkappa_dz'], column.dAkappa_dz(z))
+    testing.assert_array_equal(coeffs['dz'], z[1:] - z[:-1])
+    # repeated queries return the cached coefficients
+    assert column.grid_coeffs() is coeffs
+    # reassigning kappa switches to a new set of coefficients...
+    column.kappa = kappa2
+    testing.assert_array_equal(column.grid_coeffs()['kappa'], kappa2(z))
+    # ...while the previous set stays cached
+    column.kappa = kappa1
+    assert column.grid_coeffs() is coeffs
+    # kappa and Area are converted into functions on assignment
+    column.Area = np.linspace(5e13, 6e13, 80)
+    assert callable(column.Area)
+    testing.assert_array_equal(
+        column.grid_coeffs()['Area'], np.linspace(5e13, 6e13, 80)
+    )
+    # the cache is keyed on the values, so reassigning an array profile reuses it...
+    column.Area = 6e13
+    column.kappa = kappa1(z)
+    assert column.grid_coeffs() is coeffs
+    # ...while changes of a function's values only take effect on reassignment:
+    profile = kappa1(z)
+    column.kappa = lambda z: np.interp(z, column.z, profile)
+    assert column.grid_coeffs() is coeffs
+    profile *= 2.
+    assert column.grid_coeffs() is coeffs
+    column.kappa = column.kappa
+    testing.assert_array_equal(column.grid_coeffs()['kappa'], 2. * kappa1(z))
+
   def test_bc(self):
     column = Column(
         **{
@@ -216,6 +255,28 @@ class TestColumn(object):
         ))
     ).all()
 
+  def test_jac(self, column):
+    column.wA = np.sin
+    df_dy = column.ode_jac(column.z, [column.b, column.bz])
+    assert df_dy.shape == (2, 2, len(column.z))
+    assert (df_dy[0, 0] == 0).all() and (df_dy[0, 1] == 1).all()
+    assert (df_dy[1, 0] == 0).all()
+    testing.assert_array_equal(
+        df_dy[1, 1],
+        (np.sin(column.z) - column.dAkappa_dz(column.z)) /
+        column.Akappa(column.z)
+    )
+
+    bzbot = column.bzbot
+    column.bzbot = None
+    dbc_dya, dbc_dyb = column.bc_jac([0., 0.], [0., 0.])
+    testing.assert_array_equal(dbc_dya, [[1, 0], [0, 0]])
+    testing.assert_array_equal(dbc_dyb, [[0, 0], [1, 0]])
+    column.bzbot = 1e-6
+    dbc_dya, dbc_dyb = column.bc_jac([0., 0.], [0., 0.])
+    testing.assert_array_equal(dbc_dya, [[0, 1], [0, 0]])
+    column.bzbot = bzbot
+
   def test_solve_equi(self):
     column = Column(
         **{
@@ -244,6 +305,43 @@ class TestColumn(object):
         np.around(sol_values[1, :], decimals=2)
     )
 
+  def test_solve_equi_quadrature(self):
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    kappa = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+    wA = 5e6 * np.sin(np.pi * z / 4000.)
+    for bzbot in [None, 1e-6]:
+      config = {
+          'z': z,
+          'Area': 6e13,
+          'kappa': kappa,
+          'bs': 0.02,
+          'bbot': -0.001,
+          'bzbot': bzbot,
+          'b': 0.02 * np.exp(z / 500.)
+      }
+      column1 = Column(**config)
+      column2 = Column(**config)
+      column1.solve_equi(wA)
+      column2.solve_equi(wA, method='quadrature')
+      scale = np.max(np.abs(column1.b))
+      testing.assert_allclose(column2.b, column1.b, atol=2e-3 * scale)
+      testing.assert_allclose(
+          column2.bz, column1.bz, atol=2e-3 * np.max(np.abs(column1.bz))
+      )
+      # boundary conditions are satisfied exactly
+      assert column2.b[-1] == 0.02
+      if bzbot is None:
+        assert column2.b[0] == -0.001
+      else:
+        assert column2.bz[0] == bzbot
+
+    column = Column(**config)
+    with pytest.raises(TypeError) as minfo:
+      column.solve_equi(wA, method='shooting')
+    assert (
+        str(minfo.value) == "method needs to be either 'bvp' or 'quadrature'"
+    )
+
   def test_vertadvdiff(self):
     dt = 60 * 86400
 
@@ -322,6 +420,22 @@ class TestColumn(object):
     column2.convect()
     assert (any(column1.b != column2.b))
 
+    # a column initialized from a GridFunction on its own grid gets a writable copy:
+    column1 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
+    column2 = Column(
+        z=z,
+        b=make_func(b.copy(), z, 'b'),
+        bs=-0.0,
+        bbot=-0.04,
+        kappa=2e-5,
+        Area=Area
+    )
+    assert column2.b.flags.writeable
+    for scheme in ['explicit', 'implicit']:
+      column1.timestep(wA=wA, dt=dt, do_conv=True, scheme=scheme)
+      column2.timestep(wA=wA, dt=dt, do_conv=True, scheme=scheme)
+    testing.assert_array_equal(column1.b, column2.b)
+
     column1 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
     column2 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
     column1.timestep(wA=wA, dt=dt, b_in=b_in, vdx_in=vdx_in, do_conv=True)
@@ -330,7 +444,147 @@ class TestColumn(object):
     column2.horadv(vdx_in=vdx_in, b_in=b_in, dt=dt)
     assert (all(column1.b == column2.b))
 
+    column1 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
+    column2 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
+    column1.timestep(
+        wA=wA, dt=dt, b_in=b_in, vdx_in=vdx_in, do_conv=True, scheme='implicit'
+    )
+    column2.convect()
+    column2.implicit_vertadvdiff(wA=wA, dt=dt, do_conv=True, theta=1.0)
+    column2.horadv(vdx_in=vdx_in, b_in=b_in, dt=dt)
+    assert (all(column1.b == column2.b))
+
+    column1 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
+    column2 = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
+    column1.timestep(wA=wA, dt=dt, scheme='crank-nicolson')
+    column2.implicit_vertadvdiff(wA=wA, dt=dt, theta=0.5)
+    assert (all(column1.b == column2.b))
+
     column = Column(z=z, b=b.copy(), bs=-0.0, bbot=-0.04, kappa=2e-5, Area=Area)
     with pytest.raises(TypeError) as binfo:
       column.timestep(wA=wA, dt=dt, vdx_in=vdx_in)
     assert (str(binfo.value) == "b_in is needed if vdx_in is provided")
+
+    with pytest.raises(TypeError) as sinfo:
+      column.timestep(wA=wA, dt=dt, scheme='leapfrog')
+    assert (
+        str(sinfo.value) ==
+        "scheme needs to be 'explicit', 'implicit' or 'crank-nicolson'"
+    )
+
+  def test_calc_vertadvdiff_operator(self):
+    Area = 6e13
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    b = np.linspace(-np.sqrt(0.04), 0.0, 80)**2.
+    wA = 1e6 * np.sin(np.pi * z / 4000.)
+    dt = 30 * 86400
+    kappa = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+
+    column = Column(z=z, b=b.copy(), bs=0.0, bbot=0.04, kappa=kappa, Area=Area)
+    [lower, diag, upper] = column.calc_vertadvdiff_operator(wA)
+    db_dt = lower * b[:-2] + diag * b[1:-1] + upper * b[2:]
+    column.vertadvdiff(wA=wA, dt=dt)
+    testing.assert_allclose(column.b[1:-1], b[1:-1] + dt*db_dt, rtol=1e-12)
+
+  def test_implicit_vertadvdiff(self):
+    Area = 6e13
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    b = np.linspace(-np.sqrt(0.04), 0.0, 80)**2.
+    wA = 1e6 * np.sin(np.pi * z / 4000.)
+    kappa = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+
+    # for small timesteps, the implicit schemes agree with the explicit one
+    dt = 3600.
+    for theta in [1.0, 0.5]:
+      for bzbot in [None, 1e-6]:
+        config = {
+            'z': z,
+            'bs': 0.0,
+            'bbot': 0.04,
+            'bzbot': bzbot,
+            'kappa': kappa,
+            'Area': Area
+        }
+        column1 = Column(b=b.copy(), **config)
+        column2 = Column(b=b.copy(), **config)
+        column1.vertadvdiff(wA=wA, dt=dt)
+        column2.implicit_vertadvdiff(wA=wA, dt=dt, theta=theta)
+        testing.assert_allclose(column1.b[1:], column2.b[1:], atol=1e-6)
+        if bzbot is None:
+          assert column2.b[0] == 0.04
+        else:
+          testing.assert_approx_equal(
+              column2.b[1] - column2.b[0], bzbot * (z[1] - z[0])
+          )
+
+    # the factorization is reused for repeated steps with the same wA and dt
+    column = Column(z=z, b=b.copy(), bs=0.0, bbot=0.04, kappa=kappa, Area=Area)
+    column.implicit_vertadvdiff(wA=wA, dt=dt)
+    column.implicit_vertadvdiff(wA=wA, dt=dt)
+    assert len(column._implicit_lu) == 1
+    column.implicit_vertadvdiff(wA=2. * wA, dt=dt)
+    assert len(column._implicit_lu) == 2
+
+    # for long timesteps, the implicit scheme is stable and approaches
+    # the same equilibrium as the explicit scheme
+    column1 = Column(z=z, b=b.copy(), bs=0.0, bbot=0.04, kappa=kappa, Area=Area)
+    column2 = Column(z=z, b=b.copy(), bs=0.0, bbot=0.04, kappa=kappa, Area=Area)
+    for i in range(20000):
+      column1.vertadvdiff(wA=wA, dt=30 * 86400.)
+    for i in range(200):
+      column2.implicit_vertadvdiff(wA=wA, dt=3000 * 86400.)
+    testing.assert_allclose(column1.b, column2.b, atol=1e-5)
+
+  def test_calc_step_matrix(self):
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    b = 0.02 * np.exp(z / 500.) - 0.001
+    wA = 5e6 * np.sin(np.pi * z / 4000.)
+    kappa = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+    dt = 30 * 86400.
+    for bzbot in [None, 1e-6]:
+      for scheme in ['explicit', 'implicit', 'crank-nicolson']:
+        config = {
+            'z': z,
+            'Area': 6e13,
+            'kappa': kappa,
+            'bs': 0.02,
+            'bbot': -0.001,
+            'bzbot': bzbot
+        }
+        column = Column(b=b.copy(), **config)
+        [A, u0, u1] = column.calc_step_matrix(wA, dt, scheme=scheme)
+        bbc = -0.001 if bzbot is None else -bzbot * (z[1] - z[0])
+        column.timestep(wA=wA, dt=dt, scheme=scheme)
+        testing.assert_allclose(
+            column.b, np.dot(A, b) + bbc*u0 + 0.02*u1, atol=1e-15
+        )
+
+  def test_advance(self):
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    b = 0.02 * np.exp(z / 500.) - 0.001
+    wA = 5e6 * np.sin(np.pi * z / 4000.)
+    kappa = lambda z: 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+    dt = 30 * 86400.
+    config = {'z': z, 'Area': 6e13, 'kappa': kappa, 'bs': 0.02, 'bbot': -0.001}
+
+    for scheme in ['explicit', 'implicit']:
+      column1 = Column(b=b.copy(), **config)
+      column2 = Column(b=b.copy(), **config)
+      for ii in range(3):
+        for jj in range(12):
+          column1.timestep(wA=wA, dt=dt, do_conv=True, scheme=scheme)
+        column2.advance(wA=wA, dt=dt, nsteps=12, do_conv=True, scheme=scheme)
+      testing.assert_allclose(column1.b, column2.b, atol=1e-14)
+      # the propagator is reused for repeated jumps
+      assert len(column2._propagators) == 1
+
+    # if convection is active, the column is stepped regularly
+    bconv = b.copy()
+    bconv[-5:] = 0.03
+    column1 = Column(b=bconv.copy(), **config)
+    column2 = Column(b=bconv.copy(), **config)
+    for jj in range(12):
+      column1.timestep(wA=wA, dt=dt, do_conv=True)
+    column2.advance(wA=wA, dt=dt, nsteps=12, do_conv=True)
+    assert (all(column1.b == column2.b))
+    assert len(column2._propagators) == 0
@@ -0,0 +1,149 @@
+import sys
+import numpy as np
+from numpy import testing
+import pytest
+sys.path.append('/pymoc/src/pymoc/modules')
+from column import Column
+from column_ensemble import ColumnEnsemble
+
+z = np.asarray(np.linspace(-4000, 0, 80))
+
+
+def kappa1(z):
+  return 2e-5 + 1e-4 * np.exp(-(z+4000.) / 500.)
+
+
+def kappa2(z):
+  return 3e-5 + 0. * z
+
+
+@pytest.fixture(scope="module")
+def columns(request):
+  configs = [
+      {
+          'kappa': kappa1,
+          'Area': 6e13,
+          'bs': 0.02,
+          'bbot': -0.001,
+          'b': 0.02 * np.exp(z / 500.)
+      },
+      {
+          'kappa': kappa2,
+          'Area': 1e12,
+          'bs': 0.01,
+          'bbot': 0.0,
+          'b': 0.01 * (z / z[0])**2.
+      },
+      {
+          'kappa': kappa1,
+          'Area': np.linspace(4e13, 6e13, 80),
+          'bs': 0.025,
+          'bzbot': 1e-6,
+          'b': 0.03 * np.exp(z / 300.) - 0.001,
+          'N2min': 2e-7
+      },
+  ]
+  return [Column(z=z, **config) for config in configs]
+
+
+class TestColumnEnsemble(object):
+  def test_column_ensemble_init(self):
+    with pytest.raises(TypeError) as zinfo:
+      ColumnEnsemble(z=None, kappa=2e-5, Area=6e13)
+    assert (str(zinfo.value) == "z needs to be numpy array providing grid levels")
+
+    ensemble = ColumnEnsemble(
+        z=z, kappa=2e-5, Area=6e13, bs=np.array([0.01, 0.02, 0.03])
+    )
+    assert ensemble.n_members == 3
+    assert ensemble.b.shape == (3, len(z))
+    assert ensemble.kappa.shape == (3, len(z))
+    testing.assert_array_equal(ensemble.bbot, np.zeros(3))
+    assert np.isnan(ensemble.bzbot).all()
+
+    ensemble = ColumnEnsemble(
+        z=z, kappa=kappa1, Area=6e13, b=np.zeros((2, len(z)))
+    )
+    assert ensemble.n_members == 2
+    testing.assert_array_equal(ensemble.kappa[1], kappa1(z))
+
+    with pytest.raises(TypeError) as binfo:
+      ColumnEnsemble(
+          z=z, n_members=3, kappa=2e-5, Area=6e13, b=np.zeros((2, len(z)))
+      )
+    assert (
+        str(binfo.value) == "('b', 'needs to be of shape (n_members, len(z))')"
+    )
+
+  def test_from_columns(self, columns):
+    ensemble = ColumnEnsemble.from_columns(columns)
+    assert ensemble.n_members == len(columns)
+    for i, column in enumerate(columns):
+      testing.assert_array_equal(ensemble.b[i], column.b)
+      testing.assert_array_equal(ensemble.kappa[i], column.kappa(z))
+      testing.assert_array_equal(ensemble.dAkappa_dz[i], column.dAkappa_dz(z))
+      assert ensemble.bs[i] == column.bs
+    assert np.isnan(ensemble.bzbot[0])
+    assert ensemble.bzbot[2] == 1e-6
+
+  def test_timestep(self, columns):
+    wA = np.array([
+        5e6 * np.sin(np.pi * z / 4000.), -1e5 * np.sin(np.pi * z / 4000.),
+        -5e6 * np.sin(np.pi * z / 4000.)
+    ])
+    vdx_in = np.array([0. * z, 2e4 + 0. * z, 1e4 * (z < -3000.)])
+    b_in = -0.02 + 0. * z
+    dt = 30 * 86400.
+
+    ensemble = ColumnEnsemble.from_columns(columns)
+    columns = [
+        Column(
+            z=z,
+            kappa=c.kappa,
+            Area=c.Area,
+            bs=c.bs,
+            bbot=c.bbot,
+            bzbot=c.bzbot,
+            b=c.b.copy(),
+            N2min=c.N2min
+        ) for c in columns
+    ]
+    for ii in range(200):
+      do_conv = ii % 2 == 0
+      for i, column in enumerate(columns):
+        column.timestep(
+            wA=wA[i], dt=dt, do_conv=do_conv, vdx_in=vdx_in[i], b_in=b_in
+        )
+      ensemble.timestep(
+          wA=wA, dt=dt, do_conv=do_conv, vdx_in=vdx_in, b_in=b_in
+      )
+    for i, column in enumerate(columns):
+      testing.assert_array_equal(ensemble.b[i], column.b)
+
+    with pytest.raises(TypeError) as binfo:
+      ensemble.timestep(wA=wA, dt=dt, vdx_in=vdx_in)
+    assert (str(binfo.value) == "b_in is needed if vdx_in is provided")
+
+  def test_convect(self):
+    N2min = 1.5e-7
+    zc = np.asarray([-4000.0, -1000.0, -100.0, 0.0])
+    b = np.asarray([[-0.03, -0.02, 0.01, 0.01], [0.02, 0.02, 0.03, 0.04],
+                    [-0.03, -0.02, -0.01, -0.005]])
+    ensemble = ColumnEnsemble(
+        z=zc, b=b.copy(), bs=0.0, N2min=N2min, kappa=2e-5, Area=6e13
+    )
+    ensemble.convect()
+    for i in range(3):
+      column = Column(
+          z=zc, b=b[i].copy(), bs=0.0, N2min=N2min, kappa=2e-5, Area=6e13
+      )
+      column.convect()
+      testing.assert_array_equal(ensemble.b[i], column.b)
+
+  def test_kappa_update(self, columns):
+    ensemble = ColumnEnsemble.from_columns(columns)
+    kappa = ensemble.kappa.copy()
+    kappa[0] = kappa2(z)
+    ensemble.kappa = kappa
+    column = Column(z=z, kappa=kappa2, Area=columns[0].Area)
+    testing.assert_array_equal(ensemble.dAkappa_dz[0], column.dAkappa_dz(z))
@@ -366,3 +366,146 @@ class TestEqui_Column(object):
          (A*kappa))[[i for i in range(len(dpsi_dzzzz)) if i not in indices]],
         decimal=4
     )
+
+  def test_sweep(self):
+    z = np.asarray(np.linspace(-4000, 0, 80))
+    kappa = lambda z: 1e-5 + 3e-5 * np.exp(z / 100) + 3e-4 * np.exp(-z/1000 - 4)
+    B_int = np.linspace(3e3, 2e4, 5)
+    column = Equi_Column(z=z, A=8e13, kappa=kappa, B_int=3e3)
+    psi, b, H = column.sweep('B_int', B_int)
+    assert psi.shape == (len(B_int), len(z))
+    assert b.shape == (len(B_int), len(z))
+    assert all(np.diff(H) < 0)
+    testing.assert_array_equal(psi[-1], column.psi)
+    assert H[-1] == column.H
+
+    # each solution matches an independent solve from the default initial guess
+    for i in [0, 2, 4]:
+      ref = Equi_Column(z=z, A=8e13, kappa=kappa, B_int=B_int[i])
+      ref.solve()
+      assert np.abs(H[i] - ref.H) < 1.
+      assert np.nanmax(np.abs(psi[i] - ref.psi)) < 1e-2
+
+    psi_so = [
+        lambda z, m=m: m * 1e6 * np.sin(np.pi * np.maximum(z, -2000) / 2000)**2
+        for m in [0.5, 10.]
+    ]
+    column = Equi_Column(z=z, A=8e13, kappa=kappa, B_int=3e3)
+    psi, b, H = column.sweep('psi_so', psi_so)
+    assert H[1] > H[0]
+
+    # sweeping B_int replaces a bottom buoyancy boundary condition
+    column = Equi_Column(z=z, A=8e13, kappa=kappa, b_bot=0.)
+    psi, b, H = column.sweep('B_int', B_int[:2])
+    assert column.b_bot is None
+    assert column.B_int == B_int[1]
+    ref = Equi_Column(z=z, A=8e13, kappa=kappa, B_int=B_int[1])
+    ref.solve()
+    assert np.abs(H[1] - ref.H) < 1.
+
+    class Failure(object):
+      success = False
+
+    column = Equi_Column(z=z, A=8e13, kappa=kappa, B_int=3e3)
+    column.calc_bvp = lambda: Failure()
+    with pytest.raises(RuntimeError) as rinfo:
+      column.sweep('A', [9e13, 1e14])
+    assert str(rinfo.value) == (
+        'Equi_Column.sweep failed to converge for A at value ' + str(9e13)
+    )
+
+    with pytest.raises(TypeError) as pinfo:
+      column.sweep('nz', [100, 200])
+    assert (
+        str(pinfo.value) ==
+        "param needs to be one of 'b_s', 'b_bot', 'B_int', 'A', 'kappa' or 'psi_so'"
+    )
+
+  def test_dkappa_dz_table(self):
+    kappa = lambda z: 1e-5 + 3e-5 * np.exp(z / 100) + 3e-4 * np.exp(-z/1000 - 4)
+    dkappa_dz = lambda z: (
+        3e-7 * np.exp(z / 100) - 3e-7 * np.exp(-z/1000 - 4)
+    )
+    column = Equi_Column(A=8e13, kappa=kappa)
+    zi = np.linspace(-1, 0, 50)
+    testing.assert_allclose(
+        column.dkappa_dz(zi, 2000.),
+        dkappa_dz(zi * 2000.) / (2000. * column.f),
+        rtol=1e-4,
+        atol=1e-10
+    )
+    table = column._dkappa_dz_table
+    column.dkappa_dz(zi, 1500.)
+    assert column._dkappa_dz_table is table
+    column.dkappa_dz(zi, 5000.)
+    assert column._dkappa_dz_table[0][0] <= -5000.
+
+  def test_calc_coeffs(self):
+    column = Equi_Column(A=8e13, kappa=np.linspace(1e-4, 1e-5, 80),
+                         z=np.linspace(-4000, 0, 80))
+    zi = np.linspace(-1, 0, 50)
+    coeffs = column.calc_coeffs(zi, 2000.)
+    testing.assert_array_equal(coeffs[0], column.alpha(zi, 2000.))
+    testing.assert_array_equal(coeffs[2], column.dkappa_dz(zi, 2000.))
+    assert column.calc_coeffs(zi, 2000.) is coeffs
+    assert column.calc_coeffs(zi, 1000.) is not coeffs
+    column.set_param('A', 4e13)
+    testing.assert_array_equal(
+        column.calc_coeffs(zi, 1000.)[0], column.alpha(zi, 1000.)
+    )
+    # a kappa function is evaluated once per mesh and H:
+    calls = []
+    kappa = lambda z: calls.append(z) or 1e-5 + 3e-5 * np.exp(z / 100)
+    column = Equi_Column(
+        A=8e13, kappa=kappa, dkappa_dz=lambda z: 3e-7 * np.exp(z / 100)
+    )
+    ncalls = len(calls)
+    for i in range(3):
+      column.ode(zi, np.ones((4, len(zi))), np.array([2000.]))
+    assert len(calls) == ncalls + 1
+
+  def test_jac(self):
+    kappa = lambda z: 1e-5 + 3e-5 * np.exp(z / 100) + 3e-4 * np.exp(-z/1000 - 4)
+    psi_so = lambda z: 4e6 * np.sin(np.pi * np.maximum(z, -2000) / 2000)**2
+    zi = np.linspace(-1, 0, 30)
+    y = np.vstack((np.sin(np.pi * zi), np.cos(np.pi * zi), zi, -100. + zi))
+    p = np.array([1800.])
+    for b_bot in [None, -0.001]:
+      column = Equi_Column(A=8e13, kappa=kappa, psi_so=psi_so, b_bot=b_bot)
+      df_dy, df_dp = column.ode_jac(zi, y, p)
+      dbc_dya, dbc_dyb, dbc_dp = column.bc_jac(y[:, 0], y[:, -1], p)
+      f0 = column.ode(zi, y, p)
+      bc0 = column.bc(y[:, 0], y[:, -1], p)
+      for i in range(4):
+        dy = np.zeros((4, 1))
+        dy[i] = 1e-6 * (1 + np.abs(y[i]).max())
+        testing.assert_allclose(
+            df_dy[:, i], (column.ode(zi, y + dy, p) - f0) / dy[i],
+            rtol=1e-4,
+            atol=1e-6
+        )
+        testing.assert_allclose(
+            dbc_dya[:, i],
+            (column.bc(y[:, 0] + dy[:, 0], y[:, -1], p) - bc0) / dy[i],
+            atol=1e-6
+        )
+        testing.assert_allclose(
+            dbc_dyb[:, i],
+            (column.bc(y[:, 0], y[:, -1] + dy[:, 0], p) - bc0) / dy[i],
+            atol=1e-6
+        )
+      dp = 1e-6 * p
+      testing.assert_allclose(
+          df_dp[:, 0], (column.ode(zi, y, p + dp) - f0) / dp,
+          rtol=1e-3,
+          atol=1e-6
+      )
+      testing.assert_allclose(
+          dbc_dp[:, 0], (column.bc(y[:, 0], y[:, -1], p + dp) - bc0) / dp,
+          rtol=1e-4,
+          atol=1e-9
+      )
+
+    column.H = 2000.
+    assert column.ode_jac(zi, y).shape == (4, 4, len(zi))
+    assert column.bc_jac(y[:, 0], y[:, -1])[0].shape == (4, 4)
@@ -2,6 +2,7 @@ import pytest
 import funcsigs
 import sys
 import numpy as np
+from numpy import testing
 sys.path.append('/pymoc/src/pymoc/modules')
 from psi_SO import Psi_SO
 from pymoc.utils import make_func
@@ -132,6 +133,70 @@ class TestPsi_SO(object):
                    decimals=3) == np.round(psi_so.y[i], decimals=3)
       )
 
+  def test_ys_array(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    # non-monotonic surface buoyancy with a minimum near the southern boundary
+    bs = 0.02 * (1. - np.cos(np.pi * y / 4e6)) - 0.001 * np.exp(-y / 2e5)
+    psi_so = Psi_SO(z=z, y=y, b=0.02 * np.exp(z / 500.), bs=bs, tau=0.12)
+    b = np.linspace(-0.003, 0.025, 200)
+    ys = psi_so.ys(b)
+    assert ys.shape == b.shape
+    minind = np.argmin(bs)
+    for i in range(len(b)):
+      assert ys[i] == psi_so.ys(b[i])
+      if b[i] < np.min(bs):
+        assert ys[i] == y[0] - 1e3
+      elif b[i] > bs[-1]:
+        assert ys[i] == y[-1]
+      else:
+        assert ys[i] >= y[minind]
+        assert np.abs(psi_so.bs(ys[i]) - b[i]) < 1e-12
+    # the lookup table is rebuilt when bs is updated
+    psi_so.update(bs=bs + 0.001)
+    assert np.abs(psi_so.bs(psi_so.ys(0.01)) - 0.01) < 1e-12
+    testing.assert_allclose(psi_so.ys(b + 0.001), ys)
+    # bs arrays are copied, so later changes in place don't desync bs and the table:
+    bs_new = bs + 0.001
+    psi_so.update(bs=bs_new)
+    bs_new[:] = 0.
+    assert psi_so.bs(y[-1]) == bs[-1] + 0.001
+    testing.assert_allclose(psi_so.ys(b + 0.001), ys)
+
+  def test_table_refinement(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    b = 0.02 * np.exp(z / 500.)
+    bs = lambda y: 0.02 * y / 2e6
+    # only functions are sampled on a refined grid, scalars and arrays are not:
+    psi_so = Psi_SO(z=z, y=y, b=b, bs=bs(y), tau=np.float64(0.12))
+    assert len(psi_so._ys_table[1]) == len(y)
+    assert len(psi_so._tau_table[0]) == len(y)
+    psi_so = Psi_SO(z=z, y=y, b=b, bs=bs, tau=lambda y: 0.12 + 0. * y)
+    assert len(psi_so._ys_table[1]) > len(y)
+    assert len(psi_so._tau_table[0]) > len(y)
+
+  def test_calc_tau_ave(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    y0 = np.concatenate(([y[0] - 1e3], np.linspace(0, 2.0e6, 37)))
+    for tau in [
+        0.12,
+        0.1 + 0.05 * np.sin(np.pi * y / 2e6),
+        lambda y: 0.1 + 0.05 * np.sin(np.pi * y / 2e6),
+    ]:
+      psi_so = Psi_SO(z=z, y=y, b=0.02 * np.exp(z / 500.), bs=0.02, tau=tau)
+      tau_ave = psi_so.calc_tau_ave(y0)
+      for i in range(len(y0) - 1):
+        # compare to the mean of a finely sampled wind stress
+        ysample = np.linspace(y0[i], y[-1], 100001)
+        testing.assert_allclose(
+            tau_ave[i], np.mean(psi_so.tau(ysample) + 0. * ysample), rtol=1e-5
+        )
+        assert tau_ave[i] == psi_so.calc_tau_ave(y0[i])
+      # at the northern end, the mean is the local wind stress
+      assert tau_ave[-1] == psi_so.tau(y[-1])
+
   def test_calc_N2(self, psi_so):
     N2 = (psi_so.b(psi_so.z[1]) -
           psi_so.b(psi_so.z[0])) / (psi_so.z[1] - psi_so.z[0])
@@ -368,6 +433,34 @@ class TestPsi_SO(object):
         )
     )
 
+  def test_solve_GM_bvp(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    y = np.asarray(np.linspace(0, 2.0e6, 51))
+    for bvp_with_Ek in [False, True]:
+      psi_so = Psi_SO(
+          z=z,
+          y=y,
+          b=0.02 * np.exp(z / 500.) - 0.001,
+          bs=np.linspace(-0.001, 0.02, 51),
+          tau=0.12,
+          c=0.3,
+          L=4e6,
+          KGM=800.,
+          bvp_with_Ek=bvp_with_Ek
+      )
+      psi_so.Psi_Ek = psi_so.calc_Ekman() / 1e6
+      GM_bvp = psi_so.calc_GM(method='bvp')
+      GM = psi_so.calc_GM()
+      testing.assert_allclose(GM, GM_bvp, atol=0.01 * np.max(np.abs(GM_bvp)))
+      # boundary conditions are satisfied exactly
+      testing.assert_allclose(
+          psi_so.bc_GM([GM[0], 0.], [GM[-1], 0.]), 0., atol=1e-6
+      )
+
+    with pytest.raises(TypeError) as minfo:
+      psi_so.calc_GM(method='shooting')
+    assert (str(minfo.value) == "method needs to be either 'direct' or 'bvp'")
+
   def test_solve(self):
     c = 1e3
     h = -4000
@@ -96,6 +96,29 @@ class TestPsi_Thermwind(object):
                        len(psi.z) - 1)
     ])
 
+  def test_calc_green_matrix(self, psi):
+    # exact for right hand sides that are linear in z
+    r = 1e-3 * (psi.z - psi.z[0])
+    H = psi.z[-1] - psi.z[0]
+    zeta = psi.z - psi.z[0]
+    p = 1e-3 * (zeta**3 / 6.0 - H**2 * zeta / 6.0)
+    testing.assert_allclose(np.dot(psi.green, r), p, atol=1e-6)
+    assert psi.green.shape == (len(psi.z), len(psi.z))
+
+  def test_solve_direct(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    psi = Psi_Thermwind(
+        z=z, b1=0.02 * np.exp(z / 500.), b2=-0.001 * (z / z[0])**2.
+    )
+    psi.solve(method='bvp')
+    Psi_bvp = psi.Psi.copy()
+    psi.solve(method='direct')
+    testing.assert_allclose(psi.Psi, Psi_bvp, atol=1e-3)
+    assert psi.Psi[0] == 0. and psi.Psi[-1] == 0.
+    with pytest.raises(TypeError) as minfo:
+      psi.solve(method='shooting')
+    assert (str(minfo.value) == "method needs to be either 'direct' or 'bvp'")
+
   def test_Psib(self):
     psi = Psi_Thermwind(
         **{
@@ -107,7 +130,7 @@ class TestPsi_Thermwind(object):
     )
 
     d = -4e3
-    psi.solve()
+    psi.solve(method='bvp')
     dp_dz = np.gradient(psi.Psi, psi.z[1] - psi.z[0])
     [zom, zop] = psi.z[np.where(np.abs(dp_dz) == np.min(np.abs(dp_dz)))]
     izom = np.where(psi.z == zom)[0][0]
@@ -138,6 +161,28 @@ class TestPsi_Thermwind(object):
 
     assert np.sqrt((psib[bo:bf] - psi.Psib()[bo:bf])**2).mean() < 0.25
 
+  def test_Psib_layers(self):
+    # compare against a direct evaluation of the layer-wise remapping
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    b1 = 0.02 * np.exp(z / 500.) + 1e-3 * np.sin(z / 100.)
+    for b2 in [-0.001 * (z / z[0])**2. + 5e-4 * np.cos(z / 70.), 0.]:
+      psi = Psi_Thermwind(z=z, b1=b1, b2=b2)
+      psi.solve()
+      b2 = psi.b2(z)
+      for nb in [20, 500]:
+        psib = psi.Psib(nb=nb)
+        udydz = -(psi.Psi[1:] - psi.Psi[:-1])
+        bup_bot = np.where(udydz < 0, b2[:-1], b1[:-1])
+        bup_top = np.where(udydz < 0, b2[1:], b1[1:])
+        for i in range(nb):
+          b = psi.bgrid[i]
+          with np.errstate(divide='ignore', invalid='ignore'):
+            mask = np.clip((bup_top-b) / (bup_top-bup_bot), 0., 1.)
+          mask[bup_top == bup_bot] = np.where(
+              b == bup_top, 0.5, b < bup_top
+          )[bup_top == bup_bot]
+          testing.assert_allclose(psib[i], np.sum(mask * udydz), atol=1e-9)
+
   def test_Psibz(self, psi):
     psi = Psi_Thermwind(
         **{
@@ -149,7 +194,7 @@ class TestPsi_Thermwind(object):
     )
 
     d = -4e3
-    psi.solve()
+    psi.solve(method='bvp')
     dp_dz = np.gradient(psi.Psi, psi.z[1] - psi.z[0])
     [zom, zop] = psi.z[np.where(np.abs(dp_dz) == np.min(np.abs(dp_dz)))]
     izom = np.where(psi.z == zom)[0][0]
@@ -192,6 +237,42 @@ class TestPsi_Thermwind(object):
     psib -= 1.5
     assert np.sqrt((psib[bo:bf] - psi.Psibz()[1][bo:bf])**2).mean() < 0.3
 
+  def test_remap_cache(self):
+    z = np.asarray(np.linspace(-4000, 0, 81))
+    psi = Psi_Thermwind(z=z, b1=np.linspace(0.03, -0.01, 81), b2=0.)
+    psi.solve()
+    calls = []
+    calc_Psib = psi.calc_Psib
+
+    def counting_calc_Psib(nb=500):
+      calls.append(nb)
+      return calc_Psib(nb)
+
+    psi.calc_Psib = counting_calc_Psib
+    [psib1, psibz1] = [psi.Psib(nb=100), psi.Psibz(nb=100)]
+    [psib2, psibz2] = [psi.Psib(nb=100), psi.Psibz(nb=100)]
+    assert calls == [100]
+    testing.assert_array_equal(psib1, psib2)
+    testing.assert_array_equal(psibz1[0], psibz2[0])
+    testing.assert_array_equal(psibz1[1], psibz2[1])
+    # the cache is kept separately for each nb
+    psi.Psibz(nb=50)
+    assert calls == [100, 50]
+    assert len(psi.bgrid) == 50
+    psi.Psib(nb=100)
+    assert len(psi.bgrid) == 100
+    # returned arrays can be modified without affecting the cache
+    psib2[:] = 0.
+    testing.assert_array_equal(psi.Psib(nb=100), psib1)
+    # update and solve invalidate the cache
+    version = psi.version
+    psi.update(b2=-0.001)
+    assert psi.version == version + 1
+    psi.Psib(nb=100)
+    psi.solve()
+    psi.Psib(nb=100)
+    assert calls == [100, 50, 100, 100]
+
   def test_update(self, psi):
     b1 = 10.0
     b2 = 50.0
@@ -0,0 +1,37 @@
+import sys
+import pytest
+import numpy as np
+from numpy import testing
+sys.path.append('/pymoc/src/pymoc/plotting')
+from interp_channel import Interpolate_channel
+
+y = np.asarray(np.linspace(0, 2.0e6, 51))
+z = np.asarray(np.linspace(-4000, 0, 80))
+bn = 0.03 * np.exp(z / 800.) - 0.002
+bs = -0.001 + (bn[-1] + 0.001) * (y / 2.0e6)**0.7
+
+
+@pytest.fixture(scope="module")
+def interp_channel(request):
+  return Interpolate_channel(y=y, z=z, bs=bs, bn=bn)
+
+
+class TestInterpolate_channel(object):
+  def test_sbot(self, interp_channel):
+    l = y[-1]
+    assert np.abs(interp_channel.bn(-interp_channel.sbot * l) - bs[0]) < 1e-12
+
+  def test_call_and_gridit(self, interp_channel):
+    barray = interp_channel.gridit()
+    assert barray.shape == (len(y), len(z))
+    for iy in range(0, len(y), 10):
+      for iz in range(0, len(z), 10):
+        b = interp_channel(y[iy], z[iz])
+        assert np.ndim(b) == 0
+        assert b == barray[iy, iz]
+    # buoyancy is unchanged at the northern end of the channel:
+    testing.assert_array_equal(barray[-1], bn)
+    # and isopycnals that outcrop in the channel connect to the surface buoyancy there:
+    testing.assert_allclose(
+        interp_channel(y[1:-1], 0.), bs[1:-1], rtol=1e-6, atol=1e-9
+    )
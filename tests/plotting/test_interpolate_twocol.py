@@ -0,0 +1,48 @@
+import sys
+import pytest
+import numpy as np
+from numpy import testing
+sys.path.append('/pymoc/src/pymoc/plotting')
+from interp_twocol import Interpolate_twocol
+
+y = np.asarray(np.linspace(0, 1.5e6, 20))
+z = np.asarray(np.linspace(-4000, 0, 80))
+bs = 0.03 * np.exp(z / 800.) - 0.002
+bn = 0.02 * np.exp(z / 500.) + bs[0] - 0.02 * np.exp(z[0] / 500.)
+
+
+@pytest.fixture(scope="module")
+def interp_twocol(request):
+  return Interpolate_twocol(y=y, z=z, bs=bs, bn=bn)
+
+
+class TestInterpolate_twocol(object):
+  def test_call_and_gridit(self, interp_twocol):
+    barray = interp_twocol.gridit()
+    assert barray.shape == (len(y), len(z))
+    for iy in range(0, len(y), 5):
+      for iz in range(0, len(z), 10):
+        b = interp_twocol(y[iy], z[iz])
+        assert np.ndim(b) == 0
+        assert np.abs(b - barray[iy, iz]) < 1e-12
+    # the buoyancy matches the two profiles at either end:
+    testing.assert_allclose(barray[0, 1:-1], bs[1:-1], atol=1e-9)
+    testing.assert_allclose(barray[-1, 1:-1], bn[1:-1], atol=1e-6)
+
+  def test_sbot(self, interp_twocol):
+    l = y[-1]
+    assert np.abs(interp_twocol.bs(-interp_twocol.sbot * l) - bn[-1]) < 1e-12
+
+  def test_batch(self, interp_twocol):
+    amp = np.linspace(0.5, 1.5, 4)[:, np.newaxis]
+    bs_t = bs[np.newaxis, :] * amp
+    bn_t = (bn - bn[0])[np.newaxis, :] * amp + bs_t[:, :1]
+    interp = Interpolate_twocol(y=y, z=z, bs=bs_t, bn=bn_t)
+    assert interp.sbot.shape == (4, )
+    barray = interp.gridit()
+    assert barray.shape == (4, len(y), len(z))
+    assert interp(y[3], z[20]).shape == (4, )
+    for i in range(4):
+      interp_i = Interpolate_twocol(y=y, z=z, bs=bs_t[i], bn=bn_t[i])
+      assert np.abs(interp.sbot[i] - interp_i.sbot) < 1e-14
+      testing.assert_allclose(barray[i], interp_i.gridit(), atol=1e-12)
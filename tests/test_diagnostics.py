@@ -0,0 +1,156 @@
+import os
+import sys
+import numpy as np
+import pytest
+from numpy import testing
+sys.path.append('/pymoc/src/pymoc')
+from diagnostics import DiagnosticsWriter, Diagnostics, ChunkedSeries
+from test_model import make_modules, make_model
+
+
+class TestDiagnostics(object):
+  def test_writer(self, tmp_path):
+    path = str(tmp_path / 'diags')
+    z = np.linspace(-4000, 0, 80)
+    writer = DiagnosticsWriter(path, chunk_size=4)
+    writer.write_static('z', z)
+    writer.register('step', dtype=int)
+    for i in range(10):
+      writer.append(step=i, b=z * i, time=i * 86400.)
+    # two chunks have been written, and two snapshots are buffered:
+    assert writer.count == 10
+    diags = Diagnostics(path)
+    assert len(diags) == 8
+    assert len(diags.chunks('b')) == 2
+    assert sorted(diags.keys()) == ['b', 'step', 'time', 'z']
+    writer.close()
+
+    diags = Diagnostics(path)
+    assert len(diags) == 10
+    testing.assert_array_equal(diags['z'], z)
+    testing.assert_array_equal(diags['step'], np.arange(10))
+    assert diags['step'].dtype == int
+    testing.assert_array_equal(diags['b'], np.arange(10)[:, np.newaxis] * z)
+    assert isinstance(diags.chunks('b')[0], np.memmap)
+    assert os.path.exists(os.path.join(path, 'b.00002.npy'))
+
+    # fields stored in several chunks are not loaded until they are indexed:
+    b = diags['b']
+    assert isinstance(b, ChunkedSeries)
+    assert all(isinstance(chunk, np.memmap) for chunk in b.chunks)
+    assert b.shape == (10, 80)
+    assert len(b) == 10
+    ref = np.arange(10)[:, np.newaxis] * z
+    testing.assert_array_equal(b[-1], ref[-1])
+    testing.assert_array_equal(b[3, 5], ref[3, 5])
+    masked = ref[:, 1] < -1e4
+    for index in [slice(2, 9), slice(None, None, -3), [7, 1, 4, -1], masked]:
+      testing.assert_array_equal(b[index], ref[index])
+      testing.assert_array_equal(b[index, 10:20], ref[index, 10:20])
+    assert b[5:5].shape == (0, 80)
+    with pytest.raises(IndexError):
+      b[10]
+
+    # appending to the existing diagnostics:
+    with DiagnosticsWriter(path, chunk_size=4, append=True) as writer:
+      assert writer.count == 10
+      writer.append(step=10, b=z * 10, time=10 * 86400.)
+    diags = Diagnostics(path)
+    testing.assert_array_equal(diags['step'], np.arange(11))
+    # without append, the diagnostics are replaced:
+    writer = DiagnosticsWriter(path)
+    assert len(Diagnostics(path)) == 0
+
+  def test_writer_errors(self, tmp_path):
+    writer = DiagnosticsWriter(str(tmp_path / 'diags'))
+    writer.register('b', shape=(3, ))
+    with pytest.raises(TypeError) as info:
+      writer.register('b')
+    assert str(info.value) == 'diagnostic b is already registered'
+    writer.append(b=np.zeros(3), c=1.)
+    with pytest.raises(TypeError) as info:
+      writer.append(b=np.zeros(3))
+    assert str(info.value) == 'snapshots need to include exactly the fields b, c'
+    with pytest.raises(TypeError) as info:
+      writer.register('d')
+    assert (
+        str(info.value) ==
+        'diagnostic d needs to be registered before the first snapshot'
+    )
+
+  def test_model_run(self, tmp_path):
+    dt = 86400. * 30.
+    modules = make_modules()
+    model = make_model(modules)
+    model.run(96, dt, coupler_iters=24, snapshot_iters=24)
+    snapshots = model.snapshots
+
+    modules = make_modules()
+    model = make_model(modules)
+    with DiagnosticsWriter(str(tmp_path / 'diags'), chunk_size=3) as writer:
+      model.run(96, dt, coupler_iters=24, snapshot_iters=24, diagnostics=writer)
+    assert model.snapshots == {}
+    diags = Diagnostics(str(tmp_path / 'diags'))
+    assert sorted(diags.keys()) == sorted(snapshots.keys())
+    for key in snapshots:
+      testing.assert_array_equal(diags[key], snapshots[key])
+
+  def test_truncate(self, tmp_path):
+    path = str(tmp_path / 'diags')
+    writer = DiagnosticsWriter(path, chunk_size=4)
+    for i in range(10):
+      writer.append(step=i)
+    writer.truncate(9)
+    assert writer.count == 9
+    writer.truncate(6)
+    assert writer.count == 6
+    assert len(Diagnostics(path)) == 4
+    assert not os.path.exists(os.path.join(path, 'step.00001.npy'))
+    for i in range(6, 9):
+      writer.append(step=10 * i)
+    writer.close()
+    testing.assert_array_equal(
+        Diagnostics(path)['step'], [0, 1, 2, 3, 4, 5, 60, 70, 80]
+    )
+    with pytest.raises(TypeError) as info:
+      writer.truncate(10)
+    assert str(info.value) == 'cannot truncate 9 snapshots to 10'
+
+  def test_model_restart(self, tmp_path):
+    dt = 86400. * 30.
+    checkpoint = str(tmp_path / 'checkpoint.npz')
+    model = make_model(make_modules())
+    with DiagnosticsWriter(str(tmp_path / 'ref'), chunk_size=3) as writer:
+      model.run(240, dt, coupler_iters=24, snapshot_iters=24, diagnostics=writer)
+
+    # interrupted after a checkpoint at iteration 192, with more snapshots written since:
+    model = make_model(make_modules())
+    with DiagnosticsWriter(str(tmp_path / 'diags'), chunk_size=3) as writer:
+      model.run(
+          220,
+          dt,
+          coupler_iters=24,
+          snapshot_iters=24,
+          diagnostics=writer,
+          checkpoint_iters=96,
+          checkpoint_file=checkpoint
+      )
+    model = make_model(make_modules())
+    with DiagnosticsWriter(
+        str(tmp_path / 'diags'), chunk_size=3, append=True
+    ) as writer:
+      assert writer.count == 10
+      model.restart(checkpoint, diagnostics=writer)
+      assert writer.count == 8
+      model.run(
+          240 - model.iteration,
+          dt,
+          coupler_iters=24,
+          snapshot_iters=24,
+          diagnostics=writer
+      )
+    ref = Diagnostics(str(tmp_path / 'ref'))
+    diags = Diagnostics(str(tmp_path / 'diags'))
+    assert len(diags) == 10
+    for key in ref.keys():
+      testing.assert_array_equal(diags[key], ref[key])
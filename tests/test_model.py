@@ -0,0 +1,300 @@
+import sys
+import numpy as np
+from numpy import testing
+import pytest
+sys.path.append('/pymoc/src/pymoc')
+from model import Model
+from pymoc.modules import Column, SO_ML, Psi_Thermwind, Psi_SO
+
+z = np.asarray(np.linspace(-4000, 0, 80))
+y = np.asarray(np.linspace(0, 2e6, 40))
+bs_SO = 0.03 * (y / y[-1])**2
+
+
+def b_basin(z):
+  return 0.03 * np.exp(z / 300.)
+
+
+def b_north(z):
+  return 0.004 * np.exp(z / 300.)
+
+
+def make_modules():
+  return {
+      'AMOC': Psi_Thermwind(z=z, b1=b_basin, b2=b_north, f=1e-4),
+      'SO':
+      Psi_SO(
+          z=z, y=y, b=b_basin(z), bs=bs_SO, tau=0.13, f=1e-4, L=5e6, KGM=1000.
+      ),
+      'basin': Column(z=z, kappa=2e-5, Area=6e13, b=b_basin, bs=0.03, bbot=0.),
+      'north':
+      Column(z=z, kappa=2e-5, Area=1.2e12, b=b_north, bs=0.004, bbot=0.),
+      'channel':
+      SO_ML(y=y, Ks=500., rest_mask=1., b_rest=bs_SO, bs=bs_SO.copy())
+  }
+
+
+def make_model(modules, **options):
+  model = Model()
+  model.add_module(modules['basin'], 'basin', **options)
+  model.add_module(modules['north'], 'north', do_conv=True, **options)
+  model.add_module(modules['channel'], 'channel')
+  model.add_module(modules['AMOC'], 'AMOC', left='basin', right='north')
+  model.add_module(modules['SO'], 'SO', left='channel', right='basin')
+  return model
+
+
+class TestModel(object):
+  def test_add_module(self):
+    modules = make_modules()
+    model = make_model(modules)
+    assert model.columns == ['basin', 'north']
+    assert model.mixed_layers == ['channel']
+    assert model.couplers == ['AMOC', 'SO']
+    assert model['basin'] is modules['basin']
+    assert model.options['north']['do_conv']
+    assert model.options['AMOC']['nb'] == 500
+    assert model.neighbors['SO'] == ('channel', 'basin')
+    assert model.wA['basin'].shape == z.shape
+
+    with pytest.raises(TypeError) as info:
+      model.add_module(modules['basin'], 'basin')
+    assert str(info.value) == 'module name basin is already in use'
+    with pytest.raises(TypeError) as info:
+      model.add_module(1., 'foo')
+    assert (
+        str(info.value) ==
+        'module needs to be an instance of Column, SO_ML, Psi_Thermwind or Psi_SO'
+    )
+    with pytest.raises(TypeError) as info:
+      model.add_module(modules['basin'], 'foo', advection='upwind')
+    assert str(info.value) == 'advection is not a valid option for Column modules'
+    with pytest.raises(TypeError) as info:
+      model.add_module(modules['AMOC'], 'foo', left='channel', right='north')
+    assert (
+        str(info.value) ==
+        'left neighbor needs to be the name of a Column module in the model'
+    )
+    with pytest.raises(TypeError) as info:
+      model.add_module(modules['basin'], 'foo', left='north')
+    assert str(info.value) == 'only Psi_Thermwind and Psi_SO modules have neighbors'
+
+  def test_run(self):
+    # reference: the loop from the examples
+    ref = make_modules()
+    dt = 86400. * 30.
+    for ii in range(240):
+      if ii % 24 == 0:
+        ref['AMOC'].update(b1=ref['basin'].b, b2=ref['north'].b)
+        ref['AMOC'].solve()
+        [Psi_b, Psi_n] = ref['AMOC'].Psibz()
+        ref['SO'].update(b=ref['basin'].b, bs=ref['channel'].bs)
+        ref['SO'].solve()
+      ref['basin'].timestep(wA=(Psi_b - ref['SO'].Psi) * 1e6, dt=dt)
+      ref['north'].timestep(wA=-Psi_n * 1e6, dt=dt, do_conv=True)
+      ref['channel'].timestep(
+          b_basin=ref['basin'].b, Psi_b=ref['SO'].Psi, dt=dt
+      )
+
+    modules = make_modules()
+    model = make_model(modules)
+    model.run(100, dt, coupler_iters=24)
+    model.run(140, dt, coupler_iters=24, snapshot_iters=48)
+    assert model.iteration == 240
+    assert model.time == 240 * dt
+    for name in ['basin', 'north']:
+      testing.assert_array_equal(modules[name].b, ref[name].b)
+    testing.assert_array_equal(modules['channel'].bs, ref['channel'].bs)
+    testing.assert_array_equal(modules['AMOC'].Psi, ref['AMOC'].Psi)
+    testing.assert_array_equal(
+        model.wA['north'], -model.Psi_coupled['AMOC'][1] * 1e6
+    )
+
+    # snapshots at iterations 144, 192 (and 240 is not part of the run):
+    assert model.snapshots['basin.b'].shape == (2, len(z))
+    assert model.snapshots['AMOC.Psib'].shape == (2, 500)
+    assert model.snapshots['channel.bs'].shape == (2, len(y))
+    testing.assert_array_equal(model.snapshots['time'], [144 * dt, 192 * dt])
+
+    with pytest.raises(TypeError) as info:
+      model.run(10, dt, coupler_iters=24, snapshot_iters=10)
+    assert (
+        str(info.value) == 'snapshot_iters needs to be a multiple of coupler_iters'
+    )
+
+  def test_run_advance(self):
+    modules = make_modules()
+    model = make_model(modules)
+    model.run(96, 86400. * 30., coupler_iters=24)
+    b = modules['basin'].b.copy()
+    modules = make_modules()
+    model = make_model(modules, scheme='implicit')
+    model.run(96, 86400. * 30., coupler_iters=24, advance=True)
+    assert np.max(np.abs(modules['basin'].b - b)) < 1e-3
+
+  def test_run_fixed_bs(self):
+    # reference: the loop from run_JansenNadeau_2018.py with fixed SO surface buoyancy
+    bs = bs_SO + 0.002
+    ref = make_modules()
+    ref['SO'].update(bs=bs)
+    dt = 86400. * 30.
+    for ii in range(240):
+      if ii % 24 == 0:
+        ref['AMOC'].update(b1=ref['basin'].b, b2=ref['north'].b)
+        ref['AMOC'].solve()
+        [Psi_b, Psi_n] = ref['AMOC'].Psibz()
+        ref['SO'].update(b=ref['basin'].b, bs=bs)
+        ref['SO'].solve()
+      basin, north, PsiSO = ref['basin'], ref['north'], ref['SO']
+      if PsiSO.Psi[1] < 0:
+        basin.bbot = bs[0]
+        basin.kappa = 2e-5
+      if Psi_b[1] > 0 and north.b[0] < basin.b[1] and north.b[0] < bs[0]:
+        basin.bbot = north.b[0]
+        basin.kappa = 2e-5
+      elif PsiSO.Psi[1] >= 0:
+        basin.bbot = basin.b[1]
+        basin.kappa = 1e-5
+      if Psi_n[1] < 0 and basin.b[0] < north.b[1]:
+        north.bbot = basin.b[0]
+        north.kappa = 2e-5
+      else:
+        north.bbot = north.b[1]
+        north.kappa = 1e-5
+      basin.timestep(wA=(Psi_b - PsiSO.Psi) * 1e6, dt=dt, do_conv=True)
+      north.timestep(wA=-Psi_n * 1e6, dt=dt, do_conv=True)
+
+    # without a mixed layer, the SO closure keeps the surface buoyancy it was given:
+    modules = make_modules()
+    modules['SO'].update(bs=bs)
+    model = Model()
+    for name in ['basin', 'north']:
+      model.add_module(
+          modules[name], name, do_conv=True, dynamic_bbc=True, kappa_noflux=1e-5
+      )
+    model.add_module(modules['AMOC'], 'AMOC', left='basin', right='north')
+    model.add_module(modules['SO'], 'SO', left=None, right='basin')
+    model.run(240, dt, coupler_iters=24)
+    for name in ['basin', 'north']:
+      testing.assert_array_equal(modules[name].b, ref[name].b)
+      assert modules[name].bbot == ref[name].bbot
+
+  def test_dynamic_bbc(self):
+    modules = make_modules()
+    model = make_model(modules, dynamic_bbc=True, kappa_noflux=1e-5)
+    kappa = modules['basin'].kappa
+    model.update_couplers()
+    # bottom water flowing into the basin from the SO has the SO's densest surface buoyancy:
+    model.Psi_coupled['SO'] = [-np.ones(len(z)), -np.ones(len(z))]
+    model.Psi_coupled['AMOC'] = [-np.ones(len(z)), np.ones(len(z))]
+    assert model.calc_bottom_inflow('basin') == modules['channel'].bs[0]
+    model.update_bottom_bc('basin')
+    assert modules['basin'].bbot == modules['channel'].bs[0]
+    assert modules['basin'].kappa is kappa
+    # no bottom water coming in:
+    model.update_bottom_bc('north')
+    assert modules['north'].bbot == modules['north'].b[1]
+    assert modules['north'].kappa(-100.) == 1e-5
+    # bottom water from the basin flows into the northern column if it is denser:
+    model.Psi_coupled['AMOC'] = [-np.ones(len(z)), -np.ones(len(z))]
+    modules['basin'].b[0] = modules['north'].b[1] - 1e-3
+    assert model.calc_bottom_inflow('north') == modules['basin'].b[0]
+    modules['basin'].b[0] = modules['north'].b[1] + 1e-3
+    assert model.calc_bottom_inflow('north') is None
+    # ... and bottom water from the north flows into the basin only if it is also denser
+    # than the SO's densest surface water, even if that is not flowing in:
+    model.Psi_coupled['SO'] = [np.ones(len(z)), np.ones(len(z))]
+    model.Psi_coupled['AMOC'] = [np.ones(len(z)), np.ones(len(z))]
+    modules['north'].b[0] = modules['channel'].bs[0] - 1e-3
+    assert model.calc_bottom_inflow('basin') == modules['north'].b[0]
+    modules['north'].b[0] = modules['channel'].bs[0] + 1e-3
+    assert model.calc_bottom_inflow('basin') is None
+
+  def test_solve_equi(self):
+    modules = make_modules()
+    model = make_model(modules)
+    dt = 86400. * 30.
+    model.run(24, dt, coupler_iters=12)
+    res = model.solve_equi(dt, coupler_iters=12, tol=1e-9)
+    assert res < 1e-9
+    assert model.iteration == 24
+    assert model.time == 24 * dt
+    assert model.snapshots == {}
+    b = [a.copy() for a in model.state_arrays()]
+    model.run(12, dt, coupler_iters=12)
+    for a, b0 in zip(model.state_arrays(), b):
+      assert np.max(np.abs(a - b0)) < 1e-9
+
+  def test_checkpoint(self, tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    dt = 86400. * 30.
+    options = {'dynamic_bbc': True, 'kappa_noflux': 1e-5}
+    modules = make_modules()
+    ref = make_model(modules, **options)
+    ref.run(240, dt, coupler_iters=24)
+
+    # a run that is interrupted after its second checkpoint:
+    model = make_model(make_modules(), **options)
+    model.run(130, dt, coupler_iters=24, checkpoint_iters=48, checkpoint_file=path)
+    assert not (tmp_path / 'checkpoint.npz.tmp').exists()
+    modules = make_modules()
+    model = make_model(modules, **options)
+    model.restart(path)
+    assert model.iteration == 96
+    assert model.time == 96 * dt
+    model.run(144, dt, coupler_iters=24)
+    for a, b in zip(model.state_arrays(), ref.state_arrays()):
+      testing.assert_array_equal(a, b)
+    for name in ['basin', 'north']:
+      assert modules[name].bbot == ref[name].bbot
+      assert model.bottom_inflow[name] == ref.bottom_inflow[name]
+    testing.assert_array_equal(modules['AMOC'].Psi, ref['AMOC'].Psi)
+    testing.assert_array_equal(modules['SO'].Psi, ref['SO'].Psi)
+
+    # fixed closures, and a Psi_SO whose surface buoyancy is set by the driver rather
+    # than by a mixed layer:
+    def make_fixed_model(modules):
+      model = Model()
+      model.add_module(modules['basin'], 'basin', **options)
+      model.add_module(modules['north'], 'north', do_conv=True, **options)
+      model.add_module(
+          modules['AMOC'], 'AMOC', left='basin', right='north', fixed=True
+      )
+      model.add_module(modules['SO'], 'SO', right='basin', fixed=True)
+      return model
+
+    def change_SO(modules):
+      modules['SO'].update(bs=bs_SO + 0.002)
+      modules['SO'].solve()
+
+    modules = make_modules()
+    ref = make_fixed_model(modules)
+    ref.run(96, dt, coupler_iters=24)
+    change_SO(modules)
+    ref.run(144, dt, coupler_iters=24)
+    ref_modules = modules
+
+    modules = make_modules()
+    model = make_fixed_model(modules)
+    model.run(96, dt, coupler_iters=24)
+    change_SO(modules)
+    model.run(82, dt, coupler_iters=24, checkpoint_iters=48, checkpoint_file=path)
+    modules = make_modules()
+    model = make_fixed_model(modules)
+    model.restart(path)
+    assert model.iteration == 144
+    model.run(96, dt, coupler_iters=24)
+    for a, b in zip(model.state_arrays(), ref.state_arrays()):
+      testing.assert_array_equal(a, b)
+    testing.assert_array_equal(modules['SO'].bs(y), bs_SO + 0.002)
+    for field in ['Psi', 'Psi_Ek', 'Psi_GM']:
+      testing.assert_array_equal(
+          getattr(modules['SO'], field), getattr(ref_modules['SO'], field)
+      )
+    testing.assert_array_equal(modules['AMOC'].Psi, ref_modules['AMOC'].Psi)
+
+    with pytest.raises(TypeError) as info:
+      model.run(48, dt, coupler_iters=24, checkpoint_iters=36, checkpoint_file=path)
+    assert (
+        str(info.value) == 'checkpoint_iters needs to be a multiple of coupler_iters'
+    )
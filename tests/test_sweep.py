@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import numpy as np
+import pytest
+sys.path.append('/pymoc/src/pymoc')
+from sweep import Sweep
+
+# a stand-in for the driver scripts, which records how it was called:
+script = '''
+import argparse, os
+import numpy as np
+parser = argparse.ArgumentParser()
+parser.add_argument('--a', type=float, default=0.)
+parser.add_argument('--b', type=float, default=0.)
+parser.add_argument('--flag', action='store_true')
+parser.add_argument('--pickup', default=None)
+parser.add_argument('--diagfile', default='diags.npz')
+parser.add_argument('--pickup_save_file', default=None)
+args = parser.parse_args()
+if args.a < 0:
+  raise ValueError('a needs to be positive')
+x = 0. if args.pickup is None else float(np.load(args.pickup)['arr_0'])
+np.savez(args.pickup_save_file, x + args.a * args.b)
+np.savez(args.diagfile, a=args.a, b=args.b, flag=args.flag, x=x)
+with open(os.path.join(os.path.dirname(__file__), 'calls.txt'), 'a') as f:
+  f.write('run\\n')
+'''
+
+
+@pytest.fixture
+def driver(tmp_path):
+  path = tmp_path / 'driver.py'
+  path.write_text(script)
+  return str(path)
+
+
+def count_calls(driver):
+  with open(os.path.join(os.path.dirname(driver), 'calls.txt')) as f:
+    return len(f.readlines())
+
+
+class TestSweep(object):
+  def test_members(self, driver, tmp_path):
+    sweep = Sweep(
+        driver, {'a': [1., 2.], 'b': [3., 4., 5.]},
+        cache_dir=str(tmp_path / 'cache'),
+        fixed={'flag': True}
+    )
+    members = sweep.members()
+    assert len(members) == 6
+    assert members[1] == {'flag': True, 'a': 1., 'b': 4.}
+    assert len(set(sweep.key(member) for member in members)) == 6
+    assert sweep.key({'b': 4., 'a': 1., 'flag': True}) == sweep.key(members[1])
+    cmd = sweep.command(members[1], pickup='p.npz')
+    assert cmd[2:8] == ['--a', '1.0', '--b', '4.0', '--flag', '--diagfile']
+    assert cmd[-2:] == ['--pickup', os.path.abspath('p.npz')]
+    assert len(sweep.chains()) == 6
+
+    with pytest.raises(TypeError) as info:
+      Sweep(driver, {'a': [1.]}, chain='c')
+    assert str(info.value) == 'chain needs to be one of the swept parameters'
+
+  def test_run(self, driver, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    sweep = Sweep(driver, {'a': [1., 2.], 'b': [3.]}, cache_dir=cache_dir)
+    paths = sweep.run(processes=2)
+    assert count_calls(driver) == 2
+    for member, path in zip(sweep.members(), paths):
+      assert sweep.is_done(member)
+      assert np.load(os.path.join(path, 'diags.npz'))['a'] == member['a']
+      with open(os.path.join(path, 'params.json')) as f:
+        assert json.load(f)['params'] == member
+    # finished members are not run again, when the sweep is repeated or extended:
+    sweep.run()
+    assert count_calls(driver) == 2
+    sweep = Sweep(driver, {'a': [1., 2., 3.], 'b': [3.]}, cache_dir=cache_dir)
+    assert sweep.run()[:2] == paths
+    assert count_calls(driver) == 3
+
+  def test_chain(self, driver, tmp_path):
+    sweep = Sweep(
+        driver, {'a': [2., 1., 3.], 'b': [1., 10.]},
+        cache_dir=str(tmp_path / 'cache'),
+        chain='a'
+    )
+    chains = sweep.chains()
+    assert len(chains) == 2
+    assert [member['a'] for member in chains[0]] == [2., 1., 3.]
+    # the key of a chained member depends on the members before it:
+    assert sweep.previous(chains[0][1]) == chains[0][0]
+    assert sweep.previous(chains[0][0]) is None
+    other = Sweep(
+        driver, {'a': [1., 3.], 'b': [1., 10.]},
+        cache_dir=str(tmp_path / 'cache'),
+        chain='a'
+    )
+    assert other.key(chains[0][2]) != sweep.key(chains[0][2])
+    sweep.run()
+    # each member of a chain starts from the pickup of the previous one:
+    for chain in chains:
+      x = 0.
+      for member in chain:
+        path = sweep.path(member)
+        assert np.load(os.path.join(path, 'diags.npz'))['x'] == x
+        x += member['a'] * member['b']
+        assert np.load(os.path.join(path, 'pickup.npz'))['arr_0'] == x
+
+  def test_failure(self, driver, tmp_path):
+    sweep = Sweep(
+        driver, {'a': [1., -1., 2.]},
+        cache_dir=str(tmp_path / 'cache'),
+        fixed={'b': 1.},
+        chain='a'
+    )
+    with pytest.raises(RuntimeError) as info:
+      sweep.run()
+    # the member after the failed one can't start from its pickup, and isn't run:
+    assert str(info.value).startswith('2 members of the sweep failed')
+    done = [sweep.is_done(member) for member in sweep.members()]
+    assert done == [True, False, False]
+    assert not os.path.exists(sweep.path(sweep.members()[1]))
+    assert count_calls(driver) == 1
@@ -0,0 +1,47 @@
+import sys
+import numpy as np
+sys.path.append('/pymoc/src/pymoc/utils')
+from fixed_point import fixed_point
+from pymoc.modules import Psi_Thermwind, Column
+
+
+class TestFixedPoint(object):
+  def test_fixed_point(self):
+    # a linear contraction, and the same with a diverging plain iteration:
+    A = np.array([[0.5, 0.3], [-0.2, 0.6]])
+    c = np.array([1., 2.])
+    x_exact = np.linalg.solve(np.eye(2) - A, c)
+    x, res, niter = fixed_point(lambda x: np.dot(A, x) + c, np.zeros(2))
+    assert res < 1e-10
+    assert niter < 10
+    assert np.allclose(x, x_exact, rtol=1e-9)
+    x, res, niter = fixed_point(
+        lambda x: np.dot(-3. * A, x) + c, np.zeros(2), m=0, beta=0.2
+    )
+    assert res < 1e-10
+    assert np.allclose(x, np.linalg.solve(np.eye(2) + 3. * A, c), rtol=1e-9)
+    # the iteration stops at maxiter:
+    x, res, niter = fixed_point(lambda x: 2. * x + 1., np.zeros(3), m=0, maxiter=5)
+    assert niter == 5
+    assert res == 16.
+
+  def test_fixed_point_column_thermwind(self):
+    # the iteration between Column.solve_equi and Psi_Thermwind of example_iteration.py:
+    z = np.linspace(-3500, 0, 100)
+    b0 = 0.03 * np.exp(z / 300.) - 0.0004
+    kappa = lambda z: 1e-5 + 3e-5 * np.exp(z / 100) + 3e-4 * np.exp(-z / 1000 - 4)
+    AMOC = Psi_Thermwind(z=z, b1=b0)
+    basin = Column(z=z, kappa=kappa, Area=8e13, b=b0, bs=0.03, bbot=-0.0004)
+
+    def update(b):
+      AMOC.update(b1=b)
+      AMOC.solve()
+      basin.solve_equi(AMOC.Psi * 1e6, method='quadrature')
+      return basin.b
+
+    b, res, niter = fixed_point(update, b0, tol=1e-10, beta=0.5)
+    assert res < 1e-10
+    # under-relaxation alone needs many more iterations:
+    b_relax, res, niter_relax = fixed_point(update, b0, tol=1e-10, m=0, beta=0.2)
+    assert niter < niter_relax / 3
+    assert np.max(np.abs(b - b_relax)) < 1e-9
@@ -0,0 +1,54 @@
+import sys
+import pytest
+import numpy as np
+sys.path.append('/pymoc/src/pymoc/utils')
+from grid_function import GridFunction
+
+
+@pytest.fixture
+def grid_function():
+  axis = np.linspace(-4000, 0, 80)
+  return GridFunction(np.sin(axis / 1000.), axis)
+
+
+class TestGridFunction(object):
+  def test_grid_function_init(self, grid_function):
+    axis = np.linspace(-4000, 0, 80)
+    assert np.all(grid_function.axis == axis)
+    assert np.all(grid_function.values == np.sin(axis / 1000.))
+
+  def test_grid_function_native_grid(self, grid_function):
+    f = grid_function(grid_function.axis)
+    assert np.all(f == grid_function.values)
+    assert np.shares_memory(f, grid_function.values)
+    assert not f.flags.writeable
+    # an identical copy of the grid also takes the fast path:
+    f = grid_function(grid_function.axis.copy())
+    assert np.shares_memory(f, grid_function.values)
+
+  @pytest.mark.parametrize('min_cached_size', [0, 2000])
+  def test_grid_function_call(self, grid_function, min_cached_size):
+    grid_function.min_cached_size = min_cached_size
+    axis = grid_function.axis
+    values = grid_function.values
+    for z in [-5000., -4000., -1234.5, axis[17], 0., 100.]:
+      assert grid_function(z) == np.interp(z, axis, values)
+    z = np.concatenate(([-5000.], np.linspace(-4100, 100, 333), axis[::7]))
+    assert np.allclose(
+        grid_function(z), np.interp(z, axis, values), rtol=1e-14, atol=1e-14
+    )
+    assert np.all(grid_function(axis[::7]) == values[::7])
+    assert grid_function(z[:, np.newaxis]).shape == (len(z), 1)
+
+  def test_grid_function_weights(self, grid_function):
+    grid_function.min_cached_size = 0
+    z = np.linspace(-4100, 100, 333)
+    f = grid_function(z)
+    assert len(grid_function._weights) == 1
+    # weights are reused for a repeated grid, and follow changes to the values:
+    grid_function.values *= 2.
+    assert np.all(grid_function(z.copy()) == 2. * f)
+    assert len(grid_function._weights) == 1
+    for i in range(GridFunction.max_cached_grids + 1):
+      grid_function(z + i)
+    assert len(grid_function._weights) <= GridFunction.max_cached_grids
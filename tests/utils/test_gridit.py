@@ -16,3 +16,12 @@ class TestGridit(object):
     for i in range(nx):
       for j in range(ny):
         assert test[i, j] == sol[i, j]
+
+  def test_gridit_vectorized(self):
+    f = lambda x, y: x**2 + np.sin(y)
+    x = np.linspace(0, 1, 5)
+    y = np.linspace(0, 2, 7)
+    sol = gridit(x, y, f)
+    np.testing.assert_array_equal(gridit(x, y, f, vectorized=True), sol)
+    f.vectorized = True
+    np.testing.assert_array_equal(gridit(x, y, f), sol)
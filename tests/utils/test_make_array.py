@@ -12,6 +12,15 @@ class TestMakeArray(object):
     assert all(make_array(myst, zlevels, 'myst') == myst)
     myst = lambda n: 42 + n
     assert all(make_array(myst, zlevels, 'myst') == myst(zlevels))
+    # read-only results (e.g. GridFunction views) are copied:
+    values = np.arange(80.)
+    view = values.view()
+    view.flags.writeable = False
+    myst = lambda n: view
+    made_array = make_array(myst, zlevels, 'myst')
+    assert made_array.flags.writeable
+    assert not np.shares_memory(made_array, values)
+    assert all(made_array == values)
     myst = 5.0
     assert all(
         make_array(myst, zlevels, 'myst') == 5.0 * np.ones((len(zlevels)))
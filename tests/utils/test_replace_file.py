@@ -0,0 +1,17 @@
+import os
+import sys
+sys.path.append('/pymoc/src/pymoc/utils')
+from replace_file import replace_file
+
+
+class TestReplaceFile(object):
+  def test_replace_file(self, tmp_path):
+    src = str(tmp_path / 'file.tmp')
+    dst = str(tmp_path / 'file')
+    for text in ['old', 'new']:
+      with open(src, 'w') as f:
+        f.write(text)
+      replace_file(src, dst)
+      assert not os.path.exists(src)
+      with open(dst) as f:
+        assert f.read() == text
@@ -0,0 +1,31 @@
+import sys
+import pytest
+import numpy as np
+from scipy.optimize import brenth
+sys.path.append('/pymoc/src/pymoc/utils')
+from solve_brackets import solve_brackets
+
+
+class TestSolveBrackets(object):
+  def test_solve_brackets(self):
+    c = np.linspace(0.1, 3, 50)
+    x = solve_brackets(lambda x: x**3 - c * np.exp(-x), 0., 3.)
+    for i in range(len(c)):
+      assert np.abs(
+          x[i] - brenth(lambda x: x**3 - c[i] * np.exp(-x), 0., 3.)
+      ) < 1e-11
+
+    # brackets can differ between elements, and roots can be at the brackets:
+    x = solve_brackets(lambda x: x - c, c - np.arange(50) % 2, c + 1.)
+    np.testing.assert_allclose(x, c, atol=1e-12)
+
+    with pytest.raises(ValueError) as info:
+      solve_brackets(lambda x: x - c, 0., 1.)
+    assert str(info.value) == 'f(a) and f(b) must have different signs'
+
+    # roots that have not converged after maxiter iterations are an error:
+    with pytest.raises(RuntimeError) as info:
+      solve_brackets(lambda x: x**3 - c * np.exp(-x), 0., 3., maxiter=2)
+    assert str(info.value) == (
+        'solve_brackets failed to converge after 2 iterations'
+    )